@@ -0,0 +1,222 @@
+"""
+Planificación de las claves (letra correcta de cada pregunta de alternativas)
+
+Dos restricciones:
+
+  - cantidades iguales: dentro de cada grupo de preguntas con la misma cantidad
+    de opciones, cada letra es correcta el mismo número de veces (las que sobran
+    se sortean, una por letra como máximo)
+  - rachas: nunca más de max_run letras iguales seguidas entre preguntas de
+    alternativas consecutivas (0: sin límite)
+
+Primero se fija cuántas veces va cada letra en cada grupo y después se ordenan
+recorriendo las preguntas: en cada una se sortea una letra entre las que le
+quedan a su grupo, con peso según cuántas le quedan (sin límite de rachas
+equivale a mezclarlas al azar), saltando la que alargaría la racha y poniendo
+primero la que ya no cabría separada por las demás. Los grupos se intercalan
+(verdadero/falso queda como alternativas de 2 opciones entre las de 4 o 5), así
+que una pregunta puede quedarse sin letra posible por elecciones de otro grupo:
+entonces se retrocede y se prueba otra letra en las preguntas anteriores. Si la
+búsqueda se alarga se vuelve a empezar con otro sorteo de las letras que
+sobran; solo si ninguno de los intentos la completa (p. ej. preguntas seguidas
+de una sola opción) se arma la clave sin retroceso, intercambiando la letra
+bloqueada con una pregunta anterior del mismo grupo o aceptando la racha
+(KeyStats.longest_run la informa).
+
+Todo sale de un random.Random: con la misma semilla, las mismas claves.
+"""
+
+import collections
+import random
+
+OPTION_CHARS = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+
+# Máximo de letras iguales seguidas por defecto (0: sin límite)
+DEFAULT_MAX_RUN = 3
+
+# Búsqueda con retroceso: intentos y retrocesos por pregunta en cada intento
+SEARCH_ATTEMPTS = 20
+SEARCH_BACKTRACKS = 10
+
+
+def multiple_choice_numbers(questions):
+    """(n° de pregunta, cantidad de opciones) de las preguntas de alternativas, en orden"""
+    return [(q_num, len(question['options'])) for q_num, question in enumerate(questions, 1)
+            if question['type'] == 'multiple_choice' and question['options']]
+
+
+def target_counts(group_size, num_options, rng):
+    """Cuántas veces va cada letra en un grupo de group_size preguntas de num_options opciones"""
+    valid_chars = OPTION_CHARS[:num_options]
+    counts = dict.fromkeys(valid_chars, group_size // len(valid_chars))
+    remaining = group_size - len(valid_chars) * (group_size // len(valid_chars))
+    for char in rng.sample(valid_chars, remaining):
+        counts[char] += 1
+    return counts
+
+
+def _run_length(sequence, index, char):
+    """Largo de la racha de char que pasa por index si ahí hubiera un char"""
+    left = index - 1
+    while left >= 0 and sequence[left] == char:
+        left -= 1
+    right = index + 1
+    while right < len(sequence) and sequence[right] == char:
+        right += 1
+    return right - left - 1
+
+
+def _repair(sequence, positions, blocked, max_run):
+    """Deja libre una letra para la pregunta que sigue cambiando de lugar la letra bloqueada
+
+    Busca una pregunta anterior del mismo grupo con otra letra: esa pregunta
+    recibe la bloqueada y la nueva se queda con la suya, así las cantidades del
+    grupo no cambian. Devuelve la letra liberada o None.
+    """
+    end = len(sequence)
+    for position in reversed(positions):
+        char = sequence[position]
+        if char == blocked:
+            continue
+        sequence[position] = blocked
+        if _run_length(sequence, position, blocked) <= max_run and _run_length(sequence, end, char) <= max_run:
+            return char
+        sequence[position] = char
+    return None
+
+
+def _search(numbers, targets, max_run, rng, budget):
+    """Asigna las letras de cada grupo con retroceso; None si se agotan los `budget` retrocesos"""
+    remaining = {num_options: dict(counts) for num_options, counts in targets.items()}
+    left = {num_options: sum(counts.values()) for num_options, counts in targets.items()}
+    sequence = []
+    runs = []
+    tried = [set()]  # Letras ya probadas en cada pregunta de la rama actual
+
+    while len(sequence) < len(numbers):
+        num_options = numbers[len(sequence)]
+        counts = remaining[num_options]
+        last = sequence[-1] if sequence else None
+        run = runs[-1] if runs else 0
+        letters = [char for char, count in counts.items()
+                   if count and char not in tried[-1] and not (char == last and run >= max_run)]
+        if letters:
+            total = left[num_options]
+            critical = [char for char in letters if counts[char] > max_run * (total - counts[char])]
+            if critical:
+                letters = critical
+
+        if not letters:
+            budget -= 1
+            if not sequence or budget < 0:
+                return None
+            tried.pop()
+            char = sequence.pop()
+            runs.pop()
+            previous = numbers[len(sequence)]
+            remaining[previous][char] += 1
+            left[previous] += 1
+            continue
+
+        char = rng.choices(letters, [counts[char] for char in letters])[0] if len(letters) > 1 else letters[0]
+        tried[-1].add(char)
+        counts[char] -= 1
+        left[num_options] -= 1
+        runs.append(run + 1 if char == last else 1)
+        sequence.append(char)
+        tried.append(set())
+    return sequence
+
+
+def _sequence(numbers, targets, max_run, rng):
+    """Asigna las letras de cada grupo en el orden de las preguntas, sin retroceso"""
+    remaining = {num_options: dict(counts) for num_options, counts in targets.items()}
+    left = {num_options: sum(counts.values()) for num_options, counts in targets.items()}
+    positions = {num_options: [] for num_options in targets}
+    sequence = []
+    last, run = None, 0
+
+    for num_options in numbers:
+        counts = remaining[num_options]
+        total = left[num_options]
+        letters = [char for char, count in counts.items() if count and not (max_run and char == last and run >= max_run)]
+        if letters and max_run:
+            # Una letra con más apariciones de las que las demás alcanzan a separar va primero
+            critical = [char for char in letters if counts[char] > max_run * (total - counts[char])]
+            if critical:
+                letters = critical
+
+        if letters:
+            char = rng.choices(letters, [counts[char] for char in letters])[0] if len(letters) > 1 else letters[0]
+            counts[char] -= 1
+        else:
+            # Solo queda la letra que alargaría la racha: se intercambia con una pregunta anterior
+            # y, si no hay con cuál, se acepta la racha (p. ej. preguntas de una sola opción)
+            char = _repair(sequence, positions[num_options], last, max_run)
+            counts[last] -= 1
+            if char is None:
+                char = last
+
+        left[num_options] = total - 1
+        positions[num_options].append(len(sequence))
+        sequence.append(char)
+        run = _run_length(sequence, len(sequence) - 1, char) if max_run else 0
+        last = char
+    return sequence
+
+
+def plan_answer_keys(questions, rng=None, max_run=0):
+    """Letra correcta de cada pregunta de alternativas: {n° de pregunta: letra}"""
+    rng = rng or random.Random()
+    numbers = multiple_choice_numbers(questions)
+    groups = collections.Counter(num_options for _, num_options in numbers)
+    sequence_options = [num_options for _, num_options in numbers]
+
+    def sample_targets():
+        return {num_options: target_counts(size, num_options, rng) for num_options, size in sorted(groups.items())}
+
+    targets = sample_targets()
+    sequence = None
+    if max_run:
+        for attempt in range(SEARCH_ATTEMPTS):
+            if attempt:
+                targets = sample_targets()
+            sequence = _search(sequence_options, targets, max_run, rng, SEARCH_BACKTRACKS * len(numbers) + 100)
+            if sequence is not None:
+                break
+
+    if sequence is None:
+        sequence = _sequence(sequence_options, targets, max_run, rng)
+    return {q_num: char for (q_num, _), char in zip(numbers, sequence)}
+
+
+def longest_run(answer_keys):
+    """Mayor cantidad de letras iguales seguidas (en el orden de las preguntas)"""
+    longest, run, last = 0, 0, None
+    for q_num in sorted(answer_keys):
+        char = answer_keys[q_num]
+        run = run + 1 if char == last else 1
+        last = char
+        longest = max(longest, run)
+    return longest
+
+
+class KeyStats:
+    """Balance de una clave: cuántas veces es correcta cada letra y rachas"""
+
+    def __init__(self, answer_keys, questions=None):
+        self.counts = collections.Counter(answer_keys.values())
+        self.longest_run = longest_run(answer_keys)
+        # Cantidad de opciones -> Counter de letras (solo si se conocen las preguntas)
+        self.by_options = {}
+        for q_num, num_options in multiple_choice_numbers(questions or ()):
+            if q_num in answer_keys:
+                self.by_options.setdefault(num_options, collections.Counter())[answer_keys[q_num]] += 1
+
+    def imbalance(self):
+        """Mayor diferencia entre la letra más y menos usada dentro de un grupo"""
+        worst = 0
+        for num_options, counter in self.by_options.items():
+            used = [counter.get(char, 0) for char in OPTION_CHARS[:num_options]]
+            worst = max(worst, max(used) - min(used))
+        return worst
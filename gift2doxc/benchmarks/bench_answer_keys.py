@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la planificación de claves
+
+Sobre un banco sintético genera las claves de muchas formas y compara:
+
+  - mezcla por grupo: letras repartidas en partes iguales y mezcladas con
+    random.shuffle (la versión anterior, sin control de rachas)
+  - plan_answer_keys con max_run: mismas cantidades por letra y sin más de
+    max_run letras iguales seguidas
+
+Informa tiempo por forma, la racha más larga y el mayor desbalance dentro de
+un grupo, y comprueba que la misma semilla da las mismas claves.
+
+Después repite la comprobación con muchos bancos chicos de grupos mezclados
+(verdadero/falso como 2 opciones entre preguntas de 3, 4 y 5), donde una
+pregunta puede quedarse sin letra por las elecciones de otro grupo, con
+max_run de 1 a 3.
+
+Uso:
+  python3 benchmarks/bench_answer_keys.py [-n 5000] [-f 40] [--max-run 3] [-m 4000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_keys import OPTION_CHARS, KeyStats, plan_answer_keys
+from bench_question_store import synthetic_questions
+
+
+def shuffled_keys(questions, rng):
+    """Claves como antes: partes iguales por grupo de opciones y random.shuffle"""
+    answer_keys = {}
+    distributions = {}
+    for q_num, question in enumerate(questions, 1):
+        if question['type'] == 'multiple_choice' and question['options']:
+            distributions.setdefault(len(question['options']), []).append(q_num)
+
+    for num_options, q_numbers in distributions.items():
+        valid_chars = OPTION_CHARS[:num_options]
+        target_answers = []
+        for char in valid_chars:
+            target_answers.extend([char] * (len(q_numbers) // len(valid_chars)))
+        target_answers.extend(rng.sample(valid_chars, len(q_numbers) - len(target_answers)))
+        rng.shuffle(target_answers)
+        answer_keys.update(zip(q_numbers, target_answers))
+    return answer_keys
+
+
+def mixed_bank(rng):
+    """Banco chico con grupos intercalados, mayoría de verdadero/falso"""
+    options = [rng.choice([2, 2, 2, 3, 4, 4, 5]) for _ in range(rng.randint(4, 24))]
+    return [{'type': 'multiple_choice', 'text': f"Pregunta {i}",
+             'options': [{'text': f"Opción {j}", 'correct': j == 0} for j in range(count)]}
+            for i, count in enumerate(options, 1)]
+
+
+def check_mixed(banks, max_run):
+    """Cantidad de bancos mezclados cuya clave supera max_run o se desbalancea"""
+    broken = 0
+    for seed in range(banks):
+        questions = mixed_bank(random.Random(seed))
+        stats = KeyStats(plan_answer_keys(questions, random.Random(seed), max_run), questions)
+        if stats.longest_run > max_run or stats.imbalance() > 1:
+            broken += 1
+    return broken
+
+
+def run(planner, questions, seeds):
+    start = time.perf_counter()
+    plans = [planner(random.Random(seed)) for seed in seeds]
+    seconds = time.perf_counter() - start
+    stats = [KeyStats(plan, questions) for plan in plans]
+    return plans, seconds, max(s.longest_run for s in stats), max(s.imbalance() for s in stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la planificación de claves')
+    parser.add_argument('-n', '--questions', type=int, default=5000, help='Preguntas del banco')
+    parser.add_argument('-f', '--forms', type=int, default=40, help='Formas (una clave por forma)')
+    parser.add_argument('--max-run', type=int, default=3, help='Máximo de letras iguales seguidas')
+    parser.add_argument('-m', '--mixed', type=int, default=4000, help='Bancos chicos de grupos mezclados')
+    args = parser.parse_args()
+
+    questions = synthetic_questions(args.questions)
+    multiple_choice = sum(1 for q in questions if q['type'] == 'multiple_choice' and q['options'])
+    seeds = list(range(args.forms))
+    print(f"📚 {len(questions)} preguntas ({multiple_choice} de alternativas), {len(seeds)} formas,"
+          f" máx. {args.max_run} iguales seguidas")
+
+    rows = [
+        ("Mezcla por grupo", lambda rng: shuffled_keys(questions, rng)),
+        ("plan_answer_keys", lambda rng: plan_answer_keys(questions, rng, args.max_run)),
+    ]
+    results = {}
+    for label, planner in rows:
+        plans, seconds, run_length, imbalance = run(planner, questions, seeds)
+        results[label] = plans
+        print(f"  {label:18s} {seconds / len(seeds) * 1000:7.1f} ms por forma  racha más larga {run_length:3d}"
+              f"  desbalance {imbalance}")
+
+    again, _, run_length, imbalance = run(rows[1][1], questions, seeds)
+    ok = (not args.max_run or run_length <= args.max_run) and imbalance <= 1
+    print(f"{'✅' if ok else '❌'} Restricciones {'cumplidas' if ok else 'NO cumplidas'} en todas las formas")
+    print(f"{'✅' if again == results['plan_answer_keys'] else '❌'} Mismas claves con las mismas semillas")
+
+    print(f"\n📚 {args.mixed} bancos de 4 a 24 preguntas con grupos de 2 a 5 opciones mezclados")
+    for max_run in (1, 2, 3):
+        start = time.perf_counter()
+        broken = check_mixed(args.mixed, max_run)
+        seconds = time.perf_counter() - start
+        print(f"  {'✅' if not broken else '❌'} máx. {max_run} iguales seguidas: {broken} bancos fuera de las"
+              f" restricciones ({seconds / args.mixed * 1000:.2f} ms por banco)")
+
+
+if __name__ == "__main__":
+    main()
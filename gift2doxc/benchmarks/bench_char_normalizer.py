@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la normalización de caracteres
+
+Arma un banco sintético de varios MB con algunos caracteres a normalizar
+(comillas tipográficas, guiones largos, flechas, superíndices...) y compara:
+
+  - el bucle anterior: ~70 str.replace, la mayoría identidades
+  - str.translate con la tabla completa
+  - una única regex de alternativas con la tabla completa
+  - CharNormalizer (char_map.json compilado: solo los reemplazos efectivos)
+
+Uso:
+  python3 benchmarks/bench_char_normalizer.py [-m 5 20] [-p 0.3] [-r 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_gift_parser import synthetic_question
+from char_normalizer import CharNormalizer, load_char_map
+
+# Caracteres que la tabla anterior reemplazaba por sí mismos
+LEGACY_IDENTITIES = ('⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻₀₁₂₃₄₅₆₇₈₉₊₋→←↔↑↓±×÷≤≥≠∞∂∫∑√πα'
+                     'βγδεθλμνρστφχψω°℃℉Ω"')
+DECORATIONS = ['“x”', '‘y’', ' – ', ' — ', '…', '⟶', '2×10⁻³', 'Ca²⁺', '37 °C', 'μm']
+
+
+def legacy_table(mapping):
+    """Tabla equivalente a la anterior: sus identidades más los reemplazos efectivos de char_map.json"""
+    table = {char: char for char in LEGACY_IDENTITIES}
+    table.update({'²⁺': '²⁺', '³⁺': '³⁺'})
+    table.update(mapping)
+    return table
+
+
+def legacy_normalize(text, table):
+    for old_char, new_char in table.items():
+        text = text.replace(old_char, new_char)
+    return text
+
+
+def synthetic_bank(megabytes, decorated=0.3, seed=1):
+    rng = random.Random(seed)
+    blocks = []
+    size = 0
+    number = 0
+    while size < megabytes * 1_000_000:
+        number += 1
+        block = synthetic_question(rng, number)
+        if rng.random() < decorated:
+            block = block.replace(' ', f" {rng.choice(DECORATIONS)} ", 1)
+        blocks.append(block)
+        size += len(block.encode('utf-8')) + 2
+    return '\n\n'.join(blocks)
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la normalización de caracteres')
+    parser.add_argument('-m', '--megabytes', type=float, nargs='+', default=[5, 20], help='Tamaños del banco (MB)')
+    parser.add_argument('-p', '--decorated', type=float, default=0.3,
+                        help='Fracción de preguntas con caracteres a normalizar')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    mapping = load_char_map()
+    legacy = legacy_table(mapping)
+    normalizer = CharNormalizer(mapping)
+    translate_table = str.maketrans({old: new for old, new in legacy.items() if len(old) == 1})
+    alternation = re.compile('|'.join(re.escape(old) for old in sorted(legacy, key=len, reverse=True)))
+
+    variants = [
+        ('Bucle anterior (str.replace x%d)' % len(legacy), lambda text: legacy_normalize(text, legacy)),
+        ('str.translate', lambda text: text.translate(translate_table)),
+        ('Regex de alternativas', lambda text: alternation.sub(lambda m: legacy[m.group(0)], text)),
+        ('CharNormalizer (x%d)' % len(normalizer.replacements), normalizer),
+    ]
+
+    for megabytes in args.megabytes:
+        text = synthetic_bank(megabytes, args.decorated)
+        print(f"📚 Banco de {len(text.encode('utf-8')) / 1e6:.1f} MB ({len(text)} caracteres)")
+        reference = None
+        for label, func in variants:
+            seconds, result = best_of(args.repeat, func, text)
+            if reference is None:
+                reference = seconds
+            same = result == normalizer(text)
+            print(f"  {label:34s} {seconds * 1000:8.1f} ms  x{reference / seconds:5.1f}"
+                  f"{'' if same else '  (resultado distinto)'}")
+
+
+if __name__ == "__main__":
+    main()
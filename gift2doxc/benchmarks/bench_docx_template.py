@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark del esqueleto de documento en caché
+
+Para varios tamaños de banco arma el cuerpo del examen (encabezado, datos del
+estudiante, preguntas y opciones, sin la tabla de respuestas) de dos formas:
+
+  - desde cero: Document() nuevo, página, márgenes, estilos y encabezado otra
+    vez, y la fuente fijada párrafo por párrafo (como la versión anterior)
+  - esqueleto: copia XML del esqueleto en caché (docx_render.new_document) y
+    párrafos con el estilo Normal que ya trae
+
+y mide además render_exam completo (examen + respuestas, tabla incluida).
+
+Uso:
+  python3 benchmarks/bench_docx_template.py [-n 10 25 50 100] [-r 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.shared import Pt
+
+from answer_keys import OPTION_CHARS, plan_answer_keys
+from bench_question_store import synthetic_questions
+from docx_render import add_header, arrange_options, make_settings, new_document, plain_question, render_exam, setup_document
+
+
+def add_questions(doc, questions, arranged, font_name=None, font_size=None):
+    """Preguntas y opciones; con font_name/font_size se fija la fuente en cada párrafo"""
+    def paragraph(text):
+        p = doc.add_paragraph(text)
+        if font_name:
+            p.style.font.name = font_name
+            p.style.font.size = font_size
+
+    for i, question in enumerate(questions, 1):
+        paragraph(f"{i}. {question['text']}")
+        if question['type'] == 'multiple_choice':
+            for j, opt in enumerate(arranged[i][:len(OPTION_CHARS)]):
+                paragraph(f"   {OPTION_CHARS[j].upper()}) {opt['text']}")
+        elif question['type'] == 'essay':
+            for _ in range(question.get('lines', 5)):
+                paragraph("_" * 80)
+        doc.add_paragraph()
+
+
+def from_scratch(questions, settings, arranged):
+    doc = setup_document(settings)
+    add_header(doc, settings, settings['exam_title'])
+    add_questions(doc, questions, arranged, settings['font_name'], Pt(settings['question_font_size']))
+    return doc
+
+
+def from_template(questions, settings, arranged):
+    doc = new_document(settings, settings['exam_title'])
+    add_questions(doc, questions, arranged)
+    return doc
+
+
+def best_of(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del esqueleto de documento')
+    parser.add_argument('-n', '--questions', type=int, nargs='+', default=[10, 25, 50, 100], help='Tamaños de banco')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    settings = make_settings(institution_name="Universidad", course_name="Biología", exam_date="2024-06-01",
+                             variant_label="Forma 01")
+    new_document(settings, settings['exam_title'])  # El esqueleto se arma una vez por configuración
+
+    print(f"{'preguntas':>9s} {'desde cero':>11s} {'esqueleto':>10s} {'mejora':>7s} {'render_exam':>12s}")
+    for count in args.questions:
+        questions = [plain_question(question) for question in synthetic_questions(count)]
+        rng = random.Random(1)
+        arranged = arrange_options(questions, plan_answer_keys(questions, rng), True, rng)
+
+        scratch = best_of(lambda: from_scratch(questions, settings, arranged), args.repeat)
+        template = best_of(lambda: from_template(questions, settings, arranged), args.repeat)
+        full = best_of(lambda: render_exam(questions, settings, random.Random(1)), 1)
+        print(f"{count:9d} {scratch * 1000:8.0f} ms {template * 1000:7.0f} ms {scratch / template:6.1f}x"
+              f" {full * 1000:9.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
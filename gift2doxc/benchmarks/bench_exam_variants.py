@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la generación de varias formas del examen
+
+Genera N formas de un banco sintético y compara:
+
+  - secuencial: una forma tras otra en el proceso actual (lo que haría la
+    interfaz llamando N veces a generate_docx)
+  - VariantBatch: las mismas semillas repartidas en un pool de procesos
+
+Comprueba además que ambas generan las mismas claves, forma por forma. La
+ganancia del pool depende de los núcleos disponibles: con uno solo el pool
+solo agrega el costo de arrancar los procesos.
+
+Uso:
+  python3 benchmarks/bench_exam_variants.py [-n 40] [-f 8] [-w 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_question_store import synthetic_questions
+from docx_render import make_settings, plain_question
+from exam_variants import VariantBatch, render_variant, variant_name, variant_seeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de las formas del examen')
+    parser.add_argument('-n', '--questions', type=int, default=40, help='Preguntas por forma')
+    parser.add_argument('-f', '--forms', type=int, default=8, help='Cantidad de formas')
+    parser.add_argument('-w', '--workers', type=int, help='Procesos del pool (por defecto: núcleos disponibles)')
+    args = parser.parse_args()
+
+    questions = [plain_question(question) for question in synthetic_questions(args.questions)]
+    settings = make_settings()
+    seeds = variant_seeds(args.forms, 2024)
+    print(f"📚 {len(questions)} preguntas, {len(seeds)} formas, {os.cpu_count()} núcleo(s)")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        sequential = [render_variant(index, variant_name(index + 1), seed, output_dir, questions, settings)
+                      for index, seed in enumerate(seeds)]
+        sequential_seconds = time.perf_counter() - start
+        print(f"  {'Secuencial':14s} {sequential_seconds:7.2f} s  ({sequential_seconds / len(seeds) * 1000:.0f} ms por forma)")
+
+        batch = VariantBatch(questions, settings, seeds, output_dir, args.workers)
+        start = time.perf_counter()
+        for _ in batch:
+            pass
+        pool_seconds = time.perf_counter() - start
+        print(f"  {f'Pool ({batch.workers} proc.)':14s} {pool_seconds:7.2f} s  x{sequential_seconds / pool_seconds:.1f}")
+
+        # Misma semilla, mismo resultado: la forma no depende del proceso que la genere
+        again = render_variant(0, variant_name(1), seeds[0], output_dir, questions, settings)
+
+    failed = [result for result in batch.results if result.error]
+    same = not failed and all(result.answer_keys == other.answer_keys
+                              for result, other in zip(batch.ordered_results(), sequential))
+    print(f"{'✅' if same else '❌'} Claves {'iguales' if same else 'distintas'} en ambos modos")
+    print(f"{'✅' if again.answer_keys == sequential[0].answer_keys else '❌'} Forma 1 reproducible con su semilla")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor sin interfaz en un lote de bancos
+
+Escribe B bancos sintéticos de Q preguntas en una carpeta temporal y los
+convierte con gift_engine.convert_each (un examen por banco, como un trabajo
+de integración continua). Informa el tiempo total de cada etapa, la etapa más
+pesada y los bancos por segundo.
+
+Uso:
+  python3 benchmarks/bench_gift_engine.py [-b 20] [-q 60] [-n 1]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_gift_parser import write_bank
+from gift_engine import STAGES, EngineConfig, convert_each
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motor GIFT → DOCX')
+    parser.add_argument('-b', '--banks', type=int, default=20, help='Cantidad de bancos')
+    parser.add_argument('-q', '--questions', type=int, default=60, help='Preguntas por banco')
+    parser.add_argument('-n', '--forms', type=int, default=1, help='Formas por banco')
+    args = parser.parse_args()
+
+    config = EngineConfig(seed=1, forms=args.forms, question_order='aleatorio',
+                          cleanup_rules=["[html]", {"buscar": r"\s{2,}", "reemplazar": " ", "regex": True}])
+
+    with tempfile.TemporaryDirectory() as directory:
+        banks_dir = os.path.join(directory, 'bancos')
+        os.makedirs(banks_dir)
+        write_bank(banks_dir, args.banks * args.questions, args.banks)
+        print(f"📚 {args.banks} bancos x {args.questions} preguntas, {args.forms} forma(s) por banco")
+
+        start = time.perf_counter()
+        results, issues = convert_each([banks_dir], config, os.path.join(directory, 'salida'))
+        elapsed = time.perf_counter() - start
+
+    totals = {stage: sum(result.timings.get(stage, 0) for _, result in results) for stage in STAGES}
+    for stage in STAGES:
+        print(f"  {stage:10s} {totals[stage] * 1000:8.0f} ms  {totals[stage] / elapsed:5.0%}")
+    outputs = sum(len(result.outputs) for _, result in results)
+    print(f"⏱️  {elapsed:.2f} s en total, {len(results) / elapsed:.1f} bancos/s, {outputs} archivos")
+    print(f"{'✅' if not issues and len(results) == args.banks else '❌'} {len(results)}/{args.banks} bancos convertidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser GIFT
+
+Genera un banco sintético (varios archivos con alternativas, V/F, respuesta
+corta, numéricas, emparejamiento, desarrollo y comentarios) y compara el parser
+anterior de GiftToDocxConverter (lee el archivo completo y aplica regex por
+bloque) con gift_ingest.parse_gift_file (líneas decodificadas y normalizadas al
+vuelo, parser por tokens): tiempo, memoria máxima y coincidencia en las
+preguntas de alternativas.
+
+Uso:
+  python3 benchmarks/bench_gift_parser.py [-q 50000] [-f 100] [-r 3]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding_detect import open_text
+from gift_ingest import parse_gift_file
+from gift_parser import iter_gift
+
+WORDS = ("célula membrana núcleo proteína energía tejido órgano sistema función estructura "
+         "proceso respuesta estímulo síntesis enzima sustrato gen cromosoma mitosis").split()
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def synthetic_question(rng, number):
+    kind = rng.random()
+    title = f"::P{number}:: " if rng.random() < 0.7 else ""
+    text = sentence(rng, 8, 25).capitalize() + '?'
+    if kind < 0.70:
+        options = [f"={sentence(rng, 2, 8)}"] + [f"~{sentence(rng, 2, 8)}" for _ in range(rng.randint(2, 4))]
+        rng.shuffle(options)
+        lines = [f"{title}{text} {{"]
+        for option in options:
+            feedback = f" #{sentence(rng, 3, 6)}" if rng.random() < 0.3 else ""
+            lines.append(f"  {option}{feedback}")
+        lines.append("}")
+        return '\n'.join(lines)
+    if kind < 0.80:
+        return f"{title}{text} {{{rng.choice('TF')}}}"
+    if kind < 0.87:
+        return f"{title}{text} {{={sentence(rng, 1, 2)} ={sentence(rng, 1, 2)}}}"
+    if kind < 0.92:
+        return f"{title}{text} {{#{rng.randint(1, 99)}.{rng.randint(0, 9)}:0.5}}"
+    if kind < 0.96:
+        pairs = ' '.join(f"={rng.choice(WORDS)} -> {rng.choice(WORDS)}" for _ in range(3))
+        return f"{title}{text} {{{pairs}}}"
+    return f"{title}{text} {{}}"
+
+
+def write_bank(directory, questions, files, seed=1):
+    rng = random.Random(seed)
+    paths = []
+    per_file = max(1, questions // files)
+    number = 0
+    for index in range(files):
+        path = os.path.join(directory, f"banco_{index:04d}.gift")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"// Banco sintético {index}\n$CATEGORY: $course$/Banco {index}\n\n")
+            for _ in range(per_file):
+                number += 1
+                f.write(f"// question: {number}\n{synthetic_question(rng, number)}\n\n")
+        paths.append(path)
+    return paths
+
+
+def legacy_parse_gift_questions(content, source_file=""):
+    """Copia del parser anterior de GiftToDocxConverter.parse_gift_questions"""
+    content = re.sub(r'//.*?$', '', content, flags=re.MULTILINE)
+    question_blocks = re.split(r'\n\s*\n', content)
+    questions = []
+
+    for block in question_blocks:
+        block = block.strip()
+        if not block:
+            continue
+        try:
+            title_match = re.match(r'::(.+?)::', block)
+            title = title_match.group(1).strip() if title_match else "Sin título"
+            if title_match:
+                block = block[title_match.end():].strip()
+
+            question_text_match = re.match(r'(.*?)\{', block, re.DOTALL)
+            if not question_text_match:
+                continue
+            question_text = question_text_match.group(1).strip()
+            options_block = block[question_text_match.end()-1:]
+
+            question_data = {
+                'title': title, 'text': question_text, 'type': 'unknown', 'options': [],
+                'correct_answer': None, 'feedback': {}, 'source_file': source_file,
+                'problems': [], 'score': 1.0
+            }
+
+            if re.match(r'\{', options_block):
+                options_match = re.split(r'(?=[~=])', options_block.strip()[1:-1].strip())
+                options = []
+                for option_text in options_match:
+                    option_text = option_text.strip()
+                    if not option_text:
+                        continue
+                    is_correct = option_text.startswith('=')
+                    option_text = option_text[1:].strip()
+                    feedback_text = ""
+                    feedback_idx = option_text.find('#')
+                    if feedback_idx != -1:
+                        feedback_text = option_text[feedback_idx+1:].strip()
+                        option_text = option_text[:feedback_idx].strip()
+                    options.append({'text': option_text, 'is_correct': is_correct, 'feedback': feedback_text})
+                    if is_correct:
+                        question_data['correct_answer'] = option_text
+                question_data['type'] = 'multiple_choice'
+                question_data['options'] = options
+
+            if question_data['text']:
+                questions.append(question_data)
+        except Exception as e:
+            print(f"Error al procesar una pregunta en {source_file}: {str(e)}")
+            continue
+
+    return questions
+
+
+def run_legacy(paths):
+    questions = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        questions.extend(legacy_parse_gift_questions(content, os.path.basename(path)))
+    return questions
+
+
+def run_streaming(paths):
+    questions = []
+    for path in paths:
+        questions.extend(parse_gift_file(path)[0])
+    return questions
+
+
+def count_streaming(paths):
+    """Consume el generador sin acumular, como haría un proceso por lotes"""
+    total = 0
+    for path in paths:
+        f, _ = open_text(path)
+        with f:
+            total += sum(1 for _ in iter_gift(f, os.path.basename(path)))
+    return total
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def key(question):
+    return (question['title'], question['text'],
+            tuple((o['text'], o['is_correct'], o['feedback']) for o in question['options']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del parser GIFT')
+    parser.add_argument('-q', '--questions', type=int, default=50000, help='Preguntas sintéticas')
+    parser.add_argument('-f', '--files', type=int, default=100, help='Archivos en que se reparten')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_bank(directory, args.questions, args.files)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"📚 {args.questions} preguntas en {len(paths)} archivos ({size / 1e6:.1f} MB)")
+
+        legacy_time, legacy = best_of(args.repeat, run_legacy, paths)
+        stream_time, stream = best_of(args.repeat, run_streaming, paths)
+        count_time, _ = best_of(args.repeat, count_streaming, paths)
+
+        print(f"  Parser anterior:              {legacy_time:8.2f} s  ({len(legacy)} preguntas)")
+        print(f"  Streaming (lista completa):   {stream_time:8.2f} s  ({len(stream)} preguntas)")
+        print(f"  Streaming (solo recorrer):    {count_time:8.2f} s")
+
+        biggest = [max(paths, key=os.path.getsize)]
+        print("  Memoria máxima por archivo:")
+        print(f"    Parser anterior:            {peak_memory(run_legacy, biggest) / 1e3:8.0f} kB")
+        print(f"    Streaming (solo recorrer):  {peak_memory(count_streaming, biggest) / 1e3:8.0f} kB")
+
+        types = {}
+        for question in stream:
+            types[question['gift_type']] = types.get(question['gift_type'], 0) + 1
+        print("  Tipos detectados: " + ', '.join(f"{name} {count}" for name, count in sorted(types.items())))
+
+        # El parser anterior trata todo bloque {} como alternativas; se comparan solo las que lo son
+        legacy_mc = {key(q) for q in legacy if any(not o['is_correct'] for o in q['options'])}
+        stream_mc = [key(q) for q in stream if q['gift_type'] == 'multichoice']
+        same = sum(1 for item in stream_mc if item in legacy_mc)
+        print(f"  Alternativas idénticas al parser anterior: {same}/{len(stream_mc)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la búsqueda de frases problemáticas
+
+Recorre las opciones de un banco sintético con listas de frases de distinto
+tamaño (el paquete de fábrica más frases de relleno, como un diccionario propio)
+y compara:
+
+  - el bucle anterior: minúsculas y un 'in' por frase hasta la primera
+  - PhraseMatcher con str.find por frase
+  - PhraseMatcher con el autómata de Aho–Corasick
+
+Sirve para fijar AUTOMATON_MIN_PHRASES: con pocas frases gana str.find (en C),
+con muchas gana el autómata (una pasada por texto).
+
+Uso:
+  python3 benchmarks/bench_phrase_matcher.py [-n 20000] [-p 20 64 200 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_question_store import synthetic_questions
+from phrase_matcher import PhraseMatcher, load_language_pack
+
+
+def legacy_first(phrases, text):
+    text_lower = text.lower()
+    for phrase in phrases:
+        if phrase in text_lower:
+            return phrase
+    return None
+
+
+def filler_phrases(count, seed=3):
+    rng = random.Random(seed)
+    words = ['respuesta', 'opción', 'correcta', 'anterior', 'siguiente', 'ninguna', 'todas', 'excepto',
+             'siempre', 'nunca', 'depende', 'ambas', 'solo', 'también', 'falso', 'verdadero']
+    return [' '.join(rng.sample(words, 3)) + f" {number}" for number in range(count)]
+
+
+def timed(func, texts):
+    start = time.perf_counter()
+    result = [func(text) for text in texts]
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la búsqueda de frases problemáticas')
+    parser.add_argument('-n', '--questions', type=int, default=20000, help='Preguntas del banco')
+    parser.add_argument('-p', '--phrases', type=int, nargs='+', default=[20, 64, 200, 2000],
+                        help='Cantidades de frases a probar')
+    args = parser.parse_args()
+
+    pack = load_language_pack('es')
+    rng = random.Random(1)
+    texts = []
+    for question in synthetic_questions(args.questions):
+        for option in question['options']:
+            text = option['text']
+            if rng.random() < 0.05:
+                text += f" ({rng.choice(pack)})"
+            texts.append(text)
+    print(f"📚 {len(texts)} opciones de {args.questions} preguntas")
+
+    for count in args.phrases:
+        phrases = (pack + filler_phrases(max(0, count - len(pack))))[:count]
+        lowered = [phrase.lower() for phrase in phrases]
+        by_find = PhraseMatcher(phrases, automaton=False)
+        by_automaton = PhraseMatcher(phrases, automaton=True)
+
+        legacy_seconds, expected = timed(lambda text: legacy_first(lowered, text), texts)
+        print(f"🔎 {count} frases")
+        print(f"  {'Bucle anterior':24s} {legacy_seconds * 1000:8.1f} ms")
+        for label, matcher in (('str.find por frase', by_find), ('Aho–Corasick', by_automaton)):
+            seconds, hits = timed(matcher.first, texts)
+            same = [hit.phrase if hit else None for hit in hits] == expected
+            print(f"  {label:24s} {seconds * 1000:8.1f} ms  x{legacy_seconds / seconds:5.1f}"
+                  f"{'' if same else '  (resultado distinto)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la edición de preguntas en un banco grande
+
+Compara, sobre un banco sintético, lo que hacía la interfaz antes después de
+cada cambio (reanalizar todas las preguntas y volver a formatear todas las
+filas) contra QuestionStore (reanalizar solo lo cambiado y redibujar sus filas):
+
+  - editar una pregunta
+  - limpieza masiva de un texto poco frecuente (recorrido completo vs índice,
+    con el índice ya armado por una búsqueda anterior)
+
+La lista Tk se reemplaza por una lista de Python para poder medir sin pantalla;
+en la interfaz real cada fila evitada es además una llamada menos a Tk.
+
+Uso:
+  python3 benchmarks/bench_question_store.py [-n 20000] [-r 5]
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_gift_parser import synthetic_question
+from gift_ingest import parse_gift_text
+from question_store import QuestionStore
+
+THRESHOLD = 10
+PROBLEMATIC_PHRASES = ["todas las anteriores", "ninguna de las anteriores", "a y b", "solo a"]
+RARE_TEXT = "(ver figura 3)"
+
+
+def detect_problems(question):
+    """Misma forma de trabajo que detect_question_problems de la interfaz"""
+    problems = []
+    if question['type'] != 'multiple_choice':
+        return problems
+    correct = [opt for opt in question['options'] if opt['is_correct']]
+    incorrect = [opt for opt in question['options'] if not opt['is_correct']]
+    if not correct or not incorrect:
+        return problems
+    average = sum(len(opt['text']) for opt in incorrect) / len(incorrect)
+    if len(correct[0]['text']) - average > THRESHOLD:
+        problems.append("Respuesta correcta más larga")
+    if any(len(opt['text']) < 10 for opt in incorrect):
+        problems.append("Distractores cortos")
+    for option in question['options']:
+        text_lower = option['text'].lower()
+        for phrase in PROBLEMATIC_PHRASES:
+            if phrase in text_lower:
+                problems.append(f"Frase problemática: '{phrase}'")
+                break
+    return problems
+
+
+def format_row(i, question):
+    status = "[!]" if question.get('problems') else "[OK]"
+    text = question['text'][:35] + "..." if len(question['text']) > 35 else question['text']
+    return f"{status} [A] {i+1}. {text} ({question.get('score', 1.0)}pts)"
+
+
+def synthetic_questions(count, seed=1):
+    rng = random.Random(seed)
+    text = '\n\n'.join(synthetic_question(rng, number) for number in range(count))
+    questions = parse_gift_text(text)
+    for question in rng.sample(questions, max(1, count // 200)):
+        question['text'] += f" {RARE_TEXT}"
+    return questions
+
+
+def legacy_after_change(questions, rows):
+    """Antes: reanalizar todo y reconstruir la lista completa"""
+    for question in questions:
+        question['problems'] = detect_problems(question)
+    rows[:] = [format_row(i, question) for i, question in enumerate(questions)]
+
+
+def store_after_change(store, rows):
+    """Ahora: reanalizar las sucias y redibujar solo sus filas"""
+    store.refresh()
+    _, operations, positions = store.take_view_changes()
+    for position in positions:
+        rows[position] = format_row(position, store[position])
+    return len(positions)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del almacén de preguntas')
+    parser.add_argument('-n', '--questions', type=int, default=20000, help='Preguntas del banco')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    questions = synthetic_questions(args.questions)
+    legacy = copy.deepcopy(questions)
+    legacy_rows = []
+    legacy_after_change(legacy, legacy_rows)
+
+    start = time.perf_counter()
+    store = QuestionStore(questions, analyzer=detect_problems)
+    store.refresh()
+    store.take_view_changes()
+    rows = [format_row(i, question) for i, question in enumerate(store)]
+    print(f"📚 {len(store)} preguntas; carga inicial: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # El índice se arma en la primera búsqueda; se mide aparte para no cargárselo a la limpieza
+    start = time.perf_counter()
+    store.update_index()
+    print(f"🗂️  Índice de palabras ({len(store.index)} palabras, una sola vez): "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(2)
+
+    def legacy_edit():
+        question = legacy[rng.randrange(len(legacy))]
+        question['text'] += "."
+        legacy_after_change(legacy, legacy_rows)
+        return len(legacy_rows)
+
+    def store_edit():
+        question = store[rng.randrange(len(store))]
+        question['text'] += "."
+        store.mark_changed(question)
+        return store_after_change(store, rows)
+
+    print("✏️  Editar una pregunta")
+    for label, func in (('Antes (todo)', legacy_edit), ('QuestionStore', store_edit)):
+        seconds, redrawn = best_of(args.repeat, func)
+        print(f"  {label:16s} {seconds * 1000:9.2f} ms  {redrawn:6d} filas")
+
+    def legacy_cleanup():
+        for question in legacy:
+            if RARE_TEXT in question['text']:
+                question['text'] = question['text'].replace(RARE_TEXT, '')
+        legacy_after_change(legacy, legacy_rows)
+        return len(legacy_rows)
+
+    def store_cleanup():
+        for question in store.candidates(RARE_TEXT):
+            if RARE_TEXT in question['text']:
+                question['text'] = question['text'].replace(RARE_TEXT, '')
+                store.mark_changed(question)
+        return store_after_change(store, rows)
+
+    print(f"🧹 Limpieza masiva de {RARE_TEXT!r}")
+    for label, func in (('Antes (todo)', legacy_cleanup), ('QuestionStore', store_cleanup)):
+        seconds, redrawn = best_of(1, func)
+        print(f"  {label:16s} {seconds * 1000:9.2f} ms  {redrawn:6d} filas")
+
+    same = rows == [format_row(i, question) for i, question in enumerate(store)]
+    print(f"{'✅' if same else '❌'} Filas incrementales iguales a una reconstrucción completa")
+
+
+if __name__ == "__main__":
+    main()
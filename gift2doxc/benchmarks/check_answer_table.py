@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Comprobación de la tabla de la hoja de respuestas contra archivos de referencia
+
+docx_render.add_answer_table arma el XML de la tabla de una sola vez. Este
+script genera la tabla de varios casos fijos (examen y respuestas, cantidad par
+e impar de preguntas, hasta 8 opciones, otros tamaños de página) y compara el
+XML con los archivos de golden/answer_table/. Termina con código 1 si alguno
+difiere.
+
+Los archivos de referencia se generan con --update usando reference_table, que
+arma la tabla celda por celda con python-docx como la versión anterior (con un
+sombreado propio por celda). También mide ambos métodos con un examen grande.
+
+Uso:
+  python3 benchmarks/check_answer_table.py [--update] [-n 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.shared import Inches
+from lxml import etree
+
+from docx_render import OPTION_CHARS, add_answer_table, make_settings, max_option_count, setup_document
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'answer_table')
+
+# nombre -> (preguntas, opciones como máximo, con claves, tamaño de página)
+CASES = {
+    'examen_impar': (7, 5, False, "A4"),
+    'respuestas_impar': (7, 5, True, "A4"),
+    'examen_una': (1, 4, False, "A4"),
+    'respuestas_una': (1, 4, True, "A4"),
+    'examen_ocho_opciones': (12, 8, False, "Legal"),
+    'respuestas_ocho_opciones': (12, 8, True, "Legal"),
+    'respuestas_carta': (40, 4, True, "Carta (Letter)"),
+}
+
+
+def case_questions(count, max_options, seed=7):
+    """Preguntas fijas de un caso: alternativas de 2 a max_options opciones, desarrollo y otras"""
+    rng = random.Random(seed)
+    questions = []
+    for number in range(1, count + 1):
+        kind = ('multiple_choice', 'multiple_choice', 'multiple_choice', 'essay', 'short_answer')[number % 5]
+        options = []
+        if kind == 'multiple_choice':
+            options = [{'text': f"opción {i}", 'is_correct': i == 0, 'feedback': ''}
+                       for i in range(rng.randint(2, max_options))]
+        questions.append({'text': f"Pregunta {number}", 'type': kind, 'options': options})
+    if count > 1:
+        # Al menos una pregunta con todas las opciones, para fijar el ancho de la tabla
+        questions[0] = {'text': "Pregunta 1", 'type': 'multiple_choice',
+                        'options': [{'text': f"opción {i}", 'is_correct': i == 0, 'feedback': ''}
+                                    for i in range(max_options)]}
+    return questions
+
+
+def case_keys(questions):
+    """Claves fijas; alguna fuera de rango ('x') como las que deja una correcta sin letra"""
+    keys = {}
+    for number, question in enumerate(questions, 1):
+        if question['type'] == 'multiple_choice':
+            keys[number] = 'x' if number % 11 == 0 else OPTION_CHARS[(number * 3) % len(question['options'])]
+    return keys
+
+
+def reference_table(doc, questions, max_options, answer_keys=None):
+    """Tabla armada celda por celda con python-docx (referencia)"""
+    num_questions = len(questions)
+    rows_per_column = (num_questions + 1) // 2
+    cols_per_group = max_options + 1
+
+    table = doc.add_table(rows=rows_per_column + 1, cols=cols_per_group * 2)
+    table.style = 'Table Grid'
+
+    header_groups = [0, cols_per_group] if num_questions > rows_per_column else [0]
+    for offset in header_groups:
+        table.cell(0, offset).text = "Preg"
+        for i in range(max_options):
+            table.cell(0, offset + i + 1).text = chr(65 + i)
+
+    for i, question in enumerate(questions):
+        q_num = i + 1
+        row_idx = (i % rows_per_column) + 1
+        offset = 0 if i < rows_per_column else cols_per_group
+        table.cell(row_idx, offset).text = str(q_num)
+
+        visible = ()
+        if question['type'] == 'multiple_choice':
+            num_options = len(question['options'])
+            if answer_keys is None:
+                visible = range(num_options)
+            else:
+                correct_index = ord(answer_keys.get(q_num, 'X').upper()) - ord('A')
+                visible = (correct_index,) if correct_index < num_options else ()
+
+        for j in range(1, max_options + 1):
+            if j - 1 in visible:
+                if answer_keys is not None:
+                    table.cell(row_idx, offset + j).text = answer_keys[q_num].upper()
+                continue
+            cell = table.cell(row_idx, offset + j)
+            cell._element.get_or_add_tcPr().append(parse_xml(f'<w:shd {nsdecls("w")} w:fill="000000"/>'))
+            cell.text = ""
+
+    for cell in table.columns[0].cells:
+        cell.width = Inches(0.5)
+    for cell in table.columns[cols_per_group].cells:
+        cell.width = Inches(0.5)
+    return table
+
+
+def table_xml(builder, name):
+    count, max_options, with_keys, page_size = CASES[name]
+    questions = case_questions(count, max_options)
+    doc = setup_document(make_settings(page_size=page_size))
+    builder(doc, questions, max_option_count(questions), case_keys(questions) if with_keys else None)
+    tbl = doc.element.body.findall(qn('w:tbl'))[-1]
+    return etree.tostring(tbl, encoding='unicode', pretty_print=True)
+
+
+def timing(count, repeat=3):
+    """Mejor tiempo de cada método (la referencia, que tarda segundos, se mide una vez)"""
+    questions = case_questions(count, 5)
+    keys = case_keys(questions)
+    results = []
+    for builder, times in ((reference_table, 1), (add_answer_table, repeat)):
+        best = float('inf')
+        for _ in range(times):
+            doc = setup_document(make_settings())
+            start = time.perf_counter()
+            builder(doc, questions, 5, keys)
+            best = min(best, time.perf_counter() - start)
+        results.append(best)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comprobar la tabla de respuestas contra los archivos de referencia')
+    parser.add_argument('--update', action='store_true', help='Regenerar los archivos de referencia con reference_table')
+    parser.add_argument('-n', '--questions', type=int, default=200, help='Preguntas del examen para medir tiempos')
+    args = parser.parse_args()
+
+    if args.update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        for name in CASES:
+            with open(os.path.join(GOLDEN_DIR, f"{name}.xml"), 'w', encoding='utf-8') as f:
+                f.write(table_xml(reference_table, name))
+        print(f"📝 {len(CASES)} archivos de referencia en {GOLDEN_DIR}")
+        return 0
+
+    failed = 0
+    for name in CASES:
+        with open(os.path.join(GOLDEN_DIR, f"{name}.xml"), 'r', encoding='utf-8') as f:
+            expected = f.read()
+        same = table_xml(add_answer_table, name) == expected
+        failed += not same
+        print(f"{'✅' if same else '❌'} {name}")
+
+    if args.questions:
+        reference, fast = timing(args.questions)
+        print(f"⏱️  {args.questions} preguntas x 5 opciones: celda por celda {reference * 1000:.0f} ms,"
+              f" XML directo {fast * 1000:.1f} ms (x{reference / fast:.0f})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Normalización de caracteres especiales por tabla
+
+La tabla es un JSON editable (char_map.json junto a este módulo, o el archivo
+que se indique) con reemplazos agrupados por tema:
+
+    {"flechas": {"⟶": "→"}, "comillas": {"\\u201c": "\\""}}
+
+También se acepta un objeto plano {"⟶": "→", ...}. Al compilarla se descartan
+las entradas que no cambian nada.
+
+El texto se recorre una vez por entrada con str.find (búsqueda en C) para ubicar
+las coincidencias y se arma el resultado con un único join, así que el texto se
+copia una sola vez aunque haya muchas entradas con coincidencias. Los reemplazos
+son simultáneos (un destino no vuelve a reemplazarse) y ante secuencias solapadas
+gana la que empieza antes y, a igual inicio, la más larga. str.translate y una
+regex de alternativas recorren el texto carácter a carácter y en CPython resultan
+más lentos (ver benchmarks/bench_char_normalizer.py).
+"""
+
+import functools
+import json
+import os
+
+DEFAULT_CHAR_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'char_map.json')
+
+
+class CharMapError(ValueError):
+    """Tabla de caracteres inválida o ilegible"""
+
+
+def parse_char_map(data, source='tabla'):
+    """Aplana y valida la tabla: {grupo: {origen: destino}} o {origen: destino}"""
+    if not isinstance(data, dict):
+        raise CharMapError(f"{source}: se espera un objeto JSON")
+
+    mapping = {}
+    for key, value in data.items():
+        entries = value.items() if isinstance(value, dict) else [(key, value)]
+        for old, new in entries:
+            if not isinstance(new, str) or not isinstance(old, str) or not old:
+                raise CharMapError(f"{source}: reemplazo inválido {old!r} -> {new!r}")
+            mapping[old] = new
+    return mapping
+
+
+def load_char_map(path=DEFAULT_CHAR_MAP):
+    """Lee la tabla de reemplazos de un archivo JSON"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError as e:
+        raise CharMapError(f"No se pudo leer {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise CharMapError(f"JSON inválido en {path}: {e}")
+    return parse_char_map(data, path)
+
+
+class CharNormalizer:
+    """Aplica una tabla de reemplazos ya compilada"""
+
+    def __init__(self, mapping):
+        effective = [(old, new) for old, new in mapping.items() if old != new]
+        # sorted es estable: a igual largo se conserva el orden del archivo
+        self.replacements = sorted(effective, key=lambda item: -len(item[0]))
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CHAR_MAP):
+        return cls(load_char_map(path))
+
+    def __call__(self, text):
+        find = text.find
+        hits = []  # (inicio, -largo, destino): al ordenar, a igual inicio va primero la más larga
+        for old, new in self.replacements:
+            start = find(old)
+            while start != -1:
+                hits.append((start, -len(old), new))
+                start = find(old, start + len(old))
+        if not hits:
+            return text
+
+        hits.sort()
+        parts = []
+        position = 0
+        for start, negative_length, new in hits:
+            if start < position:
+                continue  # Solapada con una coincidencia ya reemplazada
+            parts.append(text[position:start])
+            parts.append(new)
+            position = start - negative_length
+        parts.append(text[position:])
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def get_normalizer(path=None):
+    """Normalizador de un archivo, compilado una vez por proceso"""
+    return CharNormalizer.from_file(path or DEFAULT_CHAR_MAP)
@@ -0,0 +1,290 @@
+"""
+Limpieza masiva con muchas reglas en una sola pasada
+
+Cada regla reemplaza un texto literal o una expresión regular. Todas las reglas
+se combinan en un único patrón compilado, (?P<r0>...)|(?P<r1>...)|..., y cada
+campo (texto, opciones y retroalimentación) se reemplaza en una sola pasada: en
+una misma posición gana la regla que va antes en la lista y una regla no vuelve
+a procesar lo que dejó otra.
+
+Buscar con el patrón combinado obliga a re a probar todas las alternativas en
+cada posición, así que para descartar los campos sin nada que limpiar (la gran
+mayoría) se usan sondas rápidas: 'in' para los literales y la regex propia de
+cada regla. Solo los campos con alguna coincidencia pasan por el patrón
+combinado (ver benchmarks/bench_cleanup_engine.py).
+
+La limpieza trabaja en dos tiempos:
+
+  1. preview/CleanupJob calculan los cambios sin tocar nada (vista previa)
+     y devuelven, por campo, el texto anterior, el nuevo y un diff
+  2. CleanupJournal.apply escribe esos cambios y los guarda para deshacerlos
+
+CleanupJob avanza por tramos de unos milisegundos para que la interfaz Tk lo
+llame con root.after sin bloquearse.
+
+Las reglas también pueden venir de un archivo JSON:
+
+    [{"buscar": "[html]"}, {"buscar": "\\\\s+$", "regex": true},
+     {"buscar": "Moodle", "reemplazar": "", "ignorar_mayusculas": true}]
+"""
+
+import difflib
+import json
+import re
+import time
+
+# Tiempo máximo de cada tramo de CleanupJob (la interfaz sigue respondiendo entre tramos)
+STEP_SECONDS = 0.02
+# Cada cuántas preguntas se mira el reloj dentro de un tramo
+CLOCK_EVERY = 256
+
+
+class CleanupError(ValueError):
+    """Regla de limpieza inválida"""
+
+
+class CleanupRule:
+    """Un reemplazo: texto literal o expresión regular"""
+
+    def __init__(self, pattern, replacement='', regex=False, ignore_case=False):
+        if not isinstance(pattern, str) or not pattern:
+            raise CleanupError("La regla no tiene texto a buscar")
+        if not isinstance(replacement, str):
+            raise CleanupError(f"Reemplazo inválido para {pattern!r}")
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = regex
+        self.ignore_case = ignore_case
+
+        source = pattern if regex else re.escape(pattern)
+        try:
+            self.compiled = re.compile(source, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise CleanupError(f"Expresión regular inválida {pattern!r}: {e}")
+        if regex and re.search(r'\\[1-9]|\(\?P=', pattern):
+            # Al combinar las reglas los grupos se renumeran y la referencia apuntaría a otro grupo
+            raise CleanupError(f"{pattern!r}: las referencias a grupos dentro del patrón no se pueden combinar")
+        # Solo las regex con \1, \g<nombre>... en el reemplazo necesitan expandir grupos
+        self.template = regex and '\\' in replacement
+        self.source = f"(?i:{source})" if ignore_case else source
+
+    def __repr__(self):
+        kind = 'regex' if self.regex else 'literal'
+        return f"CleanupRule({self.pattern!r} -> {self.replacement!r}, {kind})"
+
+
+def parse_rules(data, source='reglas'):
+    """Reglas desde JSON: lista de textos (literales) u objetos {"buscar", "reemplazar", "regex", "ignorar_mayusculas"}"""
+    if not isinstance(data, list):
+        raise CleanupError(f"{source}: se espera una lista de reglas")
+    rules = []
+    for item in data:
+        if isinstance(item, str):
+            rules.append(CleanupRule(item))
+        elif isinstance(item, dict) and 'buscar' in item:
+            rules.append(CleanupRule(item['buscar'], item.get('reemplazar', ''),
+                                     bool(item.get('regex')), bool(item.get('ignorar_mayusculas'))))
+        else:
+            raise CleanupError(f"{source}: regla inválida {item!r}")
+    return rules
+
+
+def load_rules(path):
+    """Lee reglas de limpieza de un archivo JSON"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError as e:
+        raise CleanupError(f"No se pudo leer {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise CleanupError(f"JSON inválido en {path}: {e}")
+    return parse_rules(data, path)
+
+
+def question_fields(question):
+    """Campos de texto limpiables: (ruta, valor)"""
+    yield ('text',), question.get('text') or ''
+    for i, option in enumerate(question.get('options') or ()):
+        yield ('options', i, 'text'), option.get('text') or ''
+        if option.get('feedback'):
+            yield ('options', i, 'feedback'), option['feedback']
+
+
+def get_field(question, path):
+    value = question
+    for key in path:
+        value = value[key]
+    return value
+
+
+def set_field(question, path, value):
+    target = question
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+
+
+class CleanupChange:
+    """Un campo de una pregunta antes y después de limpiar"""
+
+    def __init__(self, question, path, before, after):
+        self.question = question
+        self.question_id = question.get('id')
+        self.path = path
+        self.before = before
+        self.after = after
+
+    @property
+    def label(self):
+        if self.path == ('text',):
+            return "texto"
+        letter = chr(65 + self.path[1])
+        return f"opción {letter}" if self.path[2] == 'text' else f"retroalimentación {letter}"
+
+    def diff(self):
+        """Diff en línea: [-quitado-]{+agregado+}"""
+        parts = []
+        matcher = difflib.SequenceMatcher(None, self.before, self.after, autojunk=False)
+        for operation, a1, a2, b1, b2 in matcher.get_opcodes():
+            if operation == 'equal':
+                parts.append(self.before[a1:a2])
+                continue
+            if a2 > a1:
+                parts.append(f"[-{self.before[a1:a2]}-]")
+            if b2 > b1:
+                parts.append(f"{{+{self.after[b1:b2]}+}}")
+        return ''.join(parts)
+
+    def __repr__(self):
+        return f"CleanupChange({self.question_id}, {self.label}, {self.diff()!r})"
+
+
+class CleanupEngine:
+    """Aplica una lista de reglas con un único patrón combinado"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        if not self.rules:
+            raise CleanupError("No hay reglas de limpieza")
+        combined = '|'.join(f"(?P<r{i}>{rule.source})" for i, rule in enumerate(self.rules))
+        try:
+            self.pattern = re.compile(combined)
+        except re.error as e:
+            raise CleanupError(f"No se pudieron combinar las reglas: {e}")
+        self.literal = all(not rule.regex for rule in self.rules)
+        # Sondas para descartar rápido los campos sin coincidencias: 'in' para los literales
+        # y la regex propia de cada regla, que conserva la búsqueda por prefijo de re
+        self.literals = [rule.pattern for rule in self.rules if not rule.regex and not rule.ignore_case]
+        self.searches = [rule.compiled.search for rule in self.rules if rule.regex or rule.ignore_case]
+
+    def _replacement(self, match):
+        # El grupo rN envuelve a los grupos de la regla y cierra último: lastgroup es la regla
+        rule = self.rules[int(match.lastgroup[1:])]
+        if rule.template:
+            return rule.compiled.match(match.string, match.start()).expand(rule.replacement)
+        return rule.replacement
+
+    def clean(self, text):
+        """Texto con todas las reglas aplicadas"""
+        return self.pattern.sub(self._replacement, text)
+
+    def matches(self, text):
+        """Si alguna regla encuentra algo en el texto"""
+        for literal in self.literals:
+            if literal in text:
+                return True
+        for search in self.searches:
+            if search(text):
+                return True
+        return False
+
+    def changes(self, question):
+        """Cambios que la limpieza haría en una pregunta (sin aplicarlos)"""
+        found = []
+        matches = self.matches
+        for path, value in question_fields(question):
+            if matches(value):
+                cleaned = self.clean(value)
+                if cleaned != value:
+                    found.append(CleanupChange(question, path, value, cleaned))
+        return found
+
+    def preview(self, questions):
+        """Vista previa completa, de una vez (sin repartir en tramos)"""
+        job = CleanupJob(self, questions)
+        job.run()
+        return job.changes
+
+
+class CleanupJob:
+    """Vista previa de la limpieza por tramos, para no bloquear la interfaz"""
+
+    def __init__(self, engine, questions):
+        self.engine = engine
+        self.questions = list(questions)
+        self.position = 0
+        self.changes = []
+
+    @property
+    def total(self):
+        return len(self.questions)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.questions)
+
+    def step(self, seconds=STEP_SECONDS):
+        """Avanzar hasta agotar el tiempo (None: hasta el final); True si terminó"""
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        changes = self.engine.changes
+        questions = self.questions
+        while self.position < len(questions):
+            stop = min(self.position + CLOCK_EVERY, len(questions))
+            for question in questions[self.position:stop]:
+                self.changes.extend(changes(question))
+            self.position = stop
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.finished
+
+    def run(self):
+        self.step(None)
+        return self.changes
+
+
+class CleanupJournal:
+    """Limpiezas aplicadas, para deshacerlas en orden inverso"""
+
+    def __init__(self):
+        self.entries = []  # (descripción, cambios)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def apply(self, changes, description=""):
+        """Escribir los cambios; los que ya no coinciden con lo previsto se saltan"""
+        applied = []
+        for change in changes:
+            if get_field(change.question, change.path) == change.before:
+                set_field(change.question, change.path, change.after)
+                applied.append(change)
+        if applied:
+            self.entries.append((description, applied))
+        return applied
+
+    def undo(self):
+        """Deshacer la última limpieza: (descripción, restaurados, en conflicto)
+
+        Un campo editado después de la limpieza no se pisa: queda en conflicto.
+        """
+        if not self.entries:
+            return None, [], []
+        description, changes = self.entries.pop()
+        restored, conflicts = [], []
+        for change in reversed(changes):
+            if get_field(change.question, change.path) == change.after:
+                set_field(change.question, change.path, change.before)
+                restored.append(change)
+            else:
+                conflicts.append(change)
+        return description, restored, conflicts
@@ -0,0 +1,545 @@
+"""
+Armado de los documentos DOCX del examen y de las respuestas
+
+No depende de Tk: recibe las preguntas, un diccionario de configuración (los
+valores del Paso 4) y un random.Random. Con la misma semilla se obtiene el mismo
+orden de opciones y la misma clave, así que cada forma del examen se puede
+generar en otro proceso (ver exam_variants.py).
+
+La parte común de cada documento (página, márgenes, estilos y encabezado) se
+arma una sola vez por configuración y se guarda como esqueleto; cada documento
+nuevo es una copia a nivel XML de ese esqueleto (copy.deepcopy), en la que solo
+se completa lo que cambia, como la forma. Los estilos quedan fijados en el
+esqueleto, así que los párrafos no vuelven a buscar su estilo uno por uno (ver
+benchmarks/bench_docx_template.py).
+"""
+
+import copy
+import random
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Emu, Inches, Pt
+from docx.table import Table
+
+from answer_keys import DEFAULT_MAX_RUN, OPTION_CHARS, KeyStats, plan_answer_keys
+
+PAGE_SIZES = {
+    "A4": (8.27, 11.69),
+    "Carta (Letter)": (8.5, 11),
+    "Legal": (8.5, 14),
+    "A3": (11.69, 16.54),
+}
+
+# Mismos valores iniciales que el Paso 4 de la interfaz
+DEFAULT_SETTINGS = {
+    'exam_title': "EXAMEN",
+    'answer_sheet_title': "HOJA DE RESPUESTAS",
+    'institution_name': "",
+    'course_name': "",
+    'exam_date': "",
+    'variant_label': "",          # p. ej. "Forma 03"; vacío en un examen único
+    'show_student_name': True,
+    'show_student_id': True,
+    'show_student_section': False,
+    'show_exam_score': True,
+    'title_font_size': 16,
+    'question_font_size': 11,
+    'font_name': "Arial",
+    'page_size': "A4",
+    'margin_top': 2.5,
+    'margin_bottom': 2.5,
+    'margin_left': 2.5,
+    'margin_right': 2.5,
+    'show_statistics': True,
+    'show_detailed_info': True,
+    'show_file_info': True,
+    'randomize_options': True,
+    'max_run': DEFAULT_MAX_RUN,   # máximo de letras correctas iguales seguidas (0: sin límite)
+    'source_files': [],           # nombres de los archivos GIFT de origen
+}
+
+# Nombre de cada tipo de pregunta en los documentos y en la interfaz
+TYPE_NAMES = {
+    'multiple_choice': "Alternativas",
+    'essay': "Desarrollo",
+    'short_answer': "Respuesta corta",
+    'numerical': "Numérica",
+    'matching': "Emparejamiento",
+}
+# Tipos que el estudiante responde escribiendo una respuesta breve
+WRITTEN_TYPES = ('short_answer', 'numerical')
+
+# Campos de una pregunta que se usan para generar los documentos
+QUESTION_KEYS = ('title', 'text', 'type', 'lines', 'score', 'source_file')
+
+# Configuración que define el esqueleto de un documento (la forma se completa en cada copia)
+TEMPLATE_KEYS = ('page_size', 'margin_top', 'margin_bottom', 'margin_left', 'margin_right', 'font_name',
+                 'title_font_size', 'question_font_size', 'institution_name', 'course_name', 'exam_date')
+# Esqueletos guardados como máximo (cada uno es un documento completo en memoria)
+TEMPLATE_CACHE_SIZE = 8
+# Texto provisional del párrafo de la forma dentro del esqueleto
+VARIANT_PLACEHOLDER = "Forma"
+
+# Sombreado de las celdas sin respuesta en la hoja de respuestas
+SHADING_BLACK_XML = '<w:shd w:fill="000000"/>'
+
+_template_cache = {}  # clave -> (documento esqueleto, índice del párrafo de la forma)
+
+
+def plain_question(question):
+    """Copia sin los widgets y variables Tk que el editor guarda en la pregunta"""
+    plain = {key: question[key] for key in QUESTION_KEYS if key in question}
+    plain['options'] = [{'text': option['text'], 'is_correct': option['is_correct'],
+                         'feedback': option.get('feedback', '')}
+                        for option in question.get('options') or ()]
+    for plain_option, option in zip(plain['options'], question.get('options') or ()):
+        if 'match' in option:
+            plain_option['match'] = option['match']
+    return plain
+
+
+def answer_text(question, option):
+    """Respuesta aceptada como se imprime: los rangos numéricos 2:0.5 y 1..3 en palabras"""
+    text = option['text']
+    if question['type'] == 'numerical':
+        if ':' in text:
+            value, tolerance = text.split(':', 1)
+            return f"{value.strip()} ± {tolerance.strip()}"
+        if '..' in text:
+            low, high = text.split('..', 1)
+            return f"entre {low.strip()} y {high.strip()}"
+    return text
+
+
+def matching_choices(question):
+    """Respuestas de la columna derecha de un emparejamiento, sin repetir"""
+    return list(dict.fromkeys(option['match'] for option in question['options'] if option.get('match')))
+
+
+def make_settings(**values):
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(values)
+    return settings
+
+
+def total_score(questions):
+    """Calcular puntaje total del examen"""
+    if not questions:
+        return 0
+    total = sum(question.get('score', 1.0) for question in questions)
+    return int(total) if total == int(total) else total
+
+
+def arrange_options(questions, answer_keys, randomize, rng):
+    """Orden de las opciones de cada pregunta; ajusta answer_keys a ese orden
+
+    Con randomize la correcta va en la letra planificada y las demás se mezclan.
+    Sin randomize se respeta el orden original y la clave es la letra real de la
+    correcta. En los emparejamientos se ordena (o mezcla) la columna derecha.
+    """
+    arranged = {}
+    for q_num, question in enumerate(questions, 1):
+        if question['type'] == 'matching':
+            # Emparejamiento: se ordena la columna derecha
+            choices = matching_choices(question)
+            if randomize:
+                rng.shuffle(choices)
+            arranged[q_num] = choices
+            continue
+        if question['type'] != 'multiple_choice':
+            continue
+        options = list(question['options'])
+        correct_option = next((opt for opt in options if opt['is_correct']), None)
+
+        if randomize and correct_option and q_num in answer_keys:
+            target_position = ord(answer_keys[q_num]) - ord('a')
+            options.remove(correct_option)
+            rng.shuffle(options)
+            options.insert(min(target_position, len(options)), correct_option)
+        elif correct_option:
+            position = options.index(correct_option)
+            answer_keys[q_num] = OPTION_CHARS[position] if position < len(OPTION_CHARS) else 'x'
+        arranged[q_num] = options
+    return arranged
+
+
+def setup_document(settings):
+    """Documento vacío con página, márgenes y fuente configurados"""
+    doc = Document()
+    section = doc.sections[0]
+
+    if settings['page_size'] in PAGE_SIZES:
+        width, height = PAGE_SIZES[settings['page_size']]
+        section.page_width = Inches(width)
+        section.page_height = Inches(height)
+
+    # Configurar márgenes (convertir cm a inches: cm * 0.393701)
+    section.top_margin = Inches(settings['margin_top'] * 0.393701)
+    section.bottom_margin = Inches(settings['margin_bottom'] * 0.393701)
+    section.left_margin = Inches(settings['margin_left'] * 0.393701)
+    section.right_margin = Inches(settings['margin_right'] * 0.393701)
+
+    style = doc.styles['Normal']
+    style.font.name = settings['font_name']
+    style.font.size = Pt(settings['question_font_size'])
+    return doc
+
+
+def template_key(settings, title_text, headings=False):
+    return tuple(settings[key] for key in TEMPLATE_KEYS) + (bool(settings['variant_label']), title_text, headings)
+
+
+def new_document(settings, title_text, headings=False):
+    """Documento con página, estilos y encabezado listos, copiado de un esqueleto en caché
+
+    Con headings también queda fijada la fuente de los títulos de nivel 2.
+    """
+    key = template_key(settings, title_text, headings)
+    cached = _template_cache.get(key)
+    if cached is None:
+        skeleton = setup_document(settings)
+        if headings:
+            skeleton.styles['Heading 2'].font.name = settings['font_name']
+        variant_index = None
+        if settings['variant_label']:
+            # El párrafo de la forma se arma con un texto provisional y se completa en cada copia
+            variant_index = 2 if settings['institution_name'] else 1
+            add_header(skeleton, dict(settings, variant_label=VARIANT_PLACEHOLDER), title_text)
+        else:
+            add_header(skeleton, settings, title_text)
+        if len(_template_cache) >= TEMPLATE_CACHE_SIZE:
+            _template_cache.pop(next(iter(_template_cache)))
+        cached = _template_cache[key] = (skeleton, variant_index)
+
+    skeleton, variant_index = cached
+    # Se copia el paquete completo (cada parte tiene su propio XML) y no el objeto Document,
+    # que comparte el XML del cuerpo con su parte y quedaría copiado dos veces
+    doc = copy.deepcopy(skeleton.part.package).main_document_part.document
+    if variant_index is not None:
+        doc.paragraphs[variant_index].runs[0].text = settings['variant_label']
+    return doc
+
+
+def add_header(doc, settings, title_text):
+    """Institución, título, forma y curso/fecha"""
+    font_name = settings['font_name']
+
+    if settings['institution_name']:
+        institution_p = doc.add_paragraph()
+        institution_run = institution_p.add_run(settings['institution_name'])
+        institution_run.font.name = font_name
+        institution_run.font.size = Pt(settings['title_font_size'] - 2)
+        institution_run.bold = True
+        institution_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    title = doc.add_paragraph()
+    title_run = title.add_run(title_text)
+    title_run.font.name = font_name
+    title_run.font.size = Pt(settings['title_font_size'])
+    title_run.bold = True
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    if settings['variant_label']:
+        variant_p = doc.add_paragraph()
+        variant_run = variant_p.add_run(settings['variant_label'])
+        variant_run.font.name = font_name
+        variant_run.font.size = Pt(settings['question_font_size'] + 1)
+        variant_run.bold = True
+        variant_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    if settings['course_name'] or settings['exam_date']:
+        info_p = doc.add_paragraph()
+        info_text = []
+        if settings['course_name']:
+            info_text.append(f"Curso: {settings['course_name']}")
+        if settings['exam_date']:
+            info_text.append(f"Fecha: {settings['exam_date']}")
+
+        info_run = info_p.add_run(" | ".join(info_text))
+        info_run.font.name = font_name
+        info_run.font.size = Pt(settings['question_font_size'])
+        info_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph()
+
+
+def student_fields(questions, settings):
+    fields = []
+    if settings['show_student_name']:
+        fields.append("Nombre: ________________________________")
+    if settings['show_student_id']:
+        fields.append("RUT/ID: ________________________________")
+    if settings['show_student_section']:
+        fields.append("Sección: ________________________________")
+    if settings['show_exam_score']:
+        fields.append(f"Puntaje: ______ / {total_score(questions)}")
+    return fields
+
+
+def max_option_count(questions, default=4):
+    counts = [len(q['options']) for q in questions if q['type'] == 'multiple_choice' and q['options']]
+    return max(counts, default=default)
+
+
+def _cell_xml(width, content='<w:p/>', shading=''):
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{shading}</w:tcPr>{content}</w:tc>'
+
+
+def _text_xml(text):
+    # Lo mismo que deja cell.text de python-docx: un párrafo con una corrida (vacía si no hay texto)
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' if text else '<w:p><w:r/></w:p>'
+
+
+def add_answer_table(doc, questions, max_options, answer_keys=None):
+    """Tabla de la hoja de respuestas en dos bloques de columnas
+
+    Sin answer_keys (examen) se sombrean las opciones que la pregunta no tiene;
+    con answer_keys (respuestas) queda visible solo la letra correcta.
+
+    El XML de la tabla se arma como texto, con las celdas repetidas calculadas
+    una sola vez, y se inserta de una vez: el mismo resultado que doc.add_table
+    y cell.text celda por celda, sin crear objetos de python-docx por celda (ver
+    benchmarks/check_answer_table.py).
+    """
+    num_questions = len(questions)
+    rows_per_column = (num_questions + 1) // 2
+
+    cols_per_group = max_options + 1
+    total_cols = cols_per_group * 2
+
+    # Mismo ancho de columna que doc.add_table: el espacio entre márgenes repartido en partes iguales
+    section = doc.sections[-1]
+    block_width = ((section.page_width or Inches(8.5)) - (section.left_margin or Inches(1))
+                   - (section.right_margin or Inches(1)))
+    col_width = Emu(block_width // total_cols).twips
+    number_width = Inches(0.5).twips  # Columnas "Preg" más angostas
+
+    empty_cell = _cell_xml(col_width)
+    shaded_cell = _cell_xml(col_width, _text_xml(""), SHADING_BLACK_XML)
+    letter_cells = [_cell_xml(col_width, _text_xml(chr(65 + i))) for i in range(max_options)]
+
+    # Encabezados
+    header = []
+    for offset in (0, cols_per_group):
+        if offset == 0 or num_questions > rows_per_column:
+            header.append(_cell_xml(number_width, _text_xml("Preg")))
+            header.extend(letter_cells)
+        else:
+            header.append(_cell_xml(number_width))
+            header.extend([empty_cell] * max_options)
+    rows = [header] + [[_cell_xml(number_width)] + [empty_cell] * max_options
+                       + [_cell_xml(number_width)] + [empty_cell] * max_options
+                       for _ in range(rows_per_column)]
+
+    # Llenar la tabla
+    for i, question in enumerate(questions):
+        q_num = i + 1
+        row = rows[(i % rows_per_column) + 1]
+        offset = 0 if i < rows_per_column else cols_per_group  # Primera o segunda columna
+
+        row[offset] = _cell_xml(number_width, _text_xml(str(q_num)))
+
+        # Celdas que quedan sin sombrear; desarrollo y otros tipos: todas negras
+        visible = ()
+        if question['type'] == 'multiple_choice':
+            num_options = len(question['options'])
+            if answer_keys is None:
+                visible = range(num_options)
+            else:
+                correct_index = ord(answer_keys.get(q_num, 'X').upper()) - ord('A')
+                visible = (correct_index,) if correct_index < num_options else ()
+
+        for j in range(1, max_options + 1):
+            option_index = j - 1
+            if option_index in visible:
+                if answer_keys is not None:
+                    row[offset + j] = _cell_xml(col_width, _text_xml(answer_keys[q_num].upper()))
+                continue
+            row[offset + j] = shaded_cell
+
+    style_id = doc.part.get_style_id('Table Grid', WD_STYLE_TYPE.TABLE)
+    table_style = f'<w:tblStyle w:val="{style_id}"/>' if style_id else ''
+    grid = f'<w:gridCol w:w="{col_width}"/>' * total_cols
+    tbl = parse_xml(
+        f'<w:tbl {nsdecls("w")}><w:tblPr>{table_style}<w:tblW w:type="auto" w:w="0"/>'
+        f'<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0"'
+        f' w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>{grid}</w:tblGrid>'
+        + ''.join(f"<w:tr>{''.join(row)}</w:tr>" for row in rows)
+        + '</w:tbl>'
+    )
+    doc.element.body._insert_tbl(tbl)
+    return Table(tbl, doc)
+
+
+def build_exam_document(questions, settings, arranged):
+    """Documento del examen con las opciones en el orden de arranged"""
+    # Los párrafos usan el estilo Normal, que el esqueleto ya trae con la fuente y el tamaño
+    doc = new_document(settings, settings['exam_title'])
+    font_name = settings['font_name']
+
+    # Información del estudiante (solo campos habilitados)
+    fields = student_fields(questions, settings)
+    for field in fields:
+        doc.add_paragraph(field)
+
+    doc.add_paragraph()
+
+    # Preguntas
+    for i, question in enumerate(questions, 1):
+        doc.add_paragraph(f"{i}. {question['text']}")
+
+        if question['type'] == 'multiple_choice':
+            for j, opt in enumerate(arranged[i][:len(OPTION_CHARS)]):
+                doc.add_paragraph(f"   {OPTION_CHARS[j].upper()}) {opt['text']}")
+
+        elif question['type'] == 'essay':
+            # Añadir líneas para respuesta de desarrollo
+            for _ in range(question.get('lines', 5)):
+                doc.add_paragraph("_" * 80)
+
+        elif question['type'] in WRITTEN_TYPES:
+            doc.add_paragraph("   Respuesta: " + "_" * 40)
+
+        elif question['type'] == 'matching':
+            # Cada elemento con un espacio para el número de su pareja
+            pairs = [opt for opt in question['options'] if opt['text']]
+            for j, opt in enumerate(pairs[:len(OPTION_CHARS)]):
+                doc.add_paragraph(f"   {OPTION_CHARS[j].upper()}) {opt['text']}  ______")
+            doc.add_paragraph("   " + "   ".join(f"{k}. {choice}" for k, choice in enumerate(arranged.get(i, []), 1)))
+
+        # Espacio entre preguntas
+        doc.add_paragraph()
+
+    # Agregar salto de página antes de la hoja de respuestas
+    doc.add_page_break()
+
+    answer_title = doc.add_paragraph()
+    answer_title_run = answer_title.add_run(settings['answer_sheet_title'])
+    answer_title_run.font.name = font_name
+    answer_title_run.font.size = Pt(settings['title_font_size'])
+    answer_title_run.bold = True
+    answer_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Información del estudiante en hoja de respuestas
+    if fields:
+        doc.add_paragraph("Marque con una X la respuesta correcta para cada pregunta.")
+        doc.add_paragraph()
+
+        for field in fields:
+            doc.add_paragraph(field)
+
+    doc.add_paragraph()
+
+    add_answer_table(doc, questions, max_option_count(questions))
+    return doc
+
+
+def build_answers_document(questions, settings, answer_keys, arranged):
+    """Documento de respuestas: estadísticas, tabla con las letras correctas y detalles"""
+    # El esqueleto ya trae la fuente de los títulos de nivel 2
+    doc = new_document(settings, "RESPUESTAS CORRECTAS", headings=True)
+    source_files = settings['source_files']
+
+    # Mostrar estadísticas según configuración
+    if settings['show_statistics']:
+        doc.add_heading('Estadísticas del examen', level=2)
+
+        multiple_choice_count = sum(1 for q in questions if q['type'] == 'multiple_choice')
+        essay_count = sum(1 for q in questions if q['type'] == 'essay')
+
+        doc.add_paragraph(f"Total de preguntas: {len(questions)}")
+        doc.add_paragraph(f"Preguntas de alternativas: {multiple_choice_count}")
+        doc.add_paragraph(f"Preguntas de desarrollo: {essay_count}")
+        for question_type in WRITTEN_TYPES + ('matching',):
+            count = sum(1 for q in questions if q['type'] == question_type)
+            if count:
+                doc.add_paragraph(f"Preguntas de tipo {TYPE_NAMES[question_type].lower()}: {count}")
+        doc.add_paragraph(f"Puntaje total: {total_score(questions)} puntos")
+
+    if settings['show_file_info'] and len(source_files) > 1:
+        doc.add_heading('Archivos procesados', level=2)
+
+        for i, filename in enumerate(source_files, 1):
+            file_questions = sum(1 for q in questions if q.get('source_file') == filename)
+            doc.add_paragraph(f"{i}. {filename} ({file_questions} preguntas)")
+
+    if settings['show_detailed_info'] and answer_keys:
+        # Análisis de distribución de respuestas correctas
+        stats = KeyStats(answer_keys, questions)
+        doc.add_heading('Distribución de alternativas correctas', level=2)
+
+        for letter, count in sorted(stats.counts.items()):
+            doc.add_paragraph(f"Alternativa {letter.upper()}: {count} preguntas")
+        doc.add_paragraph(f"Máximo de alternativas iguales seguidas: {stats.longest_run}")
+
+    doc.add_paragraph()
+
+    doc.add_heading('Hoja de Respuestas Correctas', level=2)
+    add_answer_table(doc, questions, max_option_count(questions), answer_keys)
+
+    doc.add_paragraph()
+
+    # Detalles de preguntas (según configuración)
+    if settings['show_detailed_info']:
+        doc.add_heading('Detalles de las preguntas', level=2)
+
+        for i, question in enumerate(questions, 1):
+            if len(source_files) > 1:
+                source_p = doc.add_paragraph()
+                source_run = source_p.add_run(f"[Archivo: {question.get('source_file', '')}]")
+                source_run.italic = True
+
+            question_p = doc.add_paragraph()
+            question_run = question_p.add_run(f"{i}. {question['text']}")
+            question_run.bold = True
+
+            if question['type'] == 'multiple_choice':
+                correct_letter = answer_keys.get(i, "?")
+                correct_options = [opt for opt in arranged.get(i, question['options']) if opt['is_correct']]
+
+                if correct_options:
+                    doc.add_paragraph(f"   Respuesta correcta: {correct_letter.upper()}) {correct_options[0]['text']}")
+                    doc.add_paragraph(f"   Puntaje: {question.get('score', 1.0)} punto(s)")
+
+                    if correct_options[0]['feedback']:
+                        doc.add_paragraph(f"   Retroalimentación: {correct_options[0]['feedback']}")
+                else:
+                    doc.add_paragraph("   Respuesta correcta: No encontrada")
+
+            elif question['type'] == 'essay':
+                doc.add_paragraph(f"   Tipo: Pregunta de desarrollo")
+                doc.add_paragraph(f"   Líneas asignadas: {question.get('lines', 5)}")
+                doc.add_paragraph(f"   Puntaje: {question.get('score', 1.0)} punto(s)")
+
+            elif question['type'] in WRITTEN_TYPES:
+                accepted = [answer_text(question, opt) for opt in question['options'] if opt['is_correct']]
+                doc.add_paragraph(f"   Tipo: {TYPE_NAMES[question['type']]}")
+                doc.add_paragraph(f"   Respuesta correcta: {' / '.join(accepted) if accepted else 'No encontrada'}")
+                doc.add_paragraph(f"   Puntaje: {question.get('score', 1.0)} punto(s)")
+
+            elif question['type'] == 'matching':
+                choices = arranged.get(i, [])
+                doc.add_paragraph(f"   Tipo: {TYPE_NAMES['matching']}")
+                pairs = [opt for opt in question['options'] if opt['text']]
+                for j, opt in enumerate(pairs[:len(OPTION_CHARS)]):
+                    number = choices.index(opt['match']) + 1 if opt.get('match') in choices else '?'
+                    doc.add_paragraph(f"   {OPTION_CHARS[j].upper()}) {opt['text']} → {number}. {opt.get('match', '')}")
+                doc.add_paragraph(f"   Puntaje: {question.get('score', 1.0)} punto(s)")
+
+            doc.add_paragraph()
+
+    return doc
+
+
+def render_exam(questions, settings, rng=None):
+    """Examen y respuestas de una forma: (doc_examen, doc_respuestas, claves {n° pregunta: letra})"""
+    rng = rng or random.Random()
+    answer_keys = plan_answer_keys(questions, rng, settings['max_run'])
+    arranged = arrange_options(questions, answer_keys, settings['randomize_options'], rng)
+    exam_doc = build_exam_document(questions, settings, arranged)
+    answers_doc = build_answers_document(questions, settings, answer_keys, arranged)
+    return exam_doc, answers_doc, answer_keys
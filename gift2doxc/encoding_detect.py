@@ -0,0 +1,228 @@
+"""
+Detección de codificación en una sola lectura
+
+El archivo se lee una vez (con mmap si es grande) y se detecta desde ese
+mismo buffer:
+
+  1. BOM (UTF-8, UTF-16, UTF-32): certeza total
+  2. UTF-16 sin BOM: bytes nulos alternados
+  3. UTF-8 estricto: si valida por trozos, es UTF-8
+  4. Casi UTF-8: si la mayoría de los bytes altos forman secuencias UTF-8
+     válidas, es UTF-8 con algunos bytes dañados (se reemplazan por U+FFFD)
+     en vez de aceptarlo como latin-1 y convertir cada ñ en Ã±
+  5. Un byte por carácter: cp1252 si aparecen bytes 0x80-0x9F definidos en
+     cp1252 (comillas tipográficas, guiones, €...), latin-1 si no
+
+read_text devuelve el texto completo; open_text abre el archivo en modo texto
+para leerlo por líneas sin tener nunca el texto completo en memoria.
+La confianza (0-1) baja cuando los caracteres resultantes no parecen texto.
+EncodingCache guarda el resultado por ruta, mtime y tamaño para que una nueva
+importación del mismo archivo decodifique directo, sin volver a detectar.
+"""
+
+import codecs
+import mmap
+import os
+import re
+
+# Sobre este tamaño el archivo se mapea en memoria en vez de copiarse con read()
+MMAP_THRESHOLD = 1024 * 1024
+# Bytes revisados para reconocer UTF-16 sin BOM
+SNIFF_BYTES = 4096
+# Bytes sobre los que se calculan las heurísticas (el texto se decodifica completo igual)
+SAMPLE_BYTES = 256 * 1024
+# Trozos en que se valida UTF-8 sin decodificar el archivo completo de una vez
+CHUNK_BYTES = 64 * 1024
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+UTF8_SEQUENCE_RE = re.compile(rb'[\xc2-\xdf][\x80-\xbf]|[\xe0-\xef][\x80-\xbf]{2}|[\xf0-\xf4][\x80-\xbf]{3}')
+HIGH_BYTE_RE = re.compile(rb'[\x80-\xff]')
+C1_BYTE_RE = re.compile(rb'[\x80-\x9f]')
+CP1252_UNDEFINED_RE = re.compile(rb'[\x81\x8d\x8f\x90\x9d]')
+NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+
+# Proporción mínima de bytes altos en secuencias UTF-8 válidas para decidir "UTF-8 dañado"
+UTF8_MAJORITY = 0.9
+# En texto real los caracteres no ASCII son minoría; sobre esta proporción se descuenta confianza
+NON_ASCII_DENSITY = 0.15
+# Signos no alfabéticos habituales en bancos de preguntas
+PLAUSIBLE_SYMBOLS = set('¿¡º ª°±·×÷«»€“”‘’–—…©®µ²³¹¼½¾')
+
+
+class DetectedEncoding:
+    """Codificación elegida para un archivo"""
+
+    def __init__(self, encoding, confidence, errors='strict', reason='', stamp=None):
+        self.encoding = encoding
+        self.confidence = confidence
+        self.errors = errors  # 'replace' cuando hubo que tolerar bytes dañados
+        self.reason = reason
+        self.stamp = stamp    # (mtime_ns, tamaño) del archivo leído
+
+    def __repr__(self):
+        return f"DetectedEncoding({self.encoding!r}, {self.confidence:.2f}, {self.reason!r})"
+
+
+def file_stamp(path):
+    """Versión del archivo sin leerlo"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def text_confidence(text):
+    """Confianza en que un texto decodificado byte a byte sea texto real
+
+    Baja si los caracteres no ASCII no son letras ni signos habituales, o si son
+    demasiados (datos binarios o una codificación equivocada).
+    """
+    chars = NON_ASCII_RE.findall(text)
+    if not chars:
+        return 1.0
+    plausible = sum(1 for char in chars if char.isalpha() or char in PLAUSIBLE_SYMBOLS) / len(chars)
+    density = len(chars) / len(text)
+    return round(max(0.1, 0.5 + 0.45 * plausible - max(0.0, density - NON_ASCII_DENSITY)), 2)
+
+
+def sniff_utf16(data):
+    """'utf-16-le' / 'utf-16-be' si el inicio tiene nulos alternados, o None"""
+    sample = bytes(data[:SNIFF_BYTES])
+    if len(sample) < 4:
+        return None
+    even = sample[0::2].count(0) / len(sample[0::2])
+    odd = sample[1::2].count(0) / len(sample[1::2])
+    if odd > 0.3 and even < 0.05:
+        return 'utf-16-le'
+    if even > 0.3 and odd < 0.05:
+        return 'utf-16-be'
+    return None
+
+
+def utf8_valid(data):
+    """True si el buffer completo es UTF-8 estricto; se valida por trozos sin guardar el texto"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for start in range(0, len(data), CHUNK_BYTES):
+            decoder.decode(data[start:start + CHUNK_BYTES])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_bytes(data):
+    """DetectedEncoding de un buffer (bytes, memoryview o mmap) sin decodificarlo completo"""
+    head = bytes(data[:4])
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return DetectedEncoding(name, 1.0, reason='BOM')
+
+    utf16 = sniff_utf16(data)
+    if utf16:
+        return DetectedEncoding(utf16, 0.9, 'replace', 'nulos alternados')
+
+    if utf8_valid(data):
+        return DetectedEncoding('utf-8', 1.0, reason='UTF-8 válido')
+
+    sample = bytes(data[:SAMPLE_BYTES])
+    high = len(HIGH_BYTE_RE.findall(sample))
+    in_sequences = len(b''.join(UTF8_SEQUENCE_RE.findall(sample)))
+    share = in_sequences / high if high else 0.0
+    if share >= UTF8_MAJORITY:
+        return DetectedEncoding('utf-8', round(0.5 + 0.45 * share, 2), 'replace', 'UTF-8 con bytes dañados')
+
+    if C1_BYTE_RE.search(data) and not CP1252_UNDEFINED_RE.search(data):
+        encoding, reason = 'cp1252', 'bytes 0x80-0x9F de Windows'
+    else:
+        encoding, reason = 'latin-1', 'un byte por carácter'
+    return DetectedEncoding(encoding, text_confidence(str(sample, encoding)), reason=reason)
+
+
+def decode_bytes(data, encoding='auto', known=None):
+    """Decodifica un buffer (bytes, memoryview o mmap) y devuelve (texto, DetectedEncoding)
+
+    Con encoding distinto de 'auto' se usa esa codificación sin tolerar errores.
+    known es una detección previa del mismo archivo (caché): se usa directo.
+    """
+    if encoding != 'auto':
+        return str(data, encoding), DetectedEncoding(encoding, 1.0, reason='elegida')
+
+    if known is not None:
+        try:
+            return str(data, known.encoding, known.errors), known
+        except UnicodeDecodeError:
+            pass  # El archivo cambió sin cambiar mtime ni tamaño: volver a detectar
+
+    detected = detect_bytes(data)
+    return str(data, detected.encoding, detected.errors), detected
+
+
+def read_text(path, encoding='auto', known=None):
+    """Lee el archivo una sola vez y devuelve (texto, DetectedEncoding)"""
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        if st.st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    text, detected = decode_bytes(view, encoding, known)
+        else:
+            text, detected = decode_bytes(f.read(), encoding, known)
+
+    if detected is not known:
+        detected.stamp = stamp
+    return text, detected
+
+
+def open_text(path, encoding='auto', known=None):
+    """Abre el archivo en modo texto para leerlo por líneas; devuelve (archivo, DetectedEncoding)
+
+    La detección recorre los bytes mapeados en memoria pero nunca guarda el
+    texto completo: las líneas se decodifican a medida que se leen. Con known
+    (caché) o una codificación elegida no se recorre el archivo antes de abrirlo.
+    """
+    if encoding != 'auto':
+        detected = DetectedEncoding(encoding, 1.0, reason='elegida', stamp=file_stamp(path))
+    elif known is not None:
+        detected = known
+    else:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size:
+                # Solo se recorren los bytes: mapearlos evita copiarlos aunque el archivo sea chico
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        detected = detect_bytes(view)
+            else:
+                detected = detect_bytes(b'')
+        detected.stamp = (st.st_mtime_ns, st.st_size)
+    return open(path, 'r', encoding=detected.encoding, errors=detected.errors), detected
+
+
+class EncodingCache:
+    """Detecciones por ruta, válidas mientras el archivo conserve mtime y tamaño"""
+
+    def __init__(self):
+        self.entries = {}  # ruta absoluta -> DetectedEncoding
+
+    def get(self, path):
+        detected = self.entries.get(os.path.abspath(path))
+        if detected is None:
+            return None
+        try:
+            if file_stamp(path) == detected.stamp:
+                return detected
+        except OSError:
+            pass
+        del self.entries[os.path.abspath(path)]
+        return None
+
+    def put(self, path, detected):
+        if detected is not None and detected.stamp is not None:
+            self.entries[os.path.abspath(path)] = detected
@@ -0,0 +1,210 @@
+"""
+Formas del examen en paralelo
+
+Cada forma es un par examen/respuestas generado con su propia semilla: el orden
+de las opciones y la clave salen de random.Random(semilla), así que volver a
+generar con las mismas semillas da exactamente las mismas formas. Las formas se
+reparten en un pool de procesos (python-docx es CPU puro) y las preguntas y la
+configuración se envían una sola vez a cada proceso, no una vez por forma.
+
+Al terminar se escribe un índice de claves en CSV y JSON:
+
+    forma, semilla, pregunta, tipo, letra
+
+Uso:
+  python3 exam_variants.py preguntas.json -n 20 [--seed 2024] [-o formas/] [-w 4] [--settings config.json]
+
+preguntas.json es la salida de gift_ingest.py -o; config.json, un objeto con
+las claves de docx_render.DEFAULT_SETTINGS que se quieran cambiar.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from docx_render import DEFAULT_SETTINGS, make_settings, plain_question, render_exam
+
+KEY_INDEX_CSV = "claves.csv"
+KEY_INDEX_JSON = "claves.json"
+
+# Preguntas y configuración de cada proceso del pool (se cargan una vez con initializer)
+_worker_questions = None
+_worker_settings = None
+
+
+def variant_seeds(count, base_seed=None):
+    """Semillas de count formas; con base_seed la lista es reproducible"""
+    rng = random.Random(base_seed)
+    return [rng.randrange(2 ** 32) for _ in range(count)]
+
+
+def variant_name(number):
+    return f"Forma_{number:02d}"
+
+
+class VariantResult:
+    """Una forma generada (o el error que la impidió)"""
+
+    def __init__(self, index, name, seed, exam_path=None, answers_path=None, answer_keys=None, error=None):
+        self.index = index
+        self.name = name
+        self.seed = seed
+        self.exam_path = exam_path
+        self.answers_path = answers_path
+        self.answer_keys = answer_keys or {}  # n° de pregunta -> letra correcta
+        self.error = error
+
+
+def _init_worker(questions, settings):
+    global _worker_questions, _worker_settings
+    _worker_questions = questions
+    _worker_settings = settings
+
+
+def render_variant(index, name, seed, output_dir, questions=None, settings=None):
+    """Genera y guarda una forma; se ejecuta dentro de un proceso del pool"""
+    questions = questions if questions is not None else _worker_questions
+    settings = dict(settings if settings is not None else _worker_settings)
+    settings['variant_label'] = name.replace('_', ' ')
+
+    exam_doc, answers_doc, answer_keys = render_exam(questions, settings, random.Random(seed))
+    exam_path = os.path.join(output_dir, f"Examen_{name}.docx")
+    answers_path = os.path.join(output_dir, f"Respuestas_{name}.docx")
+    exam_doc.save(exam_path)
+    answers_doc.save(answers_path)
+    return VariantResult(index, name, seed, exam_path, answers_path, answer_keys)
+
+
+class VariantBatch:
+    """Genera varias formas en un pool de procesos; poll() no bloquea"""
+
+    def __init__(self, questions, settings, seeds, output_dir, workers=None):
+        self.questions = [plain_question(question) for question in questions]
+        self.settings = make_settings(**settings)
+        self.seeds = list(seeds)
+        self.output_dir = output_dir
+        self.workers = max(1, min(len(self.seeds), workers or os.cpu_count() or 1))
+        self.executor = None
+        self.pending = {}   # future -> índice de la forma
+        self.results = []   # VariantResult en el orden en que terminan
+
+    @property
+    def finished(self):
+        return len(self.results) >= len(self.seeds)
+
+    def start(self):
+        if self.executor is not None or self.finished:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.questions, self.settings))
+        for index, seed in enumerate(self.seeds):
+            future = self.executor.submit(render_variant, index, variant_name(index + 1), seed, self.output_dir)
+            self.pending[future] = index
+
+    def poll(self, timeout=0):
+        """Formas terminadas desde la última llamada; espera como máximo timeout segundos"""
+        self.start()
+        done = []
+        if self.pending:
+            completed, _ = wait(self.pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in sorted(completed, key=self.pending.get):
+                index = self.pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = VariantResult(index, variant_name(index + 1), self.seeds[index], error=str(e))
+                done.append(result)
+        self.results.extend(done)
+        if self.finished:
+            self.close()
+        return done
+
+    def __iter__(self):
+        while not self.finished:
+            yield from self.poll(timeout=None)
+
+    def close(self, cancel=False):
+        if self.executor is not None:
+            self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
+            self.executor = None
+        if cancel:
+            self.pending.clear()
+
+    def ordered_results(self):
+        return sorted(self.results, key=lambda result: result.index)
+
+
+def write_key_index(results, questions, output_dir):
+    """Índice de claves de todas las formas: forma -> pregunta -> letra (CSV y JSON)"""
+    results = [result for result in sorted(results, key=lambda result: result.index) if result.error is None]
+    csv_path = os.path.join(output_dir, KEY_INDEX_CSV)
+    json_path = os.path.join(output_dir, KEY_INDEX_JSON)
+
+    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['forma', 'semilla', 'pregunta', 'tipo', 'letra'])
+        for result in results:
+            for number, question in enumerate(questions, 1):
+                letter = result.answer_keys.get(number)
+                writer.writerow([result.name, result.seed, number, question['type'],
+                                 letter.upper() if letter else ''])
+
+    index = {
+        'preguntas': [{'numero': number, 'titulo': question.get('title', ''), 'tipo': question['type']}
+                      for number, question in enumerate(questions, 1)],
+        'formas': [{
+            'forma': result.name,
+            'semilla': result.seed,
+            'examen': os.path.basename(result.exam_path),
+            'respuestas': os.path.basename(result.answers_path),
+            'claves': {str(number): letter.upper() for number, letter in sorted(result.answer_keys.items())},
+        } for result in results],
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return csv_path, json_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generar varias formas del examen en paralelo')
+    parser.add_argument('questions', help='Preguntas en JSON (salida de gift_ingest.py -o)')
+    parser.add_argument('-n', '--forms', type=int, default=10, help='Cantidad de formas')
+    parser.add_argument('--seed', type=int, help='Semilla base (por defecto: aleatoria)')
+    parser.add_argument('-o', '--output', default='formas', help='Directorio de salida')
+    parser.add_argument('-w', '--workers', type=int, help='Procesos del pool (por defecto: núcleos disponibles)')
+    parser.add_argument('--settings', help='Configuración JSON (claves de docx_render.DEFAULT_SETTINGS)')
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    settings = {}
+    if args.settings:
+        with open(args.settings, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            print(f"❌ Claves de configuración desconocidas: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 1
+
+    seeds = variant_seeds(args.forms, args.seed)
+    batch = VariantBatch(questions, settings, seeds, args.output, args.workers)
+    failed = 0
+    for result in batch:
+        if result.error:
+            failed += 1
+            print(f"❌ {result.name}: {result.error}", file=sys.stderr)
+        else:
+            print(f"[{len(batch.results)}/{len(seeds)}] ✅ {result.name} (semilla {result.seed})", file=sys.stderr)
+
+    csv_path, json_path = write_key_index(batch.results, batch.questions, args.output)
+    print(f"🔑 Claves: {csv_path}, {json_path}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
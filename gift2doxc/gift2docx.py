@@ -1,15 +1,36 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import re
 import random
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import nsdecls
-from docx.oxml import parse_xml
 import os
 import collections
 
+from answer_keys import DEFAULT_MAX_RUN
+from cleanup_engine import CleanupEngine, CleanupError, CleanupJob, CleanupJournal, CleanupRule, load_rules
+from docx_render import TYPE_NAMES, answer_text, make_settings, plain_question, render_exam
+from exam_variants import VariantBatch, variant_seeds, write_key_index
+from gift_engine import DEFAULT_THRESHOLD, detect_problems
+from gift_parser import escape_gift
+from gift_ingest import ENCODING_CACHE, GiftIngest, normalize_special_characters, parse_gift_text, read_gift_file
+from phrase_matcher import DEFAULT_LANGUAGE, PhraseListError, available_languages, get_matcher, load_phrases
+from question_store import QuestionStore
+
+# Cada cuánto revisa la interfaz si el pool terminó algún archivo
+INGEST_POLL_MS = 50
+# Bajo esta confianza se avisa qué codificación se usó para leer el archivo
+LOW_ENCODING_CONFIDENCE = 0.7
+# Si hay que redibujar más de esta fracción de filas, conviene reconstruir la lista completa
+REBUILD_FRACTION = 0.5
+# Pausa entre tramos de la limpieza masiva (la interfaz atiende eventos entre uno y otro)
+CLEANUP_POLL_MS = 10
+# Cambios que se muestran en la vista previa de la limpieza
+PREVIEW_MAX_CHANGES = 1000
+# Cada cuánto revisa la interfaz si el pool terminó alguna forma del examen
+VARIANT_POLL_MS = 100
+
+
+# Marca de cada tipo de pregunta en la lista
+TYPE_ICONS = {'multiple_choice': "[A]", 'essay': "[D]", 'short_answer': "[R]", 'numerical': "[N]", 'matching': "[E]"}
+
 
 class GiftToDocxConverter:
     def __init__(self, root):
@@ -22,9 +43,14 @@ class GiftToDocxConverter:
         self.gift_files = []  # Lista de archivos seleccionados
         self.output_dir = tk.StringVar()
         self.current_step = 0
-        self.questions = []
+        self.questions = QuestionStore(analyzer=self.detect_question_problems)
         self.answer_keys = {}
         self.selected_question_index = tk.IntVar(value=0)
+        self.ingest = None  # Carga de archivos GIFT en curso (GiftIngest)
+        self.cleanup_rules = []  # Reglas de limpieza cargadas desde archivo
+        self.cleanup_job = None  # Limpieza masiva en curso (CleanupJob)
+        self.cleanup_journal = CleanupJournal()  # Limpiezas aplicadas, para deshacer
+        self.variant_batch = None  # Generación de formas en curso (VariantBatch)
 
         # Crear frames para cada paso
         self.frames = []
@@ -110,8 +136,15 @@ class GiftToDocxConverter:
         ttk.Radiobutton(frame, text="Aleatorio (mezclar todas)", variable=self.question_order, value="aleatorio").grid(row=6, column=0, padx=40, pady=2, sticky="w")
 
         # Opciones de respuestas
+        options_frame = ttk.Frame(frame)
+        options_frame.grid(row=7, column=0, padx=20, pady=5, sticky="w")
+
         self.randomize_options = tk.BooleanVar(value=True)
-        ttk.Checkbutton(frame, text="Aleatorizar opciones de respuesta", variable=self.randomize_options).grid(row=7, column=0, padx=20, pady=5, sticky="w")
+        ttk.Checkbutton(options_frame, text="Aleatorizar opciones de respuesta", variable=self.randomize_options).pack(side=tk.LEFT)
+        ttk.Label(options_frame, text="Máx. respuestas iguales seguidas:").pack(side=tk.LEFT, padx=(15,5))
+        self.max_run = tk.IntVar(value=DEFAULT_MAX_RUN)
+        tk.Spinbox(options_frame, from_=0, to=10, width=4, textvariable=self.max_run).pack(side=tk.LEFT)
+        ttk.Label(options_frame, text="(0 = sin límite)").pack(side=tk.LEFT, padx=5)
 
         # Umbral de detección de problemas
         ttk.Label(frame, text="Detección de problemas:").grid(row=8, column=0, padx=20, pady=(10,5), sticky="w")
@@ -119,16 +152,31 @@ class GiftToDocxConverter:
         umbral_frame.grid(row=9, column=0, padx=40, pady=2, sticky="w")
 
         ttk.Label(umbral_frame, text="Umbral diferencia de caracteres:").pack(side=tk.LEFT)
-        self.threshold_var = tk.IntVar(value=10)
+        self.threshold_var = tk.IntVar(value=DEFAULT_THRESHOLD)
         threshold_spinbox = tk.Spinbox(umbral_frame, from_=5, to=50, width=5, textvariable=self.threshold_var)
         threshold_spinbox.pack(side=tk.LEFT, padx=5)
         ttk.Label(umbral_frame, text="caracteres").pack(side=tk.LEFT)
 
+        # Frases problemáticas: paquete por idioma más diccionarios propios
+        phrases_frame = ttk.Frame(frame)
+        phrases_frame.grid(row=10, column=0, padx=40, pady=2, sticky="w")
+
+        ttk.Label(phrases_frame, text="Frases problemáticas:").pack(side=tk.LEFT)
+        self.phrase_language = tk.StringVar(value=DEFAULT_LANGUAGE)
+        self.phrase_files = []  # Diccionarios JSON agregados por el usuario
+        language_combo = ttk.Combobox(phrases_frame, textvariable=self.phrase_language, values=available_languages(),
+                                      state="readonly", width=5)
+        language_combo.pack(side=tk.LEFT, padx=5)
+        language_combo.bind("<<ComboboxSelected>>", lambda event: self.on_phrase_rules_changed())
+        ttk.Button(phrases_frame, text="Agregar diccionario...", command=self.add_phrase_file).pack(side=tk.LEFT, padx=5)
+        self.phrase_files_label = ttk.Label(phrases_frame, text="")
+        self.phrase_files_label.pack(side=tk.LEFT)
+
         # Codificación de archivos
-        ttk.Label(frame, text="Codificación de archivos:").grid(row=10, column=0, padx=20, pady=(10,5), sticky="w")
+        ttk.Label(frame, text="Codificación de archivos:").grid(row=11, column=0, padx=20, pady=(10,5), sticky="w")
         self.encoding_var = tk.StringVar(value="auto")
         encodings_frame = ttk.Frame(frame)
-        encodings_frame.grid(row=11, column=0, padx=40, pady=2, sticky="w")
+        encodings_frame.grid(row=12, column=0, padx=40, pady=2, sticky="w")
 
         ttk.Radiobutton(encodings_frame, text="Detectar automáticamente", variable=self.encoding_var, value="auto").pack(anchor="w")
         ttk.Radiobutton(encodings_frame, text="UTF-8", variable=self.encoding_var, value="utf-8").pack(anchor="w")
@@ -163,7 +211,8 @@ class GiftToDocxConverter:
         control_frame = ttk.Frame(left_panel)
         control_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0,5))
         
-        ttk.Button(control_frame, text="Cargar GIFT", command=self.process_gift_files).pack(side=tk.LEFT, padx=2)
+        self.load_button = ttk.Button(control_frame, text="Cargar GIFT", command=self.process_gift_files)
+        self.load_button.pack(side=tk.LEFT, padx=2)
         ttk.Button(control_frame, text="+ Alternativas", command=self.add_multiple_choice_question).pack(side=tk.LEFT, padx=2)
         ttk.Button(control_frame, text="+ Desarrollo", command=self.add_essay_question).pack(side=tk.LEFT, padx=2)
 
@@ -218,7 +267,15 @@ class GiftToDocxConverter:
         self.cleanup_text = tk.StringVar()
         cleanup_entry = ttk.Entry(cleanup_frame, textvariable=self.cleanup_text, width=15)
         cleanup_entry.pack(side=tk.LEFT, padx=2)
-        ttk.Button(cleanup_frame, text="Aplicar", command=self.apply_mass_cleanup).pack(side=tk.LEFT, padx=2)
+        self.cleanup_regex = tk.BooleanVar(value=False)
+        ttk.Checkbutton(cleanup_frame, text="Regex", variable=self.cleanup_regex).pack(side=tk.LEFT, padx=2)
+
+        cleanup_actions = ttk.Frame(cleanup_frame)
+        cleanup_actions.pack(side=tk.LEFT, padx=2)
+        ttk.Button(cleanup_actions, text="Aplicar", command=self.apply_mass_cleanup).pack(side=tk.TOP, pady=1)
+        ttk.Button(cleanup_actions, text="Vista previa", command=lambda: self.apply_mass_cleanup(preview=True)).pack(side=tk.TOP, pady=1)
+        ttk.Button(cleanup_actions, text="Reglas...", command=self.load_cleanup_rules).pack(side=tk.TOP, pady=1)
+        ttk.Button(cleanup_actions, text="Deshacer", command=self.undo_mass_cleanup).pack(side=tk.TOP, pady=1)
 
         # Botones comunes predefinidos
         common_frame = ttk.Frame(cleanup_frame)
@@ -465,8 +522,20 @@ class GiftToDocxConverter:
         self.summary_text = tk.Text(frame, width=60, height=10, wrap=tk.WORD)
         self.summary_text.grid(row=2, column=0, padx=5, pady=5, sticky="nsew")
 
+        # Formas del examen: cada una con su propio orden de opciones y clave
+        variants_frame = ttk.Frame(frame)
+        variants_frame.grid(row=3, column=0, pady=5)
+
+        ttk.Label(variants_frame, text="Cantidad de formas:").pack(side=tk.LEFT)
+        self.variant_count = tk.IntVar(value=1)
+        ttk.Spinbox(variants_frame, from_=1, to=60, textvariable=self.variant_count, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(variants_frame, text="Semilla (opcional):").pack(side=tk.LEFT, padx=(15,5))
+        self.variant_seed = tk.StringVar(value="")
+        ttk.Entry(variants_frame, textvariable=self.variant_seed, width=10).pack(side=tk.LEFT)
+
         # Botón para generar documentos
-        ttk.Button(frame, text="Generar documentos DOCX", command=self.generate_docx).grid(row=3, column=0, pady=10)
+        self.generate_button = ttk.Button(frame, text="Generar documentos DOCX", command=self.generate_docx)
+        self.generate_button.grid(row=4, column=0, pady=10)
 
         # Configurar grid
         frame.columnconfigure(0, weight=1)
@@ -659,7 +728,7 @@ class GiftToDocxConverter:
             
             # Agregar a la lista
             self.questions.append(question)
-            self.update_questions_list()
+            self.refresh_questions_list()
             
             dialog.destroy()
             messagebox.showinfo("Éxito", "Pregunta de alternativas creada correctamente")
@@ -739,7 +808,7 @@ class GiftToDocxConverter:
             
             # Agregar a la lista
             self.questions.append(question)
-            self.update_questions_list()
+            self.refresh_questions_list()
             
             dialog.destroy()
             messagebox.showinfo("Éxito", "Pregunta de desarrollo creada correctamente")
@@ -757,10 +826,10 @@ class GiftToDocxConverter:
         
         index = selection[0]
         # Intercambiar posiciones
-        self.questions[index], self.questions[index-1] = self.questions[index-1], self.questions[index]
+        self.questions.swap(index, index-1)
         
-        # Actualizar lista y mantener selección
-        self.update_questions_list()
+        # Actualizar solo las dos filas y mantener selección
+        self.refresh_questions_list()
         self.questions_listbox.selection_set(index-1)
         self.show_question_editor(index-1)
 
@@ -772,10 +841,10 @@ class GiftToDocxConverter:
         
         index = selection[0]
         # Intercambiar posiciones
-        self.questions[index], self.questions[index+1] = self.questions[index+1], self.questions[index]
+        self.questions.swap(index, index+1)
         
-        # Actualizar lista y mantener selección
-        self.update_questions_list()
+        # Actualizar solo las dos filas y mantener selección
+        self.refresh_questions_list()
         self.questions_listbox.selection_set(index+1)
         self.show_question_editor(index+1)
 
@@ -797,10 +866,10 @@ class GiftToDocxConverter:
         
         if result:
             # Eliminar pregunta
-            del self.questions[index]
+            self.questions.delete(index)
             
             # Actualizar lista
-            self.update_questions_list()
+            self.refresh_questions_list()
             
             # Limpiar editor
             for widget in self.editor_frame.winfo_children():
@@ -819,6 +888,8 @@ class GiftToDocxConverter:
         
         for question in self.questions:
             question['score'] = score
+        self.questions.mark_all(content=False)
+        self.refresh_questions_list()
         
         # Actualizar editor si hay pregunta seleccionada
         selection = self.questions_listbox.curselection()
@@ -839,14 +910,16 @@ class GiftToDocxConverter:
         for question in self.questions:
             if question['type'] == question_type:
                 question['score'] = score
+                self.questions.mark_changed(question, content=False)
                 count += 1
+        self.refresh_questions_list()
         
         # Actualizar editor si hay pregunta seleccionada
         selection = self.questions_listbox.curselection()
         if selection:
             self.show_question_editor(selection[0])
         
-        type_name = "alternativas" if question_type == "multiple_choice" else "desarrollo"
+        type_name = TYPE_NAMES.get(question_type, question_type).lower()
         messagebox.showinfo("Éxito", f"Puntaje {score} aplicado a {count} pregunta(s) de {type_name}")
 
 
@@ -972,152 +1045,112 @@ class GiftToDocxConverter:
 
     def read_file_with_encoding(self, file_path):
         """Leer archivo probando diferentes codificaciones"""
-        encodings_to_try = []
-
-        if self.encoding_var.get() == "auto":
-            # Intentar múltiples codificaciones en orden de probabilidad
-            encodings_to_try = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
-        else:
-            # Usar la codificación seleccionada específicamente
-            encodings_to_try = [self.encoding_var.get()]
-
-        last_error = None
-        for encoding in encodings_to_try:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    content = file.read()
-
-                # Normalizar algunos caracteres comunes problemáticos
-                content = self.normalize_special_characters(content)
-                return content
-
-            except UnicodeDecodeError as e:
-                last_error = e
-                continue
-            except Exception as e:
-                last_error = e
-                continue
-
-        # Si ninguna codificación funcionó, lanzar el último error
-        raise Exception(f"No se pudo leer el archivo {os.path.basename(file_path)} con ninguna codificación. Último error: {str(last_error)}")
+        content, _ = read_gift_file(file_path, self.encoding_var.get(), ENCODING_CACHE.get(file_path))
+        return content
 
     def normalize_special_characters(self, text):
         """Normalizar caracteres especiales comunes"""
-        # Diccionario de reemplazos para caracteres problemáticos
-        replacements = {
-            # Superíndices comunes
-            '⁰': '⁰', '¹': '¹', '²': '²', '³': '³', '⁴': '⁴', '⁵': '⁵',
-            '⁶': '⁶', '⁷': '⁷', '⁸': '⁸', '⁹': '⁹', '⁺': '⁺', '⁻': '⁻',
-
-            # Subíndices comunes
-            '₀': '₀', '₁': '₁', '₂': '₂', '₃': '₃', '₄': '₄', '₅': '₅',
-            '₆': '₆', '₇': '₇', '₈': '₈', '₉': '₉', '₊': '₊', '₋': '₋',
-
-            # Flechas
-            '→': '→', '←': '←', '↔': '↔', '↑': '↑', '↓': '↓',
-            '⟶': '→', '⟵': '←', '⟷': '↔',
-
-            # Símbolos matemáticos y científicos
-            '±': '±', '×': '×', '÷': '÷', '≤': '≤', '≥': '≥', '≠': '≠',
-            '∞': '∞', '∂': '∂', '∫': '∫', '∑': '∑', '√': '√', 'π': 'π',
-            'α': 'α', 'β': 'β', 'γ': 'γ', 'δ': 'δ', 'ε': 'ε', 'θ': 'θ',
-            'λ': 'λ', 'μ': 'μ', 'ν': 'ν', 'ρ': 'ρ', 'σ': 'σ', 'τ': 'τ',
-            'φ': 'φ', 'χ': 'χ', 'ψ': 'ψ', 'ω': 'ω',
-
-            # Grados y unidades
-            '°': '°', '℃': '℃', '℉': '℉', 'Ω': 'Ω', 'μ': 'μ',
-
-            # Símbolos químicos comunes
-            '⁺': '⁺', '⁻': '⁻', '²⁺': '²⁺', '³⁺': '³⁺',
-
-            # Comillas y apostrofes problemáticos
-            '"': '"', '"': '"', ''': "'", ''': "'",
-            '–': '-', '—': '-', '…': '...',
-        }
-
-        # Aplicar reemplazos
-        for old_char, new_char in replacements.items():
-            text = text.replace(old_char, new_char)
-
-        return text
+        return normalize_special_characters(text)
 
     def detect_question_problems(self, question):
         """Detectar problemas en una pregunta"""
-        problems = []
-
-        if question['type'] != 'multiple_choice':
-            return problems
+        return detect_problems(question, self.threshold_var.get(), self.get_phrase_matcher())
 
-        # Obtener opciones correctas e incorrectas
-        correct_options = [opt for opt in question['options'] if opt['is_correct']]
-        incorrect_options = [opt for opt in question['options'] if not opt['is_correct']]
+    def get_phrase_matcher(self):
+        """Frases del idioma elegido más los diccionarios propios (compiladas una vez)"""
+        return get_matcher(self.phrase_language.get(), tuple(self.phrase_files))
 
-        if not correct_options or not incorrect_options:
-            return problems
+    def add_phrase_file(self):
+        """Agregar un diccionario propio de frases problemáticas (JSON)"""
+        path = filedialog.askopenfilename(
+            title="Seleccionar diccionario de frases",
+            filetypes=[("Diccionario JSON", "*.json"), ("Todos los archivos", "*.*")]
+        )
+        if not path:
+            return
 
-        correct_text = correct_options[0]['text']
+        try:
+            phrases = load_phrases(path)
+        except PhraseListError as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-        # 1. Detectar respuesta correcta significativamente más larga
-        threshold = self.threshold_var.get()
-        avg_incorrect_length = sum(len(opt['text']) for opt in incorrect_options) / len(incorrect_options)
+        if path not in self.phrase_files:
+            self.phrase_files.append(path)
+        self.phrase_files_label.config(text=f"+{len(self.phrase_files)} diccionario(s)")
+        self.on_phrase_rules_changed()
+        messagebox.showinfo("Diccionario agregado", f"Se agregaron {len(phrases)} frase(s) de {os.path.basename(path)}")
 
-        if len(correct_text) - avg_incorrect_length > threshold:
-            problems.append(f"Respuesta correcta {int(len(correct_text) - avg_incorrect_length)} caracteres más larga que promedio")
+    def on_phrase_rules_changed(self):
+        """Las frases cambiaron: reanalizar las preguntas ya cargadas"""
+        if self.questions:
+            self.questions.mark_all()
+            self.update_questions_list()
 
-        # 2. Detectar distractores muy cortos
-        short_distractors = [opt for opt in incorrect_options if len(opt['text']) < 10]
-        if short_distractors:
-            problems.append(f"{len(short_distractors)} distractor(es) muy corto(s) (< 10 caracteres)")
+    def process_gift_files(self):
+        """Procesar todos los archivos GIFT en un pool de procesos sin bloquear la interfaz"""
+        if not self.gift_files:
+            messagebox.showerror("Error", "Debe seleccionar al menos un archivo GIFT primero")
+            return
 
-        # 3. Detectar palabras clave problemáticas
-        problematic_phrases = [
-            "todas las anteriores", "todas las opciones", "todas son correctas",
-            "ninguna de las anteriores", "ninguna opción", "ninguna es correcta",
-            "solo a", "solo b", "solo c", "solo d",
-            "a y b", "a y c", "a y d", "b y c", "b y d", "c y d",
-            "a, b y c", "a, b y d", "a, c y d", "b, c y d"
-        ]
+        if self.ingest is not None:
+            return  # Ya hay una carga en curso
 
-        for option in question['options']:
-            text_lower = option['text'].lower()
-            for phrase in problematic_phrases:
-                if phrase in text_lower:
-                    problems.append(f"Opción contiene frase problemática: '{phrase}'")
-                    break
+        try:
+            self.ingest = GiftIngest(self.gift_files, self.encoding_var.get())
+            self.ingest.start()
+        except Exception as e:
+            self.ingest = None
+            messagebox.showerror("Error", f"Error general al procesar archivos: {str(e)}")
+            return
 
-        return problems
+        self.ingest_questions = []
+        self.ingest_issues = []
+        self.ingest_doubts = []
+        self.load_button.config(state=tk.DISABLED, text=f"Cargando 0/{len(self.gift_files)}")
+        self.root.after(INGEST_POLL_MS, self.poll_gift_ingest)
 
-    def process_gift_files(self):
-        """Procesar todos los archivos GIFT y extraer las preguntas"""
-        if not self.gift_files:
-            messagebox.showerror("Error", "Debe seleccionar al menos un archivo GIFT primero")
+    def poll_gift_ingest(self):
+        """Recoger los archivos que ya terminaron y volver a programarse hasta completar la carga"""
+        try:
+            events = self.ingest.poll()
+        except Exception as e:
+            events = []
+            self.ingest.close(cancel=True)
+            self.ingest_issues.append(f"Error general al procesar archivos: {str(e)}")
+
+        for event in events:
+            filename = os.path.basename(event.path)
+            if event.kind == 'progress':
+                self.load_button.config(text=f"Cargando {event.done}/{event.total}")
+            elif event.error:
+                self.ingest_issues.append(f"Error al procesar {filename}: {event.error}")
+            else:
+                for message in event.errors:
+                    print(f"Error al procesar una pregunta en {filename}: {message}")
+                if event.encoding is not None and event.encoding.confidence < LOW_ENCODING_CONFIDENCE:
+                    self.ingest_doubts.append(
+                        f"{filename}: leído como {event.encoding.encoding} "
+                        f"({event.encoding.confidence:.0%} de confianza, {event.encoding.reason})")
+                self.ingest_questions.extend(event.questions)
+
+        if not self.ingest.finished:
+            self.root.after(INGEST_POLL_MS, self.poll_gift_ingest)
             return
 
+        self.ingest = None
+        self.load_button.config(state=tk.NORMAL, text="Cargar GIFT")
+        self.finish_gift_ingest(self.ingest_questions, self.ingest_issues, self.ingest_doubts)
+
+    def finish_gift_ingest(self, all_questions, encoding_issues, encoding_doubts=()):
+        """Mostrar las preguntas importadas (ya en el orden de los archivos)"""
         try:
-            all_questions = []
-            encoding_issues = []
-
-            # Procesar cada archivo
-            for file_path in self.gift_files:
-                try:
-                    # Usar la nueva función de lectura con manejo de codificaciones
-                    content = self.read_file_with_encoding(file_path)
-
-                    # Procesar el contenido GIFT
-                    file_questions = self.parse_gift_questions(content, os.path.basename(file_path))
-                    all_questions.extend(file_questions)
-
-                except Exception as e:
-                    error_msg = f"Error al procesar {os.path.basename(file_path)}: {str(e)}"
-                    encoding_issues.append(error_msg)
-                    continue
-
-            # Mostrar advertencias de codificación si las hay
-            if encoding_issues:
+            # Mostrar advertencias de codificación si las hay (archivos fallidos o dudosos)
+            if encoding_issues or encoding_doubts:
                 messagebox.showwarning(
                     "Problemas de codificación",
                     "Se encontraron problemas al leer algunos archivos:\n\n" +
-                    "\n".join(encoding_issues) +
+                    "\n".join(list(encoding_issues) + list(encoding_doubts)) +
                     "\n\nPrueba seleccionar una codificación específica en las opciones."
                 )
 
@@ -1125,11 +1158,8 @@ class GiftToDocxConverter:
             if self.question_order.get() == "aleatorio":
                 random.shuffle(all_questions)
 
-            self.questions = all_questions
-
-            # Detectar problemas en todas las preguntas
-            for question in self.questions:
-                question['problems'] = self.detect_question_problems(question)
+            # Todas quedan marcadas para análisis; update_questions_list las analiza
+            self.questions.replace(all_questions)
 
             # Actualizar lista de preguntas
             self.update_questions_list()
@@ -1141,35 +1171,51 @@ class GiftToDocxConverter:
             messagebox.showerror("Error", f"Error general al procesar archivos: {str(e)}")
 
 
-    def update_questions_list(self):
-        """Actualizar la lista de preguntas en el panel izquierdo"""
-        self.questions_listbox.delete(0, tk.END)
+    def format_question_row(self, i, question):
+        """Texto de la fila de una pregunta en la lista"""
+        # Determinar estado de la pregunta
+        if question.get('problems'):
+            status = "[!]"  # En lugar de ⚠️
+        else:
+            status = "[OK]" # En lugar de ✅
 
-        for i, question in enumerate(self.questions):
-            # Determinar estado de la pregunta
-            if question.get('problems'):
-                status = "[!]"  # En lugar de ⚠️
-            else:
-                status = "[OK]" # En lugar de ✅
+        # Determinar tipo de pregunta
+        type_icon = TYPE_ICONS.get(question['type'], "[?]")
 
-            # Determinar tipo de pregunta
-            if question['type'] == 'multiple_choice':
-                type_icon = "[A]"
-            elif question['type'] == 'essay':
-                type_icon = "[D]"
-            else:
-                type_icon = "[?]"
+        # Mostrar puntaje
+        score = question.get('score', 1.0)
+        score_text = f"({score}pts)"
 
-            # Mostrar puntaje
-            score = question.get('score', 1.0)
-            score_text = f"({score}pts)"
+        # Truncar texto de pregunta para mostrar en lista
+        question_text = question['text'][:35] + "..." if len(question['text']) > 35 else question['text']
 
-            # Truncar texto de pregunta para mostrar en lista
-            question_text = question['text'][:35] + "..." if len(question['text']) > 35 else question['text']
+        return f"{status} {type_icon} {i+1}. {question_text} {score_text}"
 
-            # Agregar a la lista
-            display_text = f"{status} {type_icon} {i+1}. {question_text} {score_text}"
-            self.questions_listbox.insert(tk.END, display_text)
+    def update_questions_list(self):
+        """Reconstruir la lista de preguntas en el panel izquierdo"""
+        self.questions.refresh()
+        self.questions.take_view_changes()  # La lista queda al día completa
+        self.questions_listbox.delete(0, tk.END)
+        rows = [self.format_question_row(i, question) for i, question in enumerate(self.questions)]
+        if rows:
+            self.questions_listbox.insert(tk.END, *rows)
+
+    def refresh_questions_list(self):
+        """Reanalizar solo las preguntas que cambiaron y redibujar solo sus filas"""
+        self.questions.refresh()
+        rebuild, operations, positions = self.questions.take_view_changes()
+        if rebuild or len(positions) > REBUILD_FRACTION * len(self.questions):
+            self.update_questions_list()
+            return
+
+        for operation, position in operations:
+            if operation == 'delete':
+                self.questions_listbox.delete(position)
+            else:
+                self.questions_listbox.insert(position, "")
+        for position in positions:
+            self.questions_listbox.delete(position)
+            self.questions_listbox.insert(position, self.format_question_row(position, self.questions[position]))
 
     def on_question_select(self, event):
         """Manejar selección de pregunta en la lista"""
@@ -1193,7 +1239,7 @@ class GiftToDocxConverter:
             widget.destroy()
 
         # Información de la pregunta
-        type_name = "Alternativas" if question['type'] == 'multiple_choice' else "Desarrollo"
+        type_name = TYPE_NAMES.get(question['type'], question['type'])
         info_text = f"Pregunta {question_index + 1} - {type_name}"
         if question.get('source_file'):
             info_text += f" (Archivo: {question['source_file']})"
@@ -1225,7 +1271,8 @@ class GiftToDocxConverter:
         def update_score():
             try:
                 question['score'] = float(score_var.get())
-                self.update_questions_list()
+                self.questions.mark_changed(question, content=False)
+                self.refresh_questions_list()
                 self.questions_listbox.selection_set(question_index)
             except ValueError:
                 messagebox.showerror("Error", "Ingrese un puntaje válido")
@@ -1254,11 +1301,13 @@ class GiftToDocxConverter:
             
             question_text.insert("1.0", question['text'])
             question['text_widget'] = question_text
+            question.pop('text_var', None)
         else:
             question_text_var = tk.StringVar(value=question['text'])
             question_entry = ttk.Entry(self.editor_frame, textvariable=question_text_var, width=60)
             question_entry.grid(row=row, column=0, sticky="ew", padx=5, pady=2)
             question['text_var'] = question_text_var
+            question.pop('text_widget', None)
         
         row += 1
 
@@ -1323,6 +1372,20 @@ class GiftToDocxConverter:
             
             row += 1
 
+        elif question['type'] in TYPE_NAMES:
+            # Respuesta corta, numérica y emparejamiento: solo lectura (se editan en el archivo GIFT)
+            label = "Parejas:" if question['type'] == 'matching' else "Respuestas aceptadas:"
+            ttk.Label(self.editor_frame, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=(10,2))
+            row += 1
+
+            for option in question['options']:
+                if question['type'] == 'matching':
+                    text = f"{option['text'] or '(distractor)'} → {option.get('match', '')}"
+                else:
+                    text = answer_text(question, option) + ("" if option['is_correct'] else "  [sin puntaje]")
+                ttk.Label(self.editor_frame, text=f"  • {text}").grid(row=row, column=0, sticky="w", padx=5, pady=1)
+                row += 1
+
         # Botones de acción para la pregunta
         buttons_frame = ttk.Frame(self.editor_frame)
         buttons_frame.grid(row=row, column=0, sticky="ew", padx=5, pady=10)
@@ -1340,56 +1403,153 @@ class GiftToDocxConverter:
     def quick_cleanup(self, text_to_remove):
         """Aplicar limpieza rápida con texto predefinido"""
         self.cleanup_text.set(text_to_remove)
+        self.cleanup_regex.set(False)  # Los atajos son texto literal
         self.apply_mass_cleanup()
 
-    def apply_mass_cleanup(self):
-        """Aplicar limpieza masiva a todas las preguntas"""
+    def load_cleanup_rules(self):
+        """Cargar reglas de limpieza (literales o regex) desde un archivo JSON"""
+        path = filedialog.askopenfilename(
+            title="Seleccionar reglas de limpieza",
+            filetypes=[("Reglas JSON", "*.json"), ("Todos los archivos", "*.*")]
+        )
+        if not path:
+            return
+
+        try:
+            rules = load_rules(path)
+            CleanupEngine(rules)  # Validar que se puedan combinar
+        except CleanupError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        self.cleanup_rules = rules
+        messagebox.showinfo("Reglas cargadas", f"Se cargaron {len(rules)} regla(s) de {os.path.basename(path)}.\n\n"
+                            "Se aplican junto con el texto escrito al usar Aplicar o Vista previa.")
+
+    def apply_mass_cleanup(self, preview=False):
+        """Aplicar limpieza masiva a todas las preguntas (o solo calcular la vista previa)"""
         if not self.questions:
             messagebox.showerror("Error", "No hay preguntas cargadas")
             return
 
+        if self.cleanup_job is not None:
+            return  # Ya hay una limpieza en curso
+
         text_to_remove = self.cleanup_text.get().strip()
-        if not text_to_remove:
-            messagebox.showerror("Error", "Ingrese el texto a eliminar")
+        if not text_to_remove and not self.cleanup_rules:
+            messagebox.showerror("Error", "Ingrese el texto a eliminar o cargue reglas")
             return
 
-        # Confirmar acción
-        result = messagebox.askyesno(
-            "Confirmar limpieza masiva",
-            f"¿Está seguro de eliminar '{text_to_remove}' de todas las preguntas y opciones?\n\n"
-            "Esta acción no se puede deshacer."
-        )
+        try:
+            rules = list(self.cleanup_rules)
+            if text_to_remove:
+                rules.insert(0, CleanupRule(text_to_remove, regex=self.cleanup_regex.get()))
+            engine = CleanupEngine(rules)
+        except CleanupError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        description = f"'{text_to_remove}'" if text_to_remove else ""
+        if self.cleanup_rules:
+            description += (" + " if description else "") + f"{len(self.cleanup_rules)} regla(s)"
+
+        if not preview:
+            # Confirmar acción
+            result = messagebox.askyesno(
+                "Confirmar limpieza masiva",
+                f"¿Está seguro de eliminar {description} de todas las preguntas y opciones?\n\n"
+                "Podrá revertirla con 'Deshacer'."
+            )
+            if not result:
+                return
 
-        if not result:
+        # Con reglas solo literales, el índice de palabras acota las preguntas a revisar
+        if engine.literal:
+            candidates = {}
+            for rule in engine.rules:
+                for question in self.questions.candidates(rule.pattern):
+                    candidates[question['id']] = question
+            questions = sorted(candidates.values(), key=self.questions.position)
+        else:
+            questions = list(self.questions)
+
+        self.cleanup_job = CleanupJob(engine, questions)
+        self.cleanup_preview = preview
+        self.cleanup_description = description
+        self.root.after(CLEANUP_POLL_MS, self.poll_cleanup_job)
+
+    def poll_cleanup_job(self):
+        """Avanzar la limpieza un tramo; al terminar, mostrar la vista previa o aplicarla"""
+        job = self.cleanup_job
+        if not job.step():
+            self.question_info_label.config(text=f"Revisando preguntas... {job.position}/{job.total}")
+            self.root.after(CLEANUP_POLL_MS, self.poll_cleanup_job)
             return
 
-        changes_made = 0
+        self.cleanup_job = None
+        self.question_info_label.config(text="Seleccione una pregunta para editar")
+        if self.cleanup_preview:
+            self.show_cleanup_preview(job.changes, self.cleanup_description)
+        else:
+            self.commit_mass_cleanup(job.changes, self.cleanup_description)
 
-        # Aplicar limpieza a todas las preguntas
-        for question in self.questions:
-            # Limpiar texto de pregunta
-            if text_to_remove in question['text']:
-                question['text'] = question['text'].replace(text_to_remove, '')
-                changes_made += 1
+    def show_cleanup_preview(self, changes, description):
+        """Ventana con los cambios que haría la limpieza, campo por campo"""
+        if not changes:
+            messagebox.showinfo("Vista previa", f"La limpieza de {description} no cambiaría ninguna pregunta")
+            return
 
-            # Limpiar opciones
-            if question['type'] == 'multiple_choice':
-                for option in question['options']:
-                    if text_to_remove in option['text']:
-                        option['text'] = option['text'].replace(text_to_remove, '')
-                        changes_made += 1
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Vista previa de la limpieza")
+        dialog.geometry("700x450")
+        dialog.transient(self.root)
+        dialog.grab_set()
 
-                    # Limpiar retroalimentación si existe
-                    if option.get('feedback') and text_to_remove in option['feedback']:
-                        option['feedback'] = option['feedback'].replace(text_to_remove, '')
-                        changes_made += 1
+        questions_changed = len({change.question_id for change in changes})
+        ttk.Label(dialog, text=f"Limpieza de {description}: {len(changes)} campo(s) en {questions_changed} pregunta(s). "
+                               "[-texto quitado-] {+texto agregado+}", wraplength=680).pack(anchor="w", padx=10, pady=(10,2))
 
-        # Reanalizar problemas después de la limpieza
-        for question in self.questions:
-            question['problems'] = self.detect_question_problems(question)
+        text_frame = ttk.Frame(dialog)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        text_widget = tk.Text(text_frame, wrap=tk.WORD)
+        text_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
+        text_widget.configure(yscrollcommand=text_scrollbar.set)
+
+        text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        lines = []
+        for change in changes[:PREVIEW_MAX_CHANGES]:
+            if self.questions.get(change.question_id) is not change.question:
+                continue  # La pregunta se eliminó mientras se revisaba
+            position = self.questions.position(change.question_id)
+            lines.append(f"Pregunta {position + 1} ({change.label}): {change.diff()}")
+        if len(changes) > PREVIEW_MAX_CHANGES:
+            lines.append(f"... y {len(changes) - PREVIEW_MAX_CHANGES} cambio(s) más")
+        text_widget.insert("1.0", "\n".join(lines))
+        text_widget.config(state=tk.DISABLED)
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def apply_changes():
+            dialog.destroy()
+            self.commit_mass_cleanup(changes, description)
+
+        ttk.Button(button_frame, text="Aplicar cambios", command=apply_changes).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancelar", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def commit_mass_cleanup(self, changes, description):
+        """Escribir los cambios calculados, guardarlos para deshacer y reanalizar lo modificado"""
+        # Descartar cambios de preguntas eliminadas mientras se revisaba
+        changes = [change for change in changes if self.questions.get(change.question_id) is change.question]
+        applied = self.cleanup_journal.apply(changes, description)
+        for change in applied:
+            self.questions.mark_changed(change.question)
 
-        # Actualizar interfaz
-        self.update_questions_list()
+        # Reanalizar problemas y actualizar las filas de las preguntas modificadas
+        self.refresh_questions_list()
 
         # Si hay una pregunta seleccionada, actualizar el editor
         current_selection = self.questions_listbox.curselection()
@@ -1402,10 +1562,30 @@ class GiftToDocxConverter:
         messagebox.showinfo(
             "Limpieza completada",
             f"Limpieza masiva completada.\n\n"
-            f"Se realizaron {changes_made} cambios en total.\n"
+            f"Se realizaron {len(applied)} cambios en total.\n"
             f"Los problemas han sido reanalizado automáticamente."
         )
 
+    def undo_mass_cleanup(self):
+        """Deshacer la última limpieza masiva aplicada"""
+        if not self.cleanup_journal:
+            messagebox.showinfo("Deshacer", "No hay limpiezas para deshacer")
+            return
+
+        description, restored, conflicts = self.cleanup_journal.undo()
+        for change in restored:
+            if self.questions.get(change.question_id) is change.question:
+                self.questions.mark_changed(change.question)
+        self.refresh_questions_list()
+
+        current_selection = self.questions_listbox.curselection()
+        if current_selection:
+            self.show_question_editor(current_selection[0])
+
+        message = f"Se deshizo la limpieza de {description}: {len(restored)} campo(s) restaurado(s)."
+        if conflicts:
+            message += f"\n\n{len(conflicts)} campo(s) se editaron después de la limpieza y no se modificaron."
+        messagebox.showinfo("Deshacer", message)
 
     def reanalyze_question(self, question_index):
         """Reanalizar problemas de la pregunta actual"""
@@ -1427,14 +1607,14 @@ class GiftToDocxConverter:
 
         question = self.questions[question_index]
 
-        # Actualizar texto de pregunta
-        if hasattr(question, 'text_var'):
+        # Actualizar texto de pregunta (son diccionarios: hasattr nunca encontraba los campos)
+        if 'text_var' in question:
             question['text'] = question['text_var'].get()
-        elif hasattr(question, 'text_widget'):
+        elif 'text_widget' in question:
             question['text'] = question['text_widget'].get("1.0", tk.END).strip()
 
         # Actualizar puntaje
-        if hasattr(question, 'score_var'):
+        if 'score_var' in question:
             try:
                 question['score'] = float(question['score_var'].get())
             except ValueError:
@@ -1443,20 +1623,17 @@ class GiftToDocxConverter:
         # Actualizar opciones para preguntas de alternativas
         if question['type'] == 'multiple_choice':
             for option in question['options']:
-                if hasattr(option, 'text_var'):
+                if 'text_var' in option:
                     option['text'] = option['text_var'].get()
 
         # Actualizar líneas para preguntas de desarrollo
         elif question['type'] == 'essay':
-            if hasattr(question, 'lines_var'):
+            if 'lines_var' in question:
                 question['lines'] = question['lines_var'].get()
 
-        # Reanalizar problemas solo para preguntas de alternativas
-        if question['type'] == 'multiple_choice':
-            question['problems'] = self.detect_question_problems(question)
-
-        # Actualizar lista de preguntas
-        self.update_questions_list()
+        # Reindexar, reanalizar y redibujar solo esta pregunta
+        self.questions.mark_changed(question)
+        self.refresh_questions_list()
 
         # Reseleccionar la pregunta actual
         self.questions_listbox.selection_set(question_index)
@@ -1503,10 +1680,10 @@ class GiftToDocxConverter:
         for question in self.questions:
             # Agregar título si existe
             if question.get('title') and question['title'] != "Sin título":
-                gift_lines.append(f"::{question['title']}::")
+                gift_lines.append(f"::{escape_gift(question['title'])}::")
 
             # Agregar texto de pregunta
-            gift_lines.append(question['text'])
+            gift_lines.append(escape_gift(question['text']))
 
             # Agregar opciones si es de opción múltiple
             if question['type'] == 'multiple_choice':
@@ -1514,11 +1691,13 @@ class GiftToDocxConverter:
 
                 for option in question['options']:
                     prefix = "=" if option['is_correct'] else "~"
-                    option_text = option['text']
+                    option_text = escape_gift(option['text'])
+                    if option.get('weight') is not None and not option['is_correct']:
+                        option_text = f"%{option['weight']:g}%" + option_text
 
                     # Agregar retroalimentación si existe
                     if option.get('feedback'):
-                        option_text += f"#{option['feedback']}"
+                        option_text += f"#{escape_gift(option['feedback'])}"
 
                     options_text += f"{prefix}{option_text}"
 
@@ -1530,6 +1709,26 @@ class GiftToDocxConverter:
                 lines = question.get('lines', 5)
                 gift_lines.append(f"{{# Pregunta de desarrollo - {lines} líneas}}")
 
+            elif question['type'] in ('short_answer', 'numerical'):
+                answers = []
+                for option in question['options']:
+                    weight = option.get('weight')
+                    if weight is None and not option['is_correct']:
+                        weight = 0
+                    option_text = f"%{weight:g}%" if weight is not None else ""
+                    # Los rangos numéricos (2:0.5, 1..3) se escriben tal cual
+                    option_text += option['text'] if question['type'] == 'numerical' else escape_gift(option['text'])
+                    if option.get('feedback'):
+                        option_text += f"#{escape_gift(option['feedback'])}"
+                    answers.append("=" + option_text)
+                marker = "#" if question['type'] == 'numerical' else ""
+                gift_lines.append(f"{{{marker}{' '.join(answers)}}}")
+
+            elif question['type'] == 'matching':
+                pairs = [f"={escape_gift(option['text'])} -> {escape_gift(option.get('match', ''))}"
+                         for option in question['options']]
+                gift_lines.append(f"{{{' '.join(pairs)}}}")
+
             # Línea en blanco entre preguntas
             gift_lines.append("")
 
@@ -1563,94 +1762,10 @@ class GiftToDocxConverter:
 
     def parse_gift_questions(self, content, source_file=""):
         """Parsear preguntas en formato GIFT - actualizado para incluir puntajes"""
-        # Eliminar comentarios
-        content = re.sub(r'//.*?$', '', content, flags=re.MULTILINE)
-
-
-        # Dividir en preguntas individuales
-        question_blocks = re.split(r'\n\s*\n', content)
-
-        questions = []
-
-        for block in question_blocks:
-            block = block.strip()
-            if not block:
-                continue
-
-            try:
-                # Extraer el título (si existe)
-                title_match = re.match(r'::(.+?)::', block)
-                title = title_match.group(1).strip() if title_match else "Sin título"
-
-                # Remover el título del bloque para seguir procesando
-                if title_match:
-                    block = block[title_match.end():].strip()
-
-                # Extraer el texto de la pregunta (todo hasta la primera respuesta)
-                question_text_match = re.match(r'(.*?)\{', block, re.DOTALL)
-                if not question_text_match:
-                    continue
-
-                question_text = question_text_match.group(1).strip()
-
-                # Extraer las opciones y retroalimentación
-                options_block = block[question_text_match.end()-1:]
-
-                # Procesar según el tipo de pregunta
-                question_data = {
-                    'title': title,
-                    'text': question_text,
-                    'type': 'unknown',
-                    'options': [],
-                    'correct_answer': None,
-                    'feedback': {},
-                    'source_file': source_file,
-                    'problems': [],
-                    'score': 1.0  # Puntaje por defecto
-                }
-
-                # Verifica si es una pregunta de opción múltiple
-                if re.match(r'\{', options_block):
-                    # Dividir las opciones por ~ o = al inicio, conservando el delimitador
-                    options_match = re.split(r'(?=[~=])', options_block.strip()[1:-1].strip())
-
-                    options = []
-                    for option_text in options_match:
-                        option_text = option_text.strip()
-                        if not option_text:
-                            continue
-
-                        is_correct = option_text.startswith('=')
-                        option_text = option_text[1:].strip()  # Eliminar el prefijo ~ o =
-
-                        # Extraer retroalimentación
-                        feedback_text = ""
-                        feedback_idx = option_text.find('#')
-
-                        if feedback_idx != -1:
-                            feedback_text = option_text[feedback_idx+1:].strip()
-                            option_text = option_text[:feedback_idx].strip()
-
-                        options.append({
-                            'text': option_text,
-                            'is_correct': is_correct,
-                            'feedback': feedback_text
-                        })
-
-                        if is_correct:
-                            question_data['correct_answer'] = option_text
-
-                    question_data['type'] = 'multiple_choice'
-                    question_data['options'] = options
-
-                # Si hay al menos texto de pregunta, la añadimos
-                if question_data['text']:
-                    questions.append(question_data)
-
-            except Exception as e:
-                print(f"Error al procesar una pregunta en {source_file}: {str(e)}")
-                continue
-
+        errors = []
+        questions = parse_gift_text(content, source_file, errors)
+        for error in errors:
+            print(f"Error al procesar una pregunta en {source_file}: {str(error)}")
         return questions
 
     def update_summary(self):
@@ -1673,8 +1788,15 @@ class GiftToDocxConverter:
         # Información de preguntas
         self.summary_text.insert(tk.END, f"Total de preguntas: {len(self.questions)}\n")
         self.summary_text.insert(tk.END, f"Preguntas de opción múltiple: {sum(1 for q in self.questions if q['type'] == 'multiple_choice')}\n")
+        for question_type, type_name in TYPE_NAMES.items():
+            count = sum(1 for q in self.questions if q['type'] == question_type)
+            if question_type != 'multiple_choice' and count:
+                self.summary_text.insert(tk.END, f"Preguntas de tipo {type_name.lower()}: {count}\n")
         self.summary_text.insert(tk.END, f"Orden de preguntas: {'Aleatorio' if self.question_order.get() == 'aleatorio' else 'Por archivos'}\n")
         self.summary_text.insert(tk.END, f"Opciones aleatorizadas: {'Sí' if self.randomize_options.get() else 'No'}\n")
+        if self.randomize_options.get():
+            max_run = self.max_run.get()
+            self.summary_text.insert(tk.END, f"Máx. respuestas iguales seguidas: {max_run if max_run else 'sin límite'}\n")
 
         # Información de problemas detectados
         questions_with_problems = [q for q in self.questions if q.get('problems')]
@@ -1692,8 +1814,36 @@ class GiftToDocxConverter:
         self.summary_text.insert(tk.END, "1. Examen.docx - Contiene las preguntas y hoja de respuestas\n")
         self.summary_text.insert(tk.END, "2. Respuestas.docx - Contiene las respuestas correctas con estadísticas\n")
 
+    def get_render_settings(self):
+        """Configuración del Paso 4 como diccionario simple (se puede enviar a otros procesos)"""
+        return make_settings(
+            exam_title=self.exam_title.get(),
+            answer_sheet_title=self.answer_sheet_title.get(),
+            institution_name=self.institution_name.get(),
+            course_name=self.course_name.get(),
+            exam_date=self.exam_date.get(),
+            show_student_name=self.show_student_name.get(),
+            show_student_id=self.show_student_id.get(),
+            show_student_section=self.show_student_section.get(),
+            show_exam_score=self.show_exam_score.get(),
+            title_font_size=self.title_font_size.get(),
+            question_font_size=self.question_font_size.get(),
+            font_name=self.font_name.get(),
+            page_size=self.page_size.get(),
+            margin_top=self.margin_top.get(),
+            margin_bottom=self.margin_bottom.get(),
+            margin_left=self.margin_left.get(),
+            margin_right=self.margin_right.get(),
+            show_statistics=self.show_statistics.get(),
+            show_detailed_info=self.show_detailed_info.get(),
+            show_file_info=self.show_file_info.get(),
+            randomize_options=self.randomize_options.get(),
+            max_run=self.max_run.get(),
+            source_files=[os.path.basename(path) for path in self.gift_files],
+        )
+
     def generate_docx(self):
-        """Generar los documentos DOCX"""
+        """Generar los documentos DOCX (una forma aquí mismo, varias en un pool de procesos)"""
         if not self.questions:
             messagebox.showerror("Error", "No hay preguntas para generar los documentos")
             return
@@ -1703,11 +1853,22 @@ class GiftToDocxConverter:
             return
 
         try:
-            # IMPORTANTE: Generar PRIMERO el documento de examen para llenar self.answer_keys
-            exam_doc = self.create_exam_document()
+            forms = int(self.variant_count.get())
+            seed_text = self.variant_seed.get().strip()
+            seed = int(seed_text) if seed_text else None
+        except (ValueError, tk.TclError):
+            messagebox.showerror("Error", "La cantidad de formas y la semilla deben ser números enteros")
+            return
 
-            # LUEGO generar el documento de respuestas (que ya tendrá las estadísticas)
-            answers_doc = self.create_answers_document()
+        if forms > 1:
+            self.generate_exam_variants(forms, seed)
+            return
+
+        try:
+            # Examen y respuestas salen de la misma planificación de claves
+            questions = [plain_question(question) for question in self.questions]
+            exam_doc, answers_doc, self.answer_keys = render_exam(questions, self.get_render_settings(),
+                                                                  random.Random(seed))
 
             # Generar nombres de archivo con timestamp si ya existen
             import datetime
@@ -1740,536 +1901,56 @@ class GiftToDocxConverter:
         except Exception as e:
             messagebox.showerror("Error", f"Error al generar los documentos: {str(e)}")
 
-    def create_exam_document(self):
-        """Crear documento de examen con configuraciones del Paso 4"""
-        doc = Document()
-
-        # Configurar página según configuraciones
-        section = doc.sections[0]
-        
-        # Configurar tamaño de página
-        if self.page_size.get() == "A4":
-            section.page_width = Inches(8.27)
-            section.page_height = Inches(11.69)
-        elif self.page_size.get() == "Carta (Letter)":
-            section.page_width = Inches(8.5)
-            section.page_height = Inches(11)
-        elif self.page_size.get() == "Legal":
-            section.page_width = Inches(8.5)
-            section.page_height = Inches(14)
-        elif self.page_size.get() == "A3":
-            section.page_width = Inches(11.69)
-            section.page_height = Inches(16.54)
-        
-        # Configurar márgenes (convertir cm a inches: cm * 0.393701)
-        section.top_margin = Inches(self.margin_top.get() * 0.393701)
-        section.bottom_margin = Inches(self.margin_bottom.get() * 0.393701)
-        section.left_margin = Inches(self.margin_left.get() * 0.393701)
-        section.right_margin = Inches(self.margin_right.get() * 0.393701)
-
-        # Configurar estilos con fuente seleccionada
-        style = doc.styles['Normal']
-        style.font.name = self.font_name.get()
-        style.font.size = Pt(self.question_font_size.get())
-
-        # Encabezado institucional
-        if self.institution_name.get():
-            institution_p = doc.add_paragraph()
-            institution_run = institution_p.add_run(self.institution_name.get())
-            institution_run.font.name = self.font_name.get()
-            institution_run.font.size = Pt(self.title_font_size.get() - 2)
-            institution_run.bold = True
-            institution_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Título del examen
-        title = doc.add_paragraph()
-        title_run = title.add_run(self.exam_title.get())
-        title_run.font.name = self.font_name.get()
-        title_run.font.size = Pt(self.title_font_size.get())
-        title_run.bold = True
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Información del curso y fecha
-        if self.course_name.get() or self.exam_date.get():
-            info_p = doc.add_paragraph()
-            info_text = []
-            if self.course_name.get():
-                info_text.append(f"Curso: {self.course_name.get()}")
-            if self.exam_date.get():
-                info_text.append(f"Fecha: {self.exam_date.get()}")
-            
-            info_run = info_p.add_run(" | ".join(info_text))
-            info_run.font.name = self.font_name.get()
-            info_run.font.size = Pt(self.question_font_size.get())
-            info_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        doc.add_paragraph()
-
-        # Información del estudiante (solo campos habilitados)
-        student_fields = []
-        if self.show_student_name.get():
-            student_fields.append("Nombre: ________________________________")
-        if self.show_student_id.get():
-            student_fields.append("RUT/ID: ________________________________")
-        if self.show_student_section.get():
-            student_fields.append("Sección: ________________________________")
-        if self.show_exam_score.get():
-            total_score = self.get_total_score()
-            student_fields.append(f"Puntaje: ______ / {total_score}")
-
-        if student_fields:
-            for field in student_fields:
-                field_p = doc.add_paragraph(field)
-                field_p.style.font.name = self.font_name.get()
-                field_p.style.font.size = Pt(self.question_font_size.get())
-
-        doc.add_paragraph()
-
-        # Limpiar el diccionario de respuestas
-        self.answer_keys = {}
-
-        # Analizar el número de opciones para cada pregunta
-        options_per_question = {}
-        for i, question in enumerate(self.questions, 1):
-            if question['type'] == 'multiple_choice':
-                options_per_question[i] = len(question['options'])
-            elif question['type'] == 'essay':
-                options_per_question[i] = 0  # Sin opciones para desarrollo
-
-        # Encontrar el máximo número de opciones por pregunta
-        max_options = max([opt for opt in options_per_question.values() if opt > 0], default=4)
-
-        # Calcular la distribución óptima de letras correctas
-        option_chars = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-        distributions = {}
-
-        # Agrupar preguntas por número de opciones (solo alternativas)
-        for q_num, num_options in options_per_question.items():
-            if num_options > 0:  # Solo preguntas de alternativas
-                if num_options not in distributions:
-                    distributions[num_options] = []
-                distributions[num_options].append(q_num)
-
-        # Para cada grupo, asignar letras correctas de manera equitativa
-        for num_options, q_numbers in distributions.items():
-            valid_chars = option_chars[:num_options]
-            target_answers = []
-            for char in valid_chars:
-                target_answers.extend([char] * (len(q_numbers) // len(valid_chars)))
-
-            remaining = len(q_numbers) - len(target_answers)
-            if remaining > 0:
-                target_answers.extend(random.sample(valid_chars, remaining))
-
-            random.shuffle(target_answers)
-
-            for i, q_num in enumerate(q_numbers):
-                self.answer_keys[q_num] = target_answers[i]
-
-        # Preguntas
-        for i, question in enumerate(self.questions, 1):
-            # Añadir texto de la pregunta
-            question_p = doc.add_paragraph(f"{i}. {question['text']}")
-            question_p.style.font.name = self.font_name.get()
-            question_p.style.font.size = Pt(self.question_font_size.get())
-
-            # Si es de opción múltiple, añadir opciones
-            if question['type'] == 'multiple_choice':
-                options = question['options'].copy()
-                num_options = len(options)
-
-                # Reorganizar opciones según el algoritmo mejorado
-                if self.randomize_options.get() and i in self.answer_keys:
-                    correct_option = next((opt for opt in options if opt['is_correct']), None)
-                    if correct_option:
-                        target_position = ord(self.answer_keys[i]) - ord('a')
-                        options.remove(correct_option)
-                        random.shuffle(options)
-                        if target_position < len(options) + 1:
-                            options.insert(target_position, correct_option)
-                        else:
-                            options.append(correct_option)
-                else:
-                    random.shuffle(options)
-                    for j, opt in enumerate(options):
-                        if opt['is_correct'] and i not in self.answer_keys:
-                            self.answer_keys[i] = option_chars[j] if j < len(option_chars) else 'X'
-
-                # Añadir opciones
-                for j, opt in enumerate(options):
-                    if j < len(option_chars):
-                        option_p = doc.add_paragraph(f"   {option_chars[j].upper()}) {opt['text']}")
-                        option_p.style.font.name = self.font_name.get()
-                        option_p.style.font.size = Pt(self.question_font_size.get())
-
-            elif question['type'] == 'essay':
-                # Añadir líneas para respuesta de desarrollo
-                lines = question.get('lines', 5)
-                for _ in range(lines):
-                    line_p = doc.add_paragraph("_" * 80)
-                    line_p.style.font.name = self.font_name.get()
-                    line_p.style.font.size = Pt(self.question_font_size.get())
-
-            # Espacio entre preguntas
-            doc.add_paragraph()
-
-        # Agregar salto de página antes de la hoja de respuestas
-        doc.add_page_break()
-
-        # Título de la hoja de respuestas
-        answer_title = doc.add_paragraph()
-        answer_title_run = answer_title.add_run(self.answer_sheet_title.get())
-        answer_title_run.font.name = self.font_name.get()
-        answer_title_run.font.size = Pt(self.title_font_size.get())
-        answer_title_run.bold = True
-        answer_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Información del estudiante en hoja de respuestas
-        if student_fields:
-            doc.add_paragraph("Marque con una X la respuesta correcta para cada pregunta.")
-            doc.add_paragraph()
-            
-            for field in student_fields:
-                field_p = doc.add_paragraph(field)
-                field_p.style.font.name = self.font_name.get()
-                field_p.style.font.size = Pt(self.question_font_size.get())
-
-        doc.add_paragraph()
-
-        # Crear tabla para la hoja de respuestas
-        num_questions = len(self.questions)
-        rows_per_column = (num_questions + 1) // 2
-
-        cols_per_group = max_options + 1
-        total_cols = cols_per_group * 2
-
-        table = doc.add_table(rows=rows_per_column + 1, cols=total_cols)
-        table.style = 'Table Grid'
-
-        # Encabezados
-        header_letters = [chr(65 + i) for i in range(max_options)]
-
-        cell = table.cell(0, 0)
-        cell.text = "Preg"
+    def generate_exam_variants(self, forms, seed):
+        """Generar varias formas en un pool de procesos sin bloquear la interfaz"""
+        if self.variant_batch is not None:
+            return  # Ya hay una generación en curso
 
-        for i, letter in enumerate(header_letters):
-            cell = table.cell(0, i + 1)
-            cell.text = letter
+        import datetime
 
-        if num_questions > rows_per_column:
-            cell = table.cell(0, cols_per_group)
-            cell.text = "Preg"
+        output_dir = os.path.join(self.output_dir.get(), "Formas")
+        if os.path.exists(output_dir):
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_dir = os.path.join(self.output_dir.get(), f"Formas_{timestamp}")
 
-            for i, letter in enumerate(header_letters):
-                cell = table.cell(0, cols_per_group + i + 1)
-                cell.text = letter
-
-        # Llenar la tabla
-        shading_black_xml = parse_xml(f'<w:shd {nsdecls("w")} w:fill="000000"/>')
-
-        for i in range(num_questions):
-            q_num = i + 1
-            row_idx = (i % rows_per_column) + 1
-            question = self.questions[i]
-
-            if q_num in options_per_question:
-                q_options = options_per_question[q_num]
-            else:
-                q_options = 0
-
-            if i < rows_per_column:  # Primera columna
-                cell = table.cell(row_idx, 0)
-                cell.text = str(q_num)
-
-                # Manejar celdas según tipo de pregunta
-                if question['type'] == 'essay':
-                    # Pregunta de desarrollo: todas las celdas negras
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-                else:
-                    # Pregunta de alternativas: sombrear celdas que superan el número de opciones
-                    for j in range(q_options + 1, max_options + 1):
-                        cell = table.cell(row_idx, j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-            else:  # Segunda columna
-                cell = table.cell(row_idx, cols_per_group)
-                cell.text = str(q_num)
-
-                if question['type'] == 'essay':
-                    # Pregunta de desarrollo: todas las celdas negras
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, cols_per_group + j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-                else:
-                    # Pregunta de alternativas: sombrear celdas que superan el número de opciones
-                    for j in range(q_options + 1, max_options + 1):
-                        cell = table.cell(row_idx, cols_per_group + j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-
-        # Ajustar ancho de columnas
-        for cell in table.columns[0].cells:
-            cell.width = Inches(0.5)
-
-        if cols_per_group < len(table.columns):
-            for cell in table.columns[cols_per_group].cells:
-                cell.width = Inches(0.5)
-
-        return doc
-
-
-    def create_answers_document(self):
-        """Crear documento de respuestas con configuraciones del Paso 4"""
-        doc = Document()
-
-        # Configurar página según configuraciones (igual que examen)
-        section = doc.sections[0]
-        
-        if self.page_size.get() == "A4":
-            section.page_width = Inches(8.27)
-            section.page_height = Inches(11.69)
-        elif self.page_size.get() == "Carta (Letter)":
-            section.page_width = Inches(8.5)
-            section.page_height = Inches(11)
-        elif self.page_size.get() == "Legal":
-            section.page_width = Inches(8.5)
-            section.page_height = Inches(14)
-        elif self.page_size.get() == "A3":
-            section.page_width = Inches(11.69)
-            section.page_height = Inches(16.54)
-        
-        section.top_margin = Inches(self.margin_top.get() * 0.393701)
-        section.bottom_margin = Inches(self.margin_bottom.get() * 0.393701)
-        section.left_margin = Inches(self.margin_left.get() * 0.393701)
-        section.right_margin = Inches(self.margin_right.get() * 0.393701)
-
-        # Configurar estilos
-        style = doc.styles['Normal']
-        style.font.name = self.font_name.get()
-        style.font.size = Pt(self.question_font_size.get())
-
-        # Encabezado
-        if self.institution_name.get():
-            institution_p = doc.add_paragraph()
-            institution_run = institution_p.add_run(self.institution_name.get())
-            institution_run.font.name = self.font_name.get()
-            institution_run.font.size = Pt(self.title_font_size.get() - 2)
-            institution_run.bold = True
-            institution_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Título
-        title = doc.add_paragraph()
-        title_run = title.add_run("RESPUESTAS CORRECTAS")
-        title_run.font.name = self.font_name.get()
-        title_run.font.size = Pt(self.title_font_size.get())
-        title_run.bold = True
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        if self.course_name.get() or self.exam_date.get():
-            info_p = doc.add_paragraph()
-            info_text = []
-            if self.course_name.get():
-                info_text.append(f"Curso: {self.course_name.get()}")
-            if self.exam_date.get():
-                info_text.append(f"Fecha: {self.exam_date.get()}")
-            
-            info_run = info_p.add_run(" | ".join(info_text))
-            info_run.font.name = self.font_name.get()
-            info_run.font.size = Pt(self.question_font_size.get())
-            info_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        doc.add_paragraph()
-
-        # Mostrar estadísticas según configuración
-        if self.show_statistics.get():
-            stats_p = doc.add_heading('Estadísticas del examen', level=2)
-            stats_p.style.font.name = self.font_name.get()
-
-            total_score = self.get_total_score()
-            multiple_choice_count = sum(1 for q in self.questions if q['type'] == 'multiple_choice')
-            essay_count = sum(1 for q in self.questions if q['type'] == 'essay')
-
-            doc.add_paragraph(f"Total de preguntas: {len(self.questions)}")
-            doc.add_paragraph(f"Preguntas de alternativas: {multiple_choice_count}")
-            doc.add_paragraph(f"Preguntas de desarrollo: {essay_count}")
-            doc.add_paragraph(f"Puntaje total: {total_score} puntos")
-
-        if self.show_file_info.get() and len(self.gift_files) > 1:
-            files_p = doc.add_heading('Archivos procesados', level=2)
-            files_p.style.font.name = self.font_name.get()
-            
-            for i, file_path in enumerate(self.gift_files, 1):
-                filename = os.path.basename(file_path)
-                file_questions = sum(1 for q in self.questions if q['source_file'] == filename)
-                doc.add_paragraph(f"{i}. {filename} ({file_questions} preguntas)")
-
-        if self.show_detailed_info.get():
-            # Análisis de distribución de respuestas correctas
-            if self.answer_keys:
-                answer_counter = collections.Counter(self.answer_keys.values())
-                dist_p = doc.add_heading('Distribución de alternativas correctas', level=2)
-                dist_p.style.font.name = self.font_name.get()
-
-                for letter, count in sorted(answer_counter.items()):
-                    doc.add_paragraph(f"Alternativa {letter.upper()}: {count} preguntas")
-
-        doc.add_paragraph()
-
-        # TABLA DE RESPUESTAS CORRECTAS (IDÉNTICA AL EXAMEN PERO CON RESPUESTAS)
-        table_title = doc.add_heading('Hoja de Respuestas Correctas', level=2)
-        table_title.style.font.name = self.font_name.get()
-        
-        # Recrear la misma tabla que en el examen
-        num_questions = len(self.questions)
-        rows_per_column = (num_questions + 1) // 2
-        
-        # Encontrar máximo de opciones
-        max_options = 4
-        for question in self.questions:
-            if question['type'] == 'multiple_choice':
-                max_options = max(max_options, len(question['options']))
-
-        cols_per_group = max_options + 1
-        total_cols = cols_per_group * 2
-
-        table = doc.add_table(rows=rows_per_column + 1, cols=total_cols)
-        table.style = 'Table Grid'
-
-        # Encabezados idénticos
-        header_letters = [chr(65 + i) for i in range(max_options)]
-
-        cell = table.cell(0, 0)
-        cell.text = "Preg"
-
-        for i, letter in enumerate(header_letters):
-            cell = table.cell(0, i + 1)
-            cell.text = letter
-
-        if num_questions > rows_per_column:
-            cell = table.cell(0, cols_per_group)
-            cell.text = "Preg"
-
-            for i, letter in enumerate(header_letters):
-                cell = table.cell(0, cols_per_group + i + 1)
-                cell.text = letter
-
-        # Llenar tabla con respuestas correctas
-        shading_black_xml = parse_xml(f'<w:shd {nsdecls("w")} w:fill="000000"/>')
+        try:
+            self.variant_batch = VariantBatch(self.questions, self.get_render_settings(),
+                                              variant_seeds(forms, seed), output_dir)
+            self.variant_batch.start()
+        except Exception as e:
+            self.variant_batch = None
+            messagebox.showerror("Error", f"Error al generar los documentos: {str(e)}")
+            return
 
-        for i in range(num_questions):
-            q_num = i + 1
-            row_idx = (i % rows_per_column) + 1
-            question = self.questions[i]
+        self.generate_button.config(state=tk.DISABLED, text=f"Generando 0/{forms}")
+        self.root.after(VARIANT_POLL_MS, self.poll_exam_variants)
 
-            if i < rows_per_column:  # Primera columna
-                cell = table.cell(row_idx, 0)
-                cell.text = str(q_num)
+    def poll_exam_variants(self):
+        """Revisar qué formas terminaron; al final escribir el índice de claves"""
+        batch = self.variant_batch
+        batch.poll()
+        if not batch.finished:
+            self.generate_button.config(text=f"Generando {len(batch.results)}/{len(batch.seeds)}")
+            self.root.after(VARIANT_POLL_MS, self.poll_exam_variants)
+            return
 
-                if question['type'] == 'essay':
-                    # Pregunta de desarrollo: todas las celdas negras
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-                else:
-                    # Pregunta de alternativas: mostrar respuesta correcta
-                    num_options = len(question['options'])
-                    correct_letter = self.answer_keys.get(q_num, 'X')
-                    correct_index = ord(correct_letter.upper()) - ord('A')
-
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, j)
-                        option_index = j - 1
-                        
-                        if option_index >= num_options:
-                            # Opción no existe: celda negra
-                            cell._element.get_or_add_tcPr().append(shading_black_xml)
-                            cell.text = ""
-                        elif option_index == correct_index:
-                            # Respuesta correcta: mostrar letra
-                            cell.text = correct_letter.upper()
-                        else:
-                            # Respuesta incorrecta: celda negra
-                            cell._element.get_or_add_tcPr().append(shading_black_xml)
-                            cell.text = ""
-            else:  # Segunda columna
-                cell = table.cell(row_idx, cols_per_group)
-                cell.text = str(q_num)
-
-                if question['type'] == 'essay':
-                    # Pregunta de desarrollo: todas las celdas negras
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, cols_per_group + j)
-                        cell._element.get_or_add_tcPr().append(shading_black_xml)
-                        cell.text = ""
-                else:
-                    # Pregunta de alternativas: mostrar respuesta correcta
-                    num_options = len(question['options'])
-                    correct_letter = self.answer_keys.get(q_num, 'X')
-                    correct_index = ord(correct_letter.upper()) - ord('A')
-
-                    for j in range(1, max_options + 1):
-                        cell = table.cell(row_idx, cols_per_group + j)
-                        option_index = j - 1
-                        
-                        if option_index >= num_options:
-                            # Opción no existe: celda negra
-                            cell._element.get_or_add_tcPr().append(shading_black_xml)
-                            cell.text = ""
-                        elif option_index == correct_index:
-                            # Respuesta correcta: mostrar letra
-                            cell.text = correct_letter.upper()
-                        else:
-                            # Respuesta incorrecta: celda negra
-                            cell._element.get_or_add_tcPr().append(shading_black_xml)
-                            cell.text = ""
-
-        doc.add_paragraph()
-
-        # Detalles de preguntas (según configuración)
-        if self.show_detailed_info.get():
-            details_p = doc.add_heading('Detalles de las preguntas', level=2)
-            details_p.style.font.name = self.font_name.get()
-
-            for i, question in enumerate(self.questions, 1):
-                if len(self.gift_files) > 1:
-                    source_p = doc.add_paragraph()
-                    source_run = source_p.add_run(f"[Archivo: {question['source_file']}]")
-                    source_run.italic = True
-
-                question_p = doc.add_paragraph()
-                question_run = question_p.add_run(f"{i}. {question['text']}")
-                question_run.bold = True
-
-                if question['type'] == 'multiple_choice':
-                    correct_letter = self.answer_keys.get(i, "?")
-                    correct_options = [opt for opt in question['options'] if opt['is_correct']]
-
-                    if correct_options:
-                        correct_answer = correct_options[0]['text']
-                        score = question.get('score', 1.0)
-                        doc.add_paragraph(f"   Respuesta correcta: {correct_letter.upper()}) {correct_answer}")
-                        doc.add_paragraph(f"   Puntaje: {score} punto(s)")
-
-                        if correct_options[0]['feedback']:
-                            doc.add_paragraph(f"   Retroalimentación: {correct_options[0]['feedback']}")
-                    else:
-                        doc.add_paragraph("   Respuesta correcta: No encontrada")
-                
-                elif question['type'] == 'essay':
-                    score = question.get('score', 1.0)
-                    lines = question.get('lines', 5)
-                    doc.add_paragraph(f"   Tipo: Pregunta de desarrollo")
-                    doc.add_paragraph(f"   Líneas asignadas: {lines}")
-                    doc.add_paragraph(f"   Puntaje: {score} punto(s)")
+        self.variant_batch = None
+        self.generate_button.config(state=tk.NORMAL, text="Generar documentos DOCX")
 
-                doc.add_paragraph()
+        failed = [result for result in batch.ordered_results() if result.error]
+        try:
+            csv_path, json_path = write_key_index(batch.results, batch.questions, batch.output_dir)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo escribir el índice de claves: {str(e)}")
+            return
 
-        return doc
+        message = (f"Se generaron {len(batch.seeds) - len(failed)} forma(s) en:\n{batch.output_dir}\n\n"
+                   f"Índice de claves:\n- {os.path.basename(csv_path)}\n- {os.path.basename(json_path)}")
+        if failed:
+            details = "\n".join(f"- {result.name}: {result.error}" for result in failed)
+            messagebox.showwarning("Formas con errores", f"{message}\n\nNo se pudieron generar:\n{details}")
+        else:
+            messagebox.showinfo("Éxito", message)
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,409 @@
+"""
+Conversión GIFT → DOCX sin interfaz gráfica
+
+Las mismas etapas que los pasos de la interfaz, sin Tk ni ventanas de mensaje:
+
+  1. load_questions: importar los archivos GIFT (en paralelo, ver gift_ingest.py)
+  2. clean_questions: limpieza masiva con reglas (ver cleanup_engine.py)
+  3. analyze_questions: detectar problemas (respuesta correcta más larga,
+     distractores cortos, frases problemáticas) en el texto ya limpio
+  4. order_questions: orden por archivos o aleatorio
+  5. render_documents: examen y respuestas, o varias formas con su índice de
+     claves (ver docx_render.py y exam_variants.py)
+
+Toda la configuración va en un EngineConfig, que se puede armar en código o
+leer de un JSON con las mismas claves:
+
+    {"threshold": 12, "question_order": "aleatorio", "seed": 2024, "forms": 4,
+     "cleanup_rules": ["[html]", {"buscar": "\\\\s+$", "regex": true}],
+     "render": {"exam_title": "CERTAMEN 1", "institution_name": "Universidad"}}
+
+convert() corre todas las etapas y devuelve un ConversionResult con el tiempo
+de cada una, para perfilar y comparar corridas.
+
+Uso:
+  python3 gift_engine.py banco1.gift [banco2.gift | carpeta/ ...] [-c config.json] [-o salida/]
+                         [-n formas] [--seed N] [--each] [--fail-on-problems] [--profile archivo.prof]
+
+Con --each cada banco se convierte por separado en salida/<nombre del banco>/.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+from cleanup_engine import CleanupEngine, CleanupError, CleanupJournal, load_rules, parse_rules
+from docx_render import DEFAULT_SETTINGS, make_settings, plain_question, render_exam
+from exam_variants import VariantBatch, variant_seeds, write_key_index
+from gift_ingest import GiftIngest
+from phrase_matcher import DEFAULT_LANGUAGE, PhraseListError, get_matcher
+
+# Diferencia de caracteres desde la que la respuesta correcta se considera "más larga"
+DEFAULT_THRESHOLD = 10
+# Distractores con menos caracteres que esto se consideran muy cortos
+SHORT_DISTRACTOR_CHARS = 10
+QUESTION_ORDERS = ('por_archivos', 'aleatorio')
+# Etapas de convert(), en orden (claves de ConversionResult.timings)
+STAGES = ('importar', 'limpiar', 'analizar', 'ordenar', 'generar')
+
+# Opciones del motor y sus valores por defecto (los mismos que la interfaz)
+CONFIG_DEFAULTS = {
+    'encoding': 'auto',              # codificación de los archivos GIFT ('auto': detectar)
+    'char_map': None,                # tabla de caracteres propia (None: char_map.json)
+    'workers': None,                 # procesos de los pools (None: núcleos disponibles)
+    'threshold': DEFAULT_THRESHOLD,
+    'phrase_language': DEFAULT_LANGUAGE,
+    'phrase_files': [],              # diccionarios de frases problemáticas propios
+    'cleanup_rules': [],             # reglas de limpieza (formato de cleanup_engine) o ruta a un JSON
+    'question_order': 'por_archivos',
+    'seed': None,                    # semilla del orden, las claves y las formas (None: al azar)
+    'forms': 1,
+    'render': {},                    # claves de docx_render.DEFAULT_SETTINGS que se quieran cambiar
+}
+
+
+class ConfigError(ValueError):
+    """Configuración del motor inválida"""
+
+
+class EngineConfig:
+    """Opciones de una conversión (las de los pasos de la interfaz, como valores simples)"""
+
+    def __init__(self, **values):
+        unknown = set(values) - set(CONFIG_DEFAULTS)
+        if unknown:
+            raise ConfigError(f"Opciones desconocidas: {', '.join(sorted(unknown))}")
+        for key, default in CONFIG_DEFAULTS.items():
+            setattr(self, key, copy.deepcopy(values.get(key, default)))
+
+        if self.question_order not in QUESTION_ORDERS:
+            raise ConfigError(f"question_order debe ser uno de: {', '.join(QUESTION_ORDERS)}")
+        if not isinstance(self.forms, int) or self.forms < 1:
+            raise ConfigError("forms debe ser un entero mayor o igual a 1")
+        if not isinstance(self.render, dict):
+            raise ConfigError("render debe ser un objeto con claves de docx_render.DEFAULT_SETTINGS")
+        unknown = set(self.render) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ConfigError(f"Claves de render desconocidas: {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_file(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except OSError as e:
+            raise ConfigError(f"No se pudo leer {path}: {e}")
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"JSON inválido en {path}: {e}")
+        if not isinstance(data, dict):
+            raise ConfigError(f"{path}: se espera un objeto JSON")
+        return cls(**data)
+
+    def to_dict(self):
+        return {key: copy.deepcopy(getattr(self, key)) for key in CONFIG_DEFAULTS}
+
+    def phrase_matcher(self):
+        return get_matcher(self.phrase_language, tuple(self.phrase_files))
+
+    def cleanup_engine(self):
+        """CleanupEngine de las reglas configuradas, o None si no hay reglas"""
+        rules = self.cleanup_rules
+        rules = load_rules(rules) if isinstance(rules, str) else parse_rules(rules, 'cleanup_rules')
+        return CleanupEngine(rules) if rules else None
+
+    def render_settings(self, source_files=()):
+        return make_settings(**dict(self.render, source_files=list(source_files)))
+
+
+class ConversionResult:
+    """Lo que dejó una conversión: preguntas, avisos, archivos generados y tiempos"""
+
+    def __init__(self):
+        self.questions = []
+        self.source_files = []
+        self.issues = []        # archivos que no se pudieron leer y preguntas mal formadas
+        self.cleaned = 0        # campos modificados por la limpieza
+        self.outputs = []       # archivos generados
+        self.answer_keys = {}   # clave del examen (una sola forma)
+        self.variants = []      # VariantResult de cada forma (varias formas)
+        self.timings = {}       # etapa -> segundos
+
+    @property
+    def problems(self):
+        return [question for question in self.questions if question.get('problems')]
+
+
+def detect_problems(question, threshold=DEFAULT_THRESHOLD, matcher=None):
+    """Detectar problemas en una pregunta"""
+    problems = []
+
+    # Respuesta corta, numérica y emparejamiento: se imprimen para responder por escrito
+    if question['type'] in ('short_answer', 'numerical'):
+        if not any(opt['is_correct'] for opt in question['options']):
+            problems.append("Sin respuesta correcta")
+        return problems
+    if question['type'] == 'matching':
+        pairs = [opt for opt in question['options'] if opt['text']]
+        if len(pairs) < 2:
+            problems.append("Emparejamiento con menos de 2 pares")
+        missing = sum(1 for opt in pairs if not opt.get('match'))
+        if missing:
+            problems.append(f"{missing} elemento(s) sin pareja")
+        return problems
+
+    if question['type'] != 'multiple_choice':
+        return problems
+
+    # Obtener opciones correctas e incorrectas
+    correct_options = [opt for opt in question['options'] if opt['is_correct']]
+    incorrect_options = [opt for opt in question['options'] if not opt['is_correct']]
+
+    if not correct_options or not incorrect_options:
+        return problems
+
+    correct_text = correct_options[0]['text']
+
+    # 0. Opciones con puntaje parcial: el examen impreso solo tiene una clave
+    partial = [opt for opt in incorrect_options if (opt.get('weight') or 0) > 0]
+    if partial:
+        problems.append(f"{len(partial)} opción(es) con puntaje parcial se imprimen como distractores")
+
+    # 1. Detectar respuesta correcta significativamente más larga
+    avg_incorrect_length = sum(len(opt['text']) for opt in incorrect_options) / len(incorrect_options)
+
+    if len(correct_text) - avg_incorrect_length > threshold:
+        problems.append(f"Respuesta correcta {int(len(correct_text) - avg_incorrect_length)} caracteres más larga que promedio")
+
+    # 2. Detectar distractores muy cortos
+    short_distractors = [opt for opt in incorrect_options if len(opt['text']) < SHORT_DISTRACTOR_CHARS]
+    if short_distractors:
+        problems.append(f"{len(short_distractors)} distractor(es) muy corto(s) (< {SHORT_DISTRACTOR_CHARS} caracteres)")
+
+    # 3. Detectar palabras clave problemáticas (una pasada por opción)
+    matcher = matcher or get_matcher()
+    for option in question['options']:
+        hit = matcher.first(option['text'])
+        if hit:
+            problems.append(f"Opción contiene frase problemática: '{hit.phrase}'")
+
+    return problems
+
+
+def gift_paths(paths):
+    """Archivos de la lista; de cada carpeta, sus .gift en orden alfabético"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith('.gift'))
+        else:
+            found.append(path)
+    return found
+
+
+def load_questions(paths, config, on_event=None):
+    """Preguntas de cada archivo, en el orden de paths: [(ruta, preguntas)], avisos"""
+    banks = []
+    issues = []
+    for event in GiftIngest(paths, config.encoding, config.workers, char_map=config.char_map):
+        if on_event is not None:
+            on_event(event)
+        if event.kind != 'file':
+            continue
+        name = os.path.basename(event.path)
+        if event.error:
+            issues.append(f"Error al procesar {name}: {event.error}")
+            continue
+        issues.extend(f"{name}: {message}" for message in event.errors)
+        banks.append((event.path, event.questions))
+    return banks, issues
+
+
+def analyze_questions(questions, config):
+    """Guarda en cada pregunta sus problemas; devuelve cuántas tienen alguno"""
+    matcher = config.phrase_matcher()
+    flagged = 0
+    for question in questions:
+        question['problems'] = detect_problems(question, config.threshold, matcher)
+        flagged += bool(question['problems'])
+    return flagged
+
+
+def clean_questions(questions, config):
+    """Aplica las reglas de limpieza; devuelve cuántos campos cambiaron"""
+    engine = config.cleanup_engine()
+    if engine is None:
+        return 0
+    return len(CleanupJournal().apply(engine.preview(questions), "limpieza"))
+
+
+def order_questions(questions, config, rng):
+    if config.question_order == 'aleatorio':
+        rng.shuffle(questions)
+    return questions
+
+
+def render_documents(questions, config, output_dir, source_files=(), result=None):
+    """Examen y respuestas (o varias formas e índice de claves) en output_dir"""
+    result = result or ConversionResult()
+    settings = config.render_settings(os.path.basename(path) for path in source_files)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if config.forms == 1:
+        exam_doc, answers_doc, result.answer_keys = render_exam(
+            [plain_question(question) for question in questions], settings, random.Random(config.seed))
+        exam_path = os.path.join(output_dir, "Examen.docx")
+        answers_path = os.path.join(output_dir, "Respuestas.docx")
+        exam_doc.save(exam_path)
+        answers_doc.save(answers_path)
+        result.outputs.extend([exam_path, answers_path])
+        return result
+
+    batch = VariantBatch(questions, settings, variant_seeds(config.forms, config.seed), output_dir, config.workers)
+    for variant in batch:
+        if variant.error:
+            result.issues.append(f"{variant.name}: {variant.error}")
+        else:
+            result.outputs.extend([variant.exam_path, variant.answers_path])
+    result.variants = batch.ordered_results()
+    result.outputs.extend(write_key_index(batch.results, batch.questions, output_dir))
+    return result
+
+
+def process_questions(result, config, output_dir):
+    """Etapas 2 a 5 sobre result.questions (ya importadas)"""
+    clock = time.perf_counter
+
+    start = clock()
+    result.cleaned = clean_questions(result.questions, config)
+    result.timings['limpiar'] = clock() - start
+
+    # Los problemas (y --fail-on-problems) se refieren al texto que se va a imprimir
+    start = clock()
+    analyze_questions(result.questions, config)
+    result.timings['analizar'] = clock() - start
+
+    start = clock()
+    order_questions(result.questions, config, random.Random(config.seed))
+    result.timings['ordenar'] = clock() - start
+
+    start = clock()
+    if result.questions:
+        render_documents(result.questions, config, output_dir, result.source_files, result)
+    else:
+        result.issues.append("No hay preguntas para generar los documentos")
+    result.timings['generar'] = clock() - start
+    return result
+
+
+def convert(paths, config=None, output_dir='.', on_event=None):
+    """Todas las etapas para un examen hecho con las preguntas de todos los archivos"""
+    config = config or EngineConfig()
+    result = ConversionResult()
+    clock = time.perf_counter
+
+    start = clock()
+    banks, result.issues = load_questions(gift_paths(paths), config, on_event)
+    result.source_files = [path for path, _ in banks]
+    result.questions = [question for _, questions in banks for question in questions]
+    result.timings['importar'] = clock() - start
+
+    process_questions(result, config, output_dir)
+    return result
+
+
+def convert_each(paths, config=None, output_dir='.', on_event=None):
+    """Un examen por banco, en output_dir/<nombre del banco>/; la importación es una sola para todos"""
+    config = config or EngineConfig()
+    start = time.perf_counter()
+    banks, issues = load_questions(gift_paths(paths), config, on_event)
+    load_seconds = time.perf_counter() - start
+
+    results = []
+    for path, questions in banks:
+        result = ConversionResult()
+        result.source_files = [path]
+        result.questions = questions
+        result.timings['importar'] = load_seconds / len(banks)  # La importación se reparte entre los bancos
+        name = os.path.splitext(os.path.basename(path))[0]
+        results.append((path, process_questions(result, config, os.path.join(output_dir, name))))
+    return results, issues
+
+
+def print_result(name, result):
+    """Resumen de una conversión en stderr"""
+    problems = len(result.problems)
+    print(f"📄 {name}: {len(result.questions)} preguntas, {problems} con problemas, "
+          f"{result.cleaned} campo(s) limpiado(s), {len(result.outputs)} archivo(s)", file=sys.stderr)
+    for message in result.issues:
+        print(f"⚠️  {message}", file=sys.stderr)
+    timings = "  ".join(f"{stage} {result.timings.get(stage, 0) * 1000:.0f} ms" for stage in STAGES)
+    print(f"   ⏱️  {timings}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convertir bancos GIFT a DOCX sin interfaz gráfica')
+    parser.add_argument('paths', nargs='+', help='Archivos GIFT o carpetas con archivos .gift')
+    parser.add_argument('-c', '--config', help='Configuración JSON (claves de EngineConfig)')
+    parser.add_argument('-o', '--output', default='.', help='Directorio de salida')
+    parser.add_argument('-n', '--forms', type=int, help='Cantidad de formas (reemplaza la de la configuración)')
+    parser.add_argument('--seed', type=int, help='Semilla (reemplaza la de la configuración)')
+    parser.add_argument('-e', '--encoding', help='Codificación de los archivos (auto, utf-8, latin-1...)')
+    parser.add_argument('-w', '--workers', type=int, help='Procesos de los pools (por defecto: núcleos disponibles)')
+    parser.add_argument('--each', action='store_true', help='Un examen por banco, cada uno en su carpeta')
+    parser.add_argument('--fail-on-problems', action='store_true', help='Terminar con error si hay preguntas con problemas')
+    parser.add_argument('--profile', help='Guardar un perfil de cProfile de la corrida en este archivo')
+    args = parser.parse_args()
+
+    try:
+        values = EngineConfig.from_file(args.config).to_dict() if args.config else {}
+        for key in ('forms', 'seed', 'encoding', 'workers'):
+            if getattr(args, key) is not None:
+                values[key] = getattr(args, key)
+        config = EngineConfig(**values)
+        config.phrase_matcher()   # Validar diccionarios y reglas antes de importar
+        config.cleanup_engine()
+    except (ConfigError, PhraseListError, CleanupError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    if args.each:
+        results, issues = convert_each(args.paths, config, args.output)
+        for message in issues:
+            print(f"⚠️  {message}", file=sys.stderr)
+        loaded = len(results)
+    else:
+        result = convert(args.paths, config, args.output)
+        results = [("examen", result)]
+        loaded = len(result.source_files)
+    elapsed = time.perf_counter() - start
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"📈 Perfil guardado en {args.profile}", file=sys.stderr)
+
+    for path, result in results:
+        print_result(os.path.basename(path), result)
+    print(f"✅ {len(results)} examen(es) en {elapsed:.2f} s", file=sys.stderr)
+
+    # Falla si algún archivo no se pudo leer o algún examen quedó sin documentos
+    failed = loaded < len(gift_paths(args.paths)) or any(not result.outputs for _, result in results)
+    if args.fail_on_problems and any(result.problems for _, result in results):
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
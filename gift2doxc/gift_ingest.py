@@ -0,0 +1,237 @@
+"""
+Importación paralela de archivos GIFT
+
+Cada archivo se lee por líneas (decodificadas y normalizadas al vuelo, sin cargar
+el texto completo) y se parsea en un proceso del pool; los resultados vuelven
+como eventos:
+
+  - 'progress': un archivo terminó (en el orden en que van terminando)
+  - 'file': preguntas del siguiente archivo según el orden de entrada
+
+Los eventos 'file' salen siempre en el orden de la lista de archivos, así que el
+resultado no depende de qué proceso termine primero. poll() no bloquea: la
+interfaz Tk lo llama con root.after y la línea de comandos recorre la
+importación con un for.
+
+Uso:
+  python3 gift_ingest.py banco1.gift banco2.gift [-e auto] [-w 4] [-o preguntas.json] [--char-map tabla.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from char_normalizer import CharMapError, get_normalizer
+from encoding_detect import EncodingCache, open_text, read_text
+from gift_parser import iter_gift
+
+# Detecciones de codificación compartidas entre importaciones del mismo proceso
+ENCODING_CACHE = EncodingCache()
+# Caracteres por bloque de líneas completas que se normaliza de una vez al leer un archivo
+NORMALIZE_CHARS = 64 * 1024
+
+
+def normalize_special_characters(text, char_map=None):
+    """Normalizar caracteres especiales comunes según la tabla (char_map.json por defecto)"""
+    return get_normalizer(char_map)(text)
+
+
+def read_gift_file(file_path, encoding='auto', known=None, char_map=None):
+    """Leer y normalizar un archivo; devuelve (contenido, DetectedEncoding)"""
+    try:
+        content, detected = read_text(file_path, encoding, known)
+    except (UnicodeDecodeError, LookupError) as e:
+        raise Exception(f"No se pudo leer el archivo {os.path.basename(file_path)} como {encoding}: {str(e)}")
+    except OSError as e:
+        raise Exception(f"No se pudo leer el archivo {os.path.basename(file_path)}: {str(e)}")
+    return normalize_special_characters(content, char_map), detected
+
+
+def parse_gift_lines(lines, source_file="", errors=None):
+    """Preguntas de examen de un iterable de líneas GIFT; las preguntas mal formadas van a errors"""
+    on_error = errors.append if errors is not None else None
+    # Las descripciones (texto sin bloque de respuestas) no son preguntas del examen
+    return [question for question in iter_gift(lines, source_file, on_error=on_error)
+            if question['type'] != 'description']
+
+
+def parse_gift_text(content, source_file="", errors=None):
+    """Preguntas de examen de un texto GIFT; las preguntas mal formadas van a errors"""
+    return parse_gift_lines(io.StringIO(content), source_file, errors)
+
+
+def normalized_lines(f, normalize):
+    """Líneas de un archivo de texto, normalizadas por bloques de líneas completas
+
+    Normalizar bloques y no línea por línea ahorra una pasada de la tabla por
+    línea; las entradas de la tabla no contienen saltos de línea, así que cortar
+    entre líneas no cambia el resultado.
+    """
+    while True:
+        block = f.readlines(NORMALIZE_CHARS)
+        if not block:
+            return
+        yield from io.StringIO(normalize(''.join(block)))
+
+
+def _parse_stream(file_path, encoding, known, normalize, errors):
+    """Cada bloque de líneas se decodifica y normaliza al pasar a iter_gift"""
+    f, detected = open_text(file_path, encoding, known)
+    with f:
+        questions = parse_gift_lines(normalized_lines(f, normalize), os.path.basename(file_path), errors)
+    return questions, detected
+
+
+def parse_gift_file(file_path, encoding='auto', known=None, char_map=None):
+    """Lee y parsea un archivo por líneas; se ejecuta dentro de un proceso del pool"""
+    normalize = get_normalizer(char_map)
+    errors = []
+    try:
+        try:
+            questions, detected = _parse_stream(file_path, encoding, known, normalize, errors)
+        except UnicodeDecodeError:
+            if known is None or encoding != 'auto':
+                raise
+            # El archivo cambió sin cambiar mtime ni tamaño: volver a detectar
+            errors.clear()
+            questions, detected = _parse_stream(file_path, encoding, None, normalize, errors)
+    except (UnicodeDecodeError, LookupError) as e:
+        raise Exception(f"No se pudo leer el archivo {os.path.basename(file_path)} como {encoding}: {str(e)}")
+    except OSError as e:
+        raise Exception(f"No se pudo leer el archivo {os.path.basename(file_path)}: {str(e)}")
+    return questions, [str(error) for error in errors], detected
+
+
+class IngestEvent:
+    """Aviso de la importación: 'progress' al terminar un archivo, 'file' al entregarlo en orden"""
+
+    def __init__(self, kind, index, path, done, total, questions=None, errors=None, error=None, encoding=None):
+        self.kind = kind
+        self.index = index
+        self.path = path
+        self.done = done    # archivos terminados hasta ahora
+        self.total = total
+        self.questions = questions or []
+        self.errors = errors or []  # preguntas mal formadas (el archivo se leyó)
+        self.error = error          # el archivo completo falló (lectura o proceso)
+        self.encoding = encoding    # DetectedEncoding usada para leerlo
+
+
+class GiftIngest:
+    """Importa una lista de archivos GIFT en un pool de procesos"""
+
+    def __init__(self, paths, encoding='auto', workers=None, cache=ENCODING_CACHE, char_map=None):
+        self.paths = list(paths)
+        self.encoding = encoding
+        self.char_map = char_map  # None: char_map.json junto al programa
+        self.cache = cache if encoding == 'auto' else None
+        self.workers = max(1, min(len(self.paths), workers or os.cpu_count() or 1))
+        self.executor = None
+        self.pending = {}   # future -> índice del archivo
+        self.results = {}   # índice -> (preguntas, errores, error, codificación) aún no entregado
+        self.next_index = 0
+        self.done = 0
+
+    @property
+    def finished(self):
+        return self.next_index >= len(self.paths)
+
+    def start(self):
+        if self.executor is not None or self.finished:
+            return
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        for index, path in enumerate(self.paths):
+            # Si el archivo no cambió desde la última importación, el proceso no vuelve a detectar
+            known = self.cache.get(path) if self.cache is not None else None
+            self.pending[self.executor.submit(parse_gift_file, path, self.encoding, known, self.char_map)] = index
+
+    def poll(self, timeout=0):
+        """Eventos listos; espera como máximo timeout segundos (None: hasta que termine un archivo)"""
+        self.start()
+        events = []
+        if self.pending:
+            completed, _ = wait(self.pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in sorted(completed, key=self.pending.get):
+                index = self.pending.pop(future)
+                try:
+                    questions, errors, detected = future.result()
+                    error = None
+                except Exception as e:
+                    questions, errors, detected, error = [], [], None, str(e)
+                if self.cache is not None:
+                    self.cache.put(self.paths[index], detected)
+                self.done += 1
+                self.results[index] = (questions, errors, error, detected)
+                events.append(IngestEvent('progress', index, self.paths[index], self.done, len(self.paths),
+                                          error=error, encoding=detected))
+
+        # Liberar en orden: el archivo i solo sale cuando ya salieron todos los anteriores
+        while self.next_index in self.results:
+            index = self.next_index
+            questions, errors, error, detected = self.results.pop(index)
+            events.append(IngestEvent('file', index, self.paths[index], self.done, len(self.paths),
+                                      questions, errors, error, detected))
+            self.next_index += 1
+
+        if self.finished:
+            self.close()
+        return events
+
+    def __iter__(self):
+        while not self.finished:
+            yield from self.poll(timeout=None)
+
+    def close(self, cancel=False):
+        if self.executor is not None:
+            self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
+            self.executor = None
+        if cancel:
+            self.pending.clear()
+            self.next_index = len(self.paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importar archivos GIFT en paralelo')
+    parser.add_argument('files', nargs='+', help='Archivos GIFT')
+    parser.add_argument('-e', '--encoding', default='auto', help='Codificación (auto, utf-8, latin-1, cp1252...)')
+    parser.add_argument('-w', '--workers', type=int, help='Procesos del pool (por defecto: núcleos disponibles)')
+    parser.add_argument('-o', '--output', help='Guardar las preguntas en un archivo JSON')
+    parser.add_argument('--char-map', help='Tabla JSON de reemplazos de caracteres (por defecto char_map.json)')
+    args = parser.parse_args()
+
+    try:
+        get_normalizer(args.char_map)  # Validar la tabla antes de repartir archivos
+    except CharMapError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    questions = []
+    failed = 0
+    for event in GiftIngest(args.files, args.encoding, args.workers, char_map=args.char_map):
+        name = os.path.basename(event.path)
+        if event.kind == 'progress':
+            if event.error:
+                status = f"❌ {event.error}"
+            else:
+                status = f"✅ {event.encoding.encoding} ({event.encoding.confidence:.0%}, {event.encoding.reason})"
+            print(f"[{event.done}/{event.total}] {name} {status}", file=sys.stderr)
+            continue
+        if event.error:
+            failed += 1
+        for message in event.errors:
+            print(f"⚠️  {message}", file=sys.stderr)
+        questions.extend(event.questions)
+
+    print(f"📊 {len(questions)} preguntas de {len(args.files) - failed} archivo(s)", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False, indent=2)
+        print(f"💾 Guardado en {args.output}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+Parser GIFT por tokens y en streaming
+
+Recorre la entrada línea a línea y entrega cada pregunta apenas termina (línea en
+blanco o fin de archivo), así que la memoria queda acotada a la pregunta en curso
+aunque el banco tenga decenas de miles. Un único recorrido resuelve:
+
+  - comentarios de línea (//) y $CATEGORY:
+  - títulos ::título:: y marcadores de formato [html], [markdown], ...
+  - escapes \\{ \\} \\= \\~ \\# \\: \\\\ y \\n
+  - respuestas en varias líneas, retroalimentación #, general ####, pesos %50%
+  - alternativas, verdadero/falso, respuesta corta, emparejamiento, numérica,
+    desarrollo ({}), palabra faltante y descripción
+
+Los registros tienen la misma forma que usa GiftToDocxConverter ('title', 'text',
+'type', 'options', ...) más 'gift_type', 'category', 'format' y 'line'.
+Verdadero/falso se entrega como alternativas Verdadero/Falso para que el examen
+la pueda imprimir.
+"""
+
+import io
+import re
+
+# Un escape o un símbolo con significado en GIFT; split() deja el texto entre tokens.
+# Empieza por una clase de caracteres para que el motor de regex busque rápido; los
+# \, : y - sueltos que también captura son texto (LITERALS)
+TOKEN_RE = re.compile(r'([{}~=#\\:\-](?:(?<=#)###|(?<=\\)[\\:#=~{}n]|(?<=:):|(?<=-)>)?)')
+LITERALS = frozenset('\\:-')
+FORMAT_RE = re.compile(r'\[(html|moodle|plain|markdown)\]\s*')
+WEIGHT_RE = re.compile(r'%(-?\d+(?:[.,]\d+)?)%\s*')
+# Marcador que escribe questions_to_gift_format para preguntas de desarrollo
+ESSAY_MARKER_RE = re.compile(r'Pregunta de desarrollo - (\d+) líneas')
+
+TRUE_VALUES = ('T', 'TRUE')
+FALSE_VALUES = ('F', 'FALSE')
+BLANK = '_____'
+DEFAULT_LINES = 5
+
+# Caracteres que Moodle escapa al exportar
+ESCAPES = {'\\': '\\\\', '~': '\\~', '=': '\\=', '#': '\\#', '{': '\\{', '}': '\\}', ':': '\\:', '\n': '\\n'}
+ESCAPE_RE = re.compile(r'[\\~=#{}:\n]')
+
+
+class GiftSyntaxError(ValueError):
+    """Pregunta GIFT mal formada"""
+
+    def __init__(self, message, line=None, source_file=""):
+        self.line = line
+        self.source_file = source_file
+        where = f"{source_file or 'GIFT'}:{line}" if line else (source_file or 'GIFT')
+        super().__init__(f"{where}: {message}")
+
+
+def escape_gift(text):
+    """Escapa texto libre para escribirlo en un archivo GIFT"""
+    return ESCAPE_RE.sub(lambda m: ESCAPES[m.group(0)], text)
+
+
+def clean(parts):
+    """Une los fragmentos de una respuesta o retroalimentación en una sola línea"""
+    text = ''.join(parts).strip()
+    return ' '.join(text.split()) if '\n' in text else text
+
+
+class QuestionBuilder:
+    """Acumula los tokens de una pregunta y la convierte en registro al terminar"""
+
+    def __init__(self, line, category=None):
+        self.line = line
+        self.category = category
+        self.title = None
+        self.in_title = False
+        self.head = []
+        self.tail = []
+        self.answers = None  # None: sin bloque {}; lista de respuestas en otro caso
+        self.in_block = False
+        self.numerical = False
+        self.general = None
+        self.current = None
+        self.target = self.head
+
+    def feed(self, text):
+        """Procesa un trozo de texto GIFT (una o más líneas completas)"""
+        parts = TOKEN_RE.split(text)
+        # Posiciones pares: texto (posiblemente vacío); impares: escape o símbolo
+        for index, part in enumerate(parts):
+            if not part:
+                continue
+            if index & 1 == 0 or part in LITERALS:
+                if self.target is not None:
+                    self.target.append(part)
+                else:
+                    self.text(part)
+            elif part[0] == '\\':
+                self.text('\n' if part == '\\n' else part[1])
+            else:
+                self.symbol(part)
+
+    def text(self, value):
+        if self.target is None:
+            # Texto dentro de {} antes de cualquier ~ o =: V/F, numérica o respuesta implícita
+            if not value.strip():
+                return
+            self.start_answer('')
+        self.target.append(value)
+
+    def start_answer(self, prefix):
+        self.current = {'prefix': prefix, 'text': [], 'feedback': [], 'match': None}
+        self.answers.append(self.current)
+        self.target = self.current['text']
+
+    def symbol(self, token):
+        if not self.in_block:
+            if token == '::':
+                if self.in_title:
+                    self.in_title = False
+                    self.target = self.head
+                    return
+                if self.title is None and self.answers is None and not ''.join(self.head).strip():
+                    self.title = []
+                    self.in_title = True
+                    self.target = self.title
+                    return
+            elif token == '{' and self.answers is None and not self.in_title:
+                self.answers = []
+                self.in_block = True
+                self.target = None
+                return
+            self.target.append(token)
+            return
+
+        if token == '}':
+            self.in_block = False
+            self.current = None
+            self.target = self.tail
+        elif token in '~=':
+            self.start_answer(token)
+        elif token == '#':
+            if self.current is None:
+                if not self.answers and not self.numerical and self.target is None:
+                    self.numerical = True
+                    return
+                self.start_answer('')
+            self.current['feedback'].append([])
+            self.target = self.current['feedback'][-1]
+        elif token == '####':
+            self.general = []
+            self.current = None
+            self.target = self.general
+        elif token == '->' and self.current is not None and self.current['match'] is None:
+            self.current['match'] = []
+            self.target = self.current['match']
+        elif self.target is not None:
+            self.target.append(token)
+        else:
+            self.start_answer('')
+            self.target.append(token)
+
+    def build(self, source_file=""):
+        """Devuelve el registro de la pregunta o None si no hay nada que entregar"""
+        if self.in_block:
+            raise GiftSyntaxError("falta '}' al final de las respuestas", self.line, source_file)
+        if self.in_title:
+            raise GiftSyntaxError("falta '::' al final del título", self.line, source_file)
+
+        head = ''.join(self.head).strip()
+        text_format = None
+        format_match = FORMAT_RE.match(head)
+        if format_match:
+            text_format = format_match.group(1)
+            head = head[format_match.end():]
+        tail = ''.join(self.tail).strip()
+        text = ' '.join(part for part in (head, BLANK if tail else '', tail) if part)
+
+        question = {
+            'title': ''.join(self.title).strip() if self.title else "Sin título",
+            'text': text,
+            'type': 'description',
+            'options': [],
+            'correct_answer': None,
+            'feedback': {},
+            'source_file': source_file,
+            'problems': [],
+            'score': 1.0,
+            'gift_type': 'description',
+            'category': self.category,
+            'format': text_format,
+            'line': self.line,
+        }
+        if self.general is not None:
+            question['feedback']['general'] = clean(self.general)
+
+        if self.answers is None:
+            return question if text else None
+        self.classify(question, [self.answer(raw) for raw in self.answers])
+        return question
+
+    def answer(self, raw):
+        """Normaliza una respuesta cruda del bloque {}: (prefijo, texto, peso, retroalimentaciones, pareja)"""
+        text = clean(raw['text'])
+        weight = None
+        if text.startswith('%'):
+            weight_match = WEIGHT_RE.match(text)
+            if weight_match:
+                weight = float(weight_match.group(1).replace(',', '.'))
+                text = text[weight_match.end():]
+        match = clean(raw['match']) if raw['match'] is not None else None
+        return raw['prefix'], text, weight, [clean(parts) for parts in raw['feedback']], match
+
+    def classify(self, question, answers):
+        """Decide el tipo GIFT y llena opciones y respuesta correcta"""
+        if self.numerical:
+            marker = ESSAY_MARKER_RE.search(answers[0][1]) if len(answers) == 1 else None
+            if marker:
+                question.update(type='essay', gift_type='essay', lines=int(marker.group(1)))
+                return
+            options = [{'text': text, 'is_correct': prefix != '~' and (weight is None or weight > 0),
+                        'feedback': feedback[0] if feedback else ''}
+                       for prefix, text, weight, feedback, _ in answers]
+            question.update(type='numerical', gift_type='numerical', options=options)
+        elif not answers:
+            question.update(type='essay', gift_type='essay', lines=DEFAULT_LINES)
+            return
+        elif len(answers) == 1 and answers[0][0] == '' and answers[0][1].upper() in TRUE_VALUES + FALSE_VALUES:
+            value = answers[0][1].upper() in TRUE_VALUES
+            feedback = answers[0][3]
+            wrong = feedback[0] if feedback else ''
+            right = feedback[1] if len(feedback) > 1 else ''
+            options = [
+                {'text': 'Verdadero', 'is_correct': value, 'feedback': right if value else wrong},
+                {'text': 'Falso', 'is_correct': not value, 'feedback': wrong if value else right},
+            ]
+            question.update(type='multiple_choice', gift_type='truefalse', options=options)
+        elif any(answer[4] is not None for answer in answers):
+            options = [{'text': text, 'match': match or '', 'is_correct': True,
+                        'feedback': feedback[0] if feedback else ''}
+                       for _, text, _, feedback, match in answers]
+            question.update(type='matching', gift_type='matching', options=options)
+            return
+        else:
+            multiple = any(prefix == '~' for prefix, _, _, _, _ in answers)
+            # Puntaje de cada respuesta: el peso %n% o, sin peso, 100 para = y 0 para ~
+            scores = [weight if weight is not None else (100.0 if prefix == '=' else 0.0)
+                      for prefix, _, weight, _, _ in answers]
+            best = max(range(len(answers)), key=scores.__getitem__)
+            options = []
+            for index, (prefix, text, weight, feedback, _) in enumerate(answers):
+                # Alternativas: una sola clave (la de mayor puntaje); las de puntaje parcial quedan
+                # como distractores. Respuesta corta: vale cualquiera con puntaje
+                correct = scores[index] > 0 and (index == best or not multiple)
+                option = {'text': text, 'is_correct': correct, 'feedback': feedback[0] if feedback else ''}
+                if weight is not None:
+                    option['weight'] = weight
+                options.append(option)
+            if multiple:
+                question.update(type='multiple_choice', gift_type='multichoice', options=options)
+            else:
+                question.update(type='short_answer', gift_type='shortanswer', options=options)
+            question['correct_answer'] = options[best]['text'] if scores[best] > 0 else None
+            return
+
+        question['correct_answer'] = next((opt['text'] for opt in question['options'] if opt['is_correct']), None)
+
+
+def iter_gift(lines, source_file="", on_error=None):
+    """Genera las preguntas de un iterable de líneas (archivo abierto, StringIO, ...)
+
+    on_error(GiftSyntaxError) recibe las preguntas mal formadas y el recorrido
+    continúa; sin on_error el error se propaga.
+    """
+    category = None
+    pending = []  # líneas de la pregunta en curso
+    first_line = 0
+
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped:
+            if pending:
+                question = build_question(pending, first_line, category, source_file, on_error)
+                pending = []
+                if question is not None:
+                    yield question
+            continue
+        if stripped.startswith('//'):
+            continue
+        if not pending:
+            if stripped.startswith('$CATEGORY:'):
+                category = stripped[len('$CATEGORY:'):].strip()
+                continue
+            first_line = number
+        pending.append(line)
+
+    if pending:
+        question = build_question(pending, first_line, category, source_file, on_error)
+        if question is not None:
+            yield question
+
+
+def build_question(lines, first_line, category, source_file, on_error):
+    """Tokeniza las líneas de una pregunta de una vez y arma el registro"""
+    builder = QuestionBuilder(first_line, category)
+    builder.feed(''.join(lines))
+    try:
+        return builder.build(source_file)
+    except GiftSyntaxError as e:
+        if on_error is None:
+            raise
+        on_error(e)
+        return None
+
+
+def parse_gift(content, source_file="", on_error=None):
+    """Lista de preguntas de un texto GIFT completo"""
+    return list(iter_gift(io.StringIO(content), source_file, on_error))
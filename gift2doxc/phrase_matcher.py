@@ -0,0 +1,196 @@
+"""
+Búsqueda de frases problemáticas en un solo recorrido
+
+Las frases se compilan una vez en un autómata de Aho–Corasick y cada texto se
+recorre una sola vez, sin importar cuántas frases haya. Cada coincidencia se
+informa con su posición (inicio y fin en el texto pasado a minúsculas, que para
+el español mide lo mismo que el original).
+
+Con pocas frases (las de fábrica son ~20) es más rápido buscar cada una con
+str.find, que recorre en C, que avanzar el autómata carácter a carácter en
+Python; PhraseMatcher elige solo según la cantidad de frases y ambas formas
+devuelven lo mismo (ver benchmarks/bench_phrase_matcher.py).
+
+Las frases vienen de paquetes por idioma (phrase_packs/<idioma>.json) y de
+diccionarios propios con el mismo formato:
+
+    {"todas o ninguna": ["todas las anteriores", ...], "combinaciones": [...]}
+
+o una lista plana ["todas las anteriores", ...]. El orden importa: ante varias
+frases en un mismo texto, la regla que se informa es la primera de la lista.
+"""
+
+import functools
+import json
+import os
+from collections import deque
+
+PHRASE_PACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phrase_packs')
+DEFAULT_LANGUAGE = 'es'
+# Desde esta cantidad de frases el autómata le gana a un str.find por frase
+AUTOMATON_MIN_PHRASES = 50
+
+
+class PhraseListError(ValueError):
+    """Diccionario de frases inválido o ilegible"""
+
+
+class PhraseHit:
+    """Una frase encontrada en un texto"""
+
+    def __init__(self, start, end, phrase, index):
+        self.start = start
+        self.end = end
+        self.phrase = phrase
+        self.index = index  # posición de la frase en la lista: menor = más prioritaria
+
+    def __repr__(self):
+        return f"PhraseHit({self.start}, {self.end}, {self.phrase!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, PhraseHit) and (self.start, self.end, self.index) == (other.start, other.end, other.index)
+
+
+def parse_phrases(data, source='frases'):
+    """Aplana y valida un diccionario: {grupo: [frases]} o [frases]"""
+    groups = data.values() if isinstance(data, dict) else [data]
+    phrases = []
+    for group in groups:
+        if not isinstance(group, list):
+            raise PhraseListError(f"{source}: se espera una lista de frases, no {group!r}")
+        for phrase in group:
+            if not isinstance(phrase, str) or not phrase.strip():
+                raise PhraseListError(f"{source}: frase inválida {phrase!r}")
+            phrases.append(phrase.strip())
+    return phrases
+
+
+def load_phrases(path):
+    """Lee un diccionario de frases de un archivo JSON"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError as e:
+        raise PhraseListError(f"No se pudo leer {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise PhraseListError(f"JSON inválido en {path}: {e}")
+    return parse_phrases(data, path)
+
+
+def available_languages():
+    """Idiomas con paquete de frases incluido"""
+    try:
+        names = os.listdir(PHRASE_PACKS_DIR)
+    except OSError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+
+def load_language_pack(language):
+    path = os.path.join(PHRASE_PACKS_DIR, f"{language}.json")
+    if not os.path.exists(path):
+        raise PhraseListError(f"No hay paquete de frases para el idioma '{language}'")
+    return load_phrases(path)
+
+
+class PhraseMatcher:
+    """Encuentra todas las frases de una lista en un texto (sin distinguir mayúsculas)"""
+
+    def __init__(self, phrases, automaton=None):
+        self.phrases = []
+        seen = set()
+        for phrase in phrases:
+            phrase = phrase.lower()
+            if phrase and phrase not in seen:
+                seen.add(phrase)
+                self.phrases.append(phrase)
+        if automaton is None:
+            automaton = len(self.phrases) >= AUTOMATON_MIN_PHRASES
+        self.automaton = automaton
+        if automaton:
+            self._build()
+
+    def _build(self):
+        """Trie de las frases, enlaces de falla y tabla de transiciones completa"""
+        goto = [{}]
+        outputs = [()]  # estado -> índices de las frases que terminan ahí
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][char] = following
+                state = following
+            outputs[state] += (index,)
+
+        # Recorrido por niveles: el enlace de falla de un estado siempre es menos profundo
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Transiciones resueltas: las del estado de falla más las propias,
+            # así avanzar es un solo dict.get por carácter, sin seguir fallas
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for char, following in goto[state].items():
+                fail[following] = transitions[fail[state]].get(char, 0) if state else 0
+                outputs[following] += outputs[fail[following]]
+                queue.append(following)
+
+        self.transitions = transitions
+        self.outputs = outputs
+
+    def find_all(self, text):
+        """Todas las coincidencias (también solapadas), ordenadas por inicio y prioridad"""
+        text = text.lower()
+        phrases = self.phrases
+        found = []  # (inicio, índice)
+
+        if self.automaton:
+            transitions = self.transitions
+            outputs = self.outputs
+            state = 0
+            for position, char in enumerate(text):
+                state = transitions[state].get(char, 0)
+                if outputs[state]:
+                    for index in outputs[state]:
+                        found.append((position + 1 - len(phrases[index]), index))
+        else:
+            for index, phrase in enumerate(phrases):
+                if phrase in text:  # 'in' es más barato que find y casi nunca hay coincidencia
+                    start = text.find(phrase)
+                    while start != -1:
+                        found.append((start, index))
+                        start = text.find(phrase, start + 1)
+
+        if not found:
+            return []
+        found.sort()
+        return [PhraseHit(start, start + len(phrases[index]), phrases[index], index) for start, index in found]
+
+    def first(self, text):
+        """La coincidencia de la frase más prioritaria, o None"""
+        if not self.automaton:
+            # Las frases están en orden de prioridad: basta la primera que aparezca
+            text = text.lower()
+            for index, phrase in enumerate(self.phrases):
+                if phrase in text:
+                    start = text.find(phrase)
+                    return PhraseHit(start, start + len(phrase), phrase, index)
+            return None
+
+        hits = self.find_all(text)
+        return min(hits, key=lambda hit: (hit.index, hit.start)) if hits else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_matcher(language=DEFAULT_LANGUAGE, paths=()):
+    """Matcher del paquete de un idioma más diccionarios propios, compilado una vez"""
+    phrases = load_language_pack(language) if language else []
+    for path in paths:
+        phrases.extend(load_phrases(path))
+    return PhraseMatcher(phrases)
@@ -0,0 +1,256 @@
+"""
+Almacén de preguntas con IDs estables e índice de palabras
+
+Reemplaza a la lista simple de diccionarios. Se recorre e indexa igual que una
+lista (len, for, store[i]), pero los cambios pasan por sus métodos para saber
+qué hay que volver a calcular:
+
+  - cada pregunta recibe un ID estable en question['id'] que no cambia al
+    moverla, borrar otras o reimportar
+  - mark_changed() marca la pregunta como sucia; refresh() vuelve a detectar
+    problemas solo en las sucias
+  - un índice invertido palabra -> IDs acota qué preguntas pueden contener un
+    texto (candidates), así una limpieza masiva no recorre todo el banco; se
+    arma recién en la primera búsqueda y después solo se reindexan las
+    preguntas cambiadas
+  - take_view_changes() dice qué filas de la lista hay que insertar, borrar o
+    redibujar desde la última vez, para no reconstruir la lista completa
+"""
+
+import itertools
+import re
+
+WORD_RE = re.compile(r'\w+')
+
+
+def question_words(question):
+    """Palabras (en minúsculas) del texto, las opciones y la retroalimentación"""
+    parts = [question.get('text') or '']
+    for option in question.get('options') or ():
+        parts.append(option.get('text') or '')
+        parts.append(option.get('feedback') or '')
+    return frozenset(WORD_RE.findall(' '.join(parts).lower()))
+
+
+class QuestionStore:
+    """Preguntas en orden de presentación, con reanálisis incremental"""
+
+    def __init__(self, questions=(), analyzer=None):
+        self.analyzer = analyzer      # pregunta -> lista de problemas (None: no se analiza)
+        self.ids = itertools.count(1)
+        self.order = []               # IDs en orden de presentación
+        self.by_id = {}               # ID -> pregunta
+        self.positions = {}           # ID -> posición en order
+        self.index = {}               # palabra -> IDs que la contienen
+        self.words = {}               # ID -> palabras con que está indexada
+        self.dirty = set()            # IDs con contenido cambiado, sin reanalizar
+        self.unindexed = set()        # IDs que cambiaron desde que se armó el índice
+        self.indexed = False          # el índice se arma en la primera búsqueda
+        self.redraw = set()           # IDs cuya fila de la lista cambió
+        self.row_operations = []      # ('insert' | 'delete', posición) en el orden en que ocurrieron
+        self.rebuild = True           # la lista debe reconstruirse completa
+        if questions:
+            self.replace(questions)
+
+    # --- Lectura, igual que una lista ---
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        by_id = self.by_id
+        return (by_id[question_id] for question_id in self.order)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.by_id[question_id] for question_id in self.order[position]]
+        return self.by_id[self.order[position]]
+
+    def get(self, question_id):
+        return self.by_id.get(question_id)
+
+    def position(self, question):
+        """Posición actual de una pregunta (o de su ID)"""
+        return self.positions[self._id_of(question)]
+
+    # --- Cambios de estructura ---
+
+    def replace(self, questions):
+        """Reemplazar todo el banco (importación); todas quedan por analizar"""
+        self.order = []
+        self.by_id = {}
+        self.index = {}
+        self.words = {}
+        self.unindexed = set()
+        self.indexed = False
+        self.redraw = set()
+        self.row_operations = []
+        for question in questions:
+            question_id = next(self.ids)
+            question['id'] = question_id
+            self.by_id[question_id] = question
+            self.order.append(question_id)
+        self.positions = {question_id: i for i, question_id in enumerate(self.order)}
+        self.dirty = set(self.order)
+        self.rebuild = True
+
+    def append(self, question):
+        return self.insert(len(self.order), question)
+
+    def insert(self, position, question):
+        question_id = next(self.ids)
+        question['id'] = question_id
+        self.by_id[question_id] = question
+        self.order.insert(position, question_id)
+        self._renumber(position)
+        self.dirty.add(question_id)
+        self.unindexed.add(question_id)
+        self.row_operations.append(('insert', position))
+        return question_id
+
+    def delete(self, position):
+        """Quitar la pregunta de esa posición y devolverla"""
+        question_id = self.order.pop(position)
+        question = self.by_id.pop(question_id)
+        del self.positions[question_id]
+        self._unindex(question_id)
+        self.dirty.discard(question_id)
+        self.unindexed.discard(question_id)
+        self.redraw.discard(question_id)
+        self._renumber(position)
+        self.row_operations.append(('delete', position))
+        return question
+
+    def swap(self, first, second):
+        """Intercambiar dos posiciones; solo esas dos filas cambian"""
+        order = self.order
+        order[first], order[second] = order[second], order[first]
+        self.positions[order[first]] = first
+        self.positions[order[second]] = second
+        self.redraw.update((order[first], order[second]))
+
+    def _renumber(self, start):
+        positions = self.positions
+        for i in range(start, len(self.order)):
+            positions[self.order[i]] = i
+
+    # --- Cambios de contenido ---
+
+    def mark_changed(self, question, content=True):
+        """Avisar que una pregunta cambió
+
+        content=False es para cambios que no tocan el texto (puntaje): solo se
+        redibuja la fila, sin reindexar ni reanalizar.
+        """
+        question_id = self._id_of(question)
+        if content:
+            self.dirty.add(question_id)
+            self.unindexed.add(question_id)
+        self.redraw.add(question_id)
+
+    def mark_all(self, content=True):
+        """Todo cambió (p. ej. el umbral del análisis): se reanaliza y la lista se reconstruye"""
+        if content:
+            self.dirty.update(self.order)
+            self.unindexed.update(self.order)
+        self.rebuild = True
+
+    def refresh(self):
+        """Reanalizar solo las preguntas sucias; devuelve sus IDs"""
+        changed = self.dirty
+        self.dirty = set()
+        if self.analyzer is not None:
+            for question_id in changed:
+                question = self.by_id[question_id]
+                question['problems'] = self.analyzer(question)
+        self.redraw |= changed
+        return changed
+
+    def update_index(self):
+        """Armar el índice la primera vez; después reindexar solo lo que cambió"""
+        pending = self.unindexed if self.indexed else self.order
+        index = self.index
+        for question_id in pending:
+            self._unindex(question_id)
+            words = question_words(self.by_id[question_id])
+            self.words[question_id] = words
+            for word in words:
+                ids = index.get(word)
+                if ids is None:
+                    index[word] = {question_id}
+                else:
+                    ids.add(question_id)
+        self.unindexed = set()
+        self.indexed = True
+
+    def _unindex(self, question_id):
+        for word in self.words.pop(question_id, ()):
+            ids = self.index[word]
+            ids.discard(question_id)
+            if not ids:
+                del self.index[word]
+
+    def _id_of(self, question):
+        return question['id'] if isinstance(question, dict) else question
+
+    # --- Búsqueda ---
+
+    def candidates(self, fragment):
+        """Preguntas que podrían contener fragment (sin distinguir mayúsculas), en orden
+
+        Es un superconjunto: quien reemplaza igual debe comprobar con 'in'. Las
+        palabras interiores del fragmento se buscan enteras en el índice; las de
+        los extremos pueden estar cortadas (el fragmento puede empezar o terminar
+        a mitad de palabra), así que se buscan como sufijo, prefijo o subcadena
+        dentro del vocabulario, que es mucho más chico que el texto.
+        """
+        self.update_index()
+        lowered = fragment.lower()
+        matches = list(WORD_RE.finditer(lowered))
+        if not matches:
+            return list(self)  # Solo signos: el índice no sirve
+
+        found = None
+        for match in matches:
+            word = match.group(0)
+            closed_left = match.start() > 0            # hay un separador antes dentro del fragmento
+            closed_right = match.end() < len(lowered)
+            if closed_left and closed_right:
+                ids = self.index.get(word, set())
+            else:
+                if closed_left:
+                    fits = lambda term: term.startswith(word)
+                elif closed_right:
+                    fits = lambda term: term.endswith(word)
+                else:
+                    fits = lambda term: word in term
+                ids = set()
+                for term, term_ids in self.index.items():
+                    if fits(term):
+                        ids |= term_ids
+            found = ids if found is None else found & ids
+            if not found:
+                break
+
+        return [self.by_id[question_id] for question_id in sorted(found, key=self.positions.get)]
+
+    # --- Vista ---
+
+    def take_view_changes(self):
+        """Cambios de filas desde la última llamada: (reconstruir, operaciones, posiciones)
+
+        Las operaciones ('insert' | 'delete', posición) se aplican en orden a la
+        lista; luego se redibujan las posiciones indicadas. Insertar o borrar
+        corre la numeración, así que desde ahí se redibuja hasta el final.
+        """
+        rebuild, operations, redraw = self.rebuild, self.row_operations, self.redraw
+        self.rebuild = False
+        self.row_operations = []
+        self.redraw = set()
+        if rebuild:
+            return True, [], []
+
+        positions = {self.positions[question_id] for question_id in redraw if question_id in self.positions}
+        if operations:
+            positions.update(range(min(position for _, position in operations), len(self.order)))
+        return False, operations, sorted(positions)
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Colector para varios sitios con network_scanner
+
+Cada agente apunta su server.url a http://<colector>/<sitio>/ y envía a
+/<sitio>/receiver.php exactamente lo mismo que a receiver.php (instantáneas,
+deltas y lotes, con gzip). Cada sitio es un espacio de nombres independiente.
+
+- Servidor HTTP/1.1 asíncrono (solo biblioteca estándar, conexiones keep-alive).
+- Índices en memoria por sitio, por MAC y por nombre; vistas combinadas paginadas:
+    GET /<sitio>/receiver.php                     estado del sitio (formato de receiver.php)
+    GET /api/sites                                resumen de cada sitio
+    GET /api/devices?site=&mac=&name=&online=&offset=&limit=
+    GET /api/lookup?mac=aa:bb:...                 sitios donde está la MAC
+- Persistencia diferida: la respuesta se da al aplicar el escaneo en memoria y
+  las líneas se escriben por lotes cada `flush_seconds` en <datos>/<sitio>/history.jsonl
+  (mismo formato que receiver.php), con compactación en snapshot.json. Ante una
+  caída se pierden como mucho los escaneos de ese último intervalo.
+
+Uso:
+  python3 aggregator.py --port 8080 --data aggregator_data
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+import signal
+import zlib
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+SITE_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_PAGE = 1000
+
+STATUS_TEXT = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class SiteState:
+    """Estado actual de un sitio"""
+
+    def __init__(self, name):
+        self.name = name
+        self.devices = {}  # mac -> dispositivo
+        self.last_scan = None
+        self.updated_at = None
+        self.history_bytes = 0  # tamaño del historial ya escrito en disco
+        self.snapshot_offset = 0  # byte del historial cubierto por snapshot.json
+
+    def summary(self):
+        online = sum(1 for device in self.devices.values() if device.get('online', True))
+        return {'site': self.name, 'devices': len(self.devices), 'online': online,
+                'last_scan': self.last_scan, 'updated_at': self.updated_at}
+
+
+def apply_event(state, event):
+    """Aplica una línea del historial; devuelve (dispositivos quitados, dispositivos nuevos o modificados)"""
+    removed, updated = [], []
+    if event['m'] == 'snapshot':
+        removed = list(state.devices.values())
+        state.devices = {device['mac']: device for device in event['d']}
+        updated = list(state.devices.values())
+    else:
+        for change in event['c']:
+            change = {key: value for key, value in change.items() if key not in ('event', 'previous_ip')}
+            mac = change['mac']
+            previous = state.devices.get(mac)
+            if previous is not None:
+                removed.append(previous)
+            device = dict(previous or {}, **change)
+            state.devices[mac] = device
+            updated.append(device)
+    state.last_scan = event['t']
+    return removed, updated
+
+
+def has_mac(device):
+    """Un dispositivo o cambio usable como entrada del índice: dict con MAC de texto"""
+    return isinstance(device, dict) and isinstance(device.get('mac'), str)
+
+
+def build_event(data):
+    """Valida un cuerpo snapshot/delta como receiver.php; devuelve (línea del historial, error)"""
+    mode = data.get('mode', 'snapshot') if isinstance(data, dict) else None
+    if mode == 'delta' and isinstance(data.get('changes'), list):
+        changes = data['changes']
+        if all(has_mac(change) for change in changes):
+            return {'t': data.get('scan_time') or datetime.now().isoformat(), 'm': 'delta', 'c': changes}, None
+    elif mode == 'snapshot' and isinstance(data.get('devices'), list):
+        devices = data['devices']
+        if all(has_mac(device) for device in devices):
+            return {'t': data.get('scan_time') or datetime.now().isoformat(), 'm': 'snapshot', 'd': devices}, None
+    return None, 'Datos inválidos'
+
+
+class Collector:
+    """Estado de todos los sitios con índices y escritura diferida del historial"""
+
+    def __init__(self, data_dir, flush_seconds=1.0, compact_bytes=1024 * 1024):
+        self.data_dir = data_dir
+        self.flush_seconds = flush_seconds
+        self.compact_bytes = compact_bytes
+        self.sites = {}  # sitio -> SiteState
+        self.by_mac = {}  # mac -> {sitio}
+        self.by_name = {}  # nombre en minúsculas -> {(sitio, mac)}
+        self.pending = {}  # sitio -> [líneas JSON por escribir]
+        self._ordered = None  # [(sitio, nombre, mac)] para paginar; None = recalcular
+        self._flush_lock = asyncio.Lock()  # una sola escritura en curso (también al detenerse)
+        self.posts = 0
+
+    # --- Índices ---
+
+    def _unindex(self, site, device):
+        mac = device['mac']
+        sites = self.by_mac.get(mac)
+        if sites is not None:
+            sites.discard(site)
+            if not sites:
+                del self.by_mac[mac]
+        key = str(device.get('name', '')).lower()
+        entries = self.by_name.get(key)
+        if entries is not None:
+            entries.discard((site, mac))
+            if not entries:
+                del self.by_name[key]
+
+    def _index(self, site, device):
+        self.by_mac.setdefault(device['mac'], set()).add(site)
+        self.by_name.setdefault(str(device.get('name', '')).lower(), set()).add((site, device['mac']))
+
+    def _apply(self, state, event):
+        removed, updated = apply_event(state, event)
+        for device in removed:
+            self._unindex(state.name, device)
+        for device in updated:
+            self._index(state.name, device)
+        self._ordered = None
+
+    def site(self, name):
+        state = self.sites.get(name)
+        if state is None:
+            state = self.sites[name] = SiteState(name)
+        return state
+
+    # --- Escritura ---
+
+    def ingest(self, site, data):
+        """Aplica un POST de agente; devuelve (código HTTP, respuesta) como receiver.php"""
+        self.posts += 1
+        is_batch = isinstance(data, dict) and data.get('mode') == 'batch'
+        if is_batch and not isinstance(data.get('batch'), list):
+            return 400, {'status': 'error', 'message': 'Datos inválidos: falta la lista batch',
+                         'mode': 'batch', 'applied': 0}
+        payloads = data['batch'] if is_batch else [data]
+        state = self.site(site)
+
+        applied = 0
+        response = {'status': 'success', 'devices_count': 0}
+        code = 200
+        for payload in payloads:
+            event, error = build_event(payload)
+            if error:
+                code, response = 400, {'status': 'error', 'message': error}
+                break
+            line = json.dumps(event, separators=(',', ':')) + '\n'
+            self._apply(state, event)
+            self.pending.setdefault(site, []).append(line)
+            applied += 1
+            response = {'status': 'success', 'message': 'Datos guardados correctamente',
+                        'mode': event['m'], 'devices_count': len(event.get('d', event.get('c', [])))}
+
+        if applied:
+            state.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if is_batch:
+            response['mode'] = 'batch'
+            response['applied'] = applied
+        return code, response
+
+    def _site_dir(self, site):
+        return os.path.join(self.data_dir, site)
+
+    def _write(self, batches, snapshots):
+        """Escritura bloqueante (en un hilo): un write por sitio y compactaciones
+
+        Devuelve (sitios escritos, sitios compactados, errores). Un sitio que falla no
+        deja líneas a medias (se trunca a su tamaño anterior) ni impide escribir los demás.
+        """
+        written, compacted, errors = set(), set(), []
+        for site, data in batches.items():
+            try:
+                os.makedirs(self._site_dir(site), exist_ok=True)
+                with open(os.path.join(self._site_dir(site), 'history.jsonl'), 'ab', buffering=0) as f:
+                    start = f.tell()
+                    try:
+                        view = memoryview(data)
+                        while view:
+                            view = view[f.write(view):]
+                    except OSError:
+                        f.truncate(start)
+                        raise
+                written.add(site)
+                if site in snapshots:
+                    path = os.path.join(self._site_dir(site), 'snapshot.json')
+                    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                        json.dump(snapshots[site], f)
+                    os.replace(path + '.tmp', path)
+                    compacted.add(site)
+            except OSError as e:
+                errors.append(e)
+        return written, compacted, errors
+
+    async def flush(self):
+        """Escribe lo pendiente de todos los sitios
+
+        Los contadores avanzan solo con lo que llegó al disco; las líneas de un sitio
+        que no se pudo escribir vuelven a pendientes (antes que las nuevas) para el
+        siguiente intento, y el primer error se propaga.
+        """
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            batches = {site: ''.join(lines).encode('utf-8') for site, lines in self.pending.items()}
+            self.pending = {}
+
+            # La instantánea se toma ahora, coherente con el historial que se va a escribir
+            snapshots = {}
+            for site, data in batches.items():
+                state = self.sites[site]
+                end = state.history_bytes + len(data)
+                if end - state.snapshot_offset > self.compact_bytes:
+                    snapshots[site] = {'devices': list(state.devices.values()), 'last_scan': state.last_scan,
+                                       'updated_at': state.updated_at, 'offset': end}
+
+            written, compacted, errors = await asyncio.get_running_loop().run_in_executor(
+                None, self._write, batches, snapshots)
+
+            for site, data in batches.items():
+                state = self.sites[site]
+                if site in written:
+                    state.history_bytes += len(data)
+                    if site in compacted:
+                        state.snapshot_offset = state.history_bytes
+                else:
+                    self.pending[site] = [data.decode('utf-8')] + self.pending.get(site, [])
+            if errors:
+                raise errors[0]
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except OSError as e:
+                print(f"❌ Error escribiendo el historial: {e}")
+
+    def restore(self):
+        """Reconstruye el estado desde snapshot.json + el resto de history.jsonl de cada sitio"""
+        if not os.path.isdir(self.data_dir):
+            return
+        for site in sorted(os.listdir(self.data_dir)):
+            directory = self._site_dir(site)
+            if not SITE_NAME.match(site) or not os.path.isdir(directory):
+                continue
+            state = self.site(site)
+            snapshot_path = os.path.join(directory, 'snapshot.json')
+            if os.path.exists(snapshot_path):
+                with open(snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self._apply(state, {'t': snapshot.get('last_scan'), 'm': 'snapshot', 'd': snapshot['devices']})
+                state.updated_at = snapshot.get('updated_at')
+                state.snapshot_offset = snapshot.get('offset', 0)
+
+            history_path = os.path.join(directory, 'history.jsonl')
+            if os.path.exists(history_path):
+                with open(history_path, 'rb') as f:
+                    f.seek(state.snapshot_offset)
+                    for line in f:
+                        try:
+                            self._apply(state, json.loads(line))
+                        except (ValueError, KeyError):
+                            continue
+                state.history_bytes = os.path.getsize(history_path)
+                state.updated_at = datetime.fromtimestamp(os.path.getmtime(history_path)).strftime('%Y-%m-%d %H:%M:%S')
+
+    # --- Lectura ---
+
+    def latest(self, site):
+        state = self.sites.get(site)
+        if state is None:
+            return {'devices': [], 'last_scan': None, 'updated_at': None}
+        return {'devices': list(state.devices.values()), 'last_scan': state.last_scan,
+                'updated_at': state.updated_at}
+
+    def _ordered_keys(self):
+        if self._ordered is None:
+            self._ordered = sorted(
+                (site, str(device.get('name', '')), mac)
+                for site, state in self.sites.items() for mac, device in state.devices.items()
+            )
+        return self._ordered
+
+    def devices(self, site=None, mac=None, name=None, online=None, offset=0, limit=100):
+        """Vista combinada de todos los sitios, filtrada por índice y paginada"""
+        if mac is not None:
+            keys = sorted((s, str(self.sites[s].devices[mac].get('name', '')), mac)
+                          for s in self.by_mac.get(mac, ()))
+        elif name is not None:
+            keys = sorted((s, str(self.sites[s].devices[m].get('name', '')), m)
+                          for s, m in self.by_name.get(name.lower(), ()))
+        elif site is not None:
+            state = self.sites.get(site)
+            keys = sorted((site, str(device.get('name', '')), m)
+                          for m, device in state.devices.items()) if state else []
+        else:
+            keys = self._ordered_keys()
+
+        if site is not None:
+            keys = [key for key in keys if key[0] == site]
+        if online is not None:
+            keys = [key for key in keys if self.sites[key[0]].devices[key[2]].get('online', True) == online]
+
+        page = keys[offset:offset + limit]
+        items = [dict(self.sites[s].devices[m], site=s) for s, _, m in page]
+        return {'total': len(keys), 'offset': offset, 'limit': limit, 'devices': items}
+
+
+# --- HTTP ---
+
+def first(query, key, default=None):
+    values = query.get(key)
+    return values[0] if values else default
+
+
+def route(collector, method, path, query, body, headers):
+    """Resuelve una petición; devuelve (código, cuerpo JSON o None)"""
+    parts = [part for part in path.split('/') if part]
+
+    if len(parts) == 2 and parts[1] == 'receiver.php':
+        site = parts[0]
+        if not SITE_NAME.match(site):
+            return 400, {'status': 'error', 'message': f'Sitio inválido: {site}'}
+        if method == 'POST':
+            try:
+                if headers.get('content-encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                data = json.loads(body)
+            except (OSError, ValueError, EOFError, zlib.error):
+                return 400, {'status': 'error', 'message': 'Datos inválidos'}
+            return collector.ingest(site, data)
+        if method == 'GET':
+            return 200, collector.latest(site)
+        return 405, {'status': 'error', 'message': 'Método no permitido'}
+
+    if method != 'GET':
+        return 405, {'status': 'error', 'message': 'Método no permitido'}
+
+    if parts == ['api', 'sites']:
+        return 200, {'sites': [state.summary() for _, state in sorted(collector.sites.items())]}
+
+    if parts == ['api', 'devices']:
+        online = first(query, 'online')
+        try:
+            offset = max(0, int(first(query, 'offset', 0)))
+            limit = max(1, min(int(first(query, 'limit', 100)), MAX_PAGE))
+        except ValueError:
+            return 400, {'status': 'error', 'message': 'offset/limit inválidos'}
+        mac = first(query, 'mac')
+        return 200, collector.devices(
+            site=first(query, 'site'), mac=mac.lower() if mac else None, name=first(query, 'name'),
+            online=None if online is None else online.lower() in ('1', 'true', 'yes'),
+            offset=offset, limit=limit)
+
+    if parts == ['api', 'lookup']:
+        mac = (first(query, 'mac') or '').lower()
+        return 200, {'mac': mac, 'sites': sorted(collector.by_mac.get(mac, ()))}
+
+    return 404, {'status': 'error', 'message': 'No encontrado'}
+
+
+async def handle_client(collector, reader, writer):
+    """Atiende una conexión keep-alive: lee peticiones con Content-Length y responde JSON"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get('content-length', 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # Sin un largo válido no se sabe dónde termina el cuerpo: responder y cerrar
+                code, data = 400, {'status': 'error', 'message': 'Content-Length inválido'}
+                keep_alive = False
+            elif length > MAX_BODY_BYTES:
+                code, data = 413, {'status': 'error', 'message': 'Cuerpo demasiado grande'}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b''
+                url = urlsplit(target)
+                if method == 'OPTIONS':
+                    code, data = 204, None
+                else:
+                    try:
+                        code, data = route(collector, method, url.path, parse_qs(url.query), body, headers)
+                    except Exception as e:
+                        # Último recurso: el agente recibe un estado en vez de una conexión cortada
+                        print(f"❌ Error atendiendo {method} {url.path}: {e!r}")
+                        code, data = 500, {'status': 'error', 'message': 'Error interno'}
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+            payload = json.dumps(data).encode('utf-8') if data is not None else b''
+            writer.write(
+                f"HTTP/1.1 {code} {STATUS_TEXT.get(code, '')}\r\n"
+                "Content-Type: application/json\r\n"
+                "Access-Control-Allow-Origin: *\r\n"
+                "Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n"
+                "Access-Control-Allow-Headers: Content-Type, Content-Encoding\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(collector, host, port):
+    collector.restore()
+    server = await asyncio.start_server(lambda r, w: handle_client(collector, r, w), host, port)
+    flusher = asyncio.create_task(collector.flush_loop())
+    # SIGTERM (systemd, docker) detiene igual que Ctrl+C, escribiendo lo pendiente
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    print(f"🚀 Colector escuchando en http://{host}:{port}/<sitio>/receiver.php")
+    print(f"💾 Historial en {os.path.abspath(collector.data_dir)} (escritura cada {collector.flush_seconds:g} s)")
+    print(f"🏢 Sitios restaurados: {len(collector.sites)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        flusher.cancel()
+        await collector.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Colector de escaneos de varios sitios')
+    parser.add_argument('--host', default='0.0.0.0', help='Dirección de escucha')
+    parser.add_argument('--port', type=int, default=8080, help='Puerto HTTP')
+    parser.add_argument('--data', default='aggregator_data', help='Directorio del historial por sitio')
+    parser.add_argument('--flush-seconds', type=float, default=1.0, help='Intervalo de escritura diferida')
+    parser.add_argument('--compact-kb', type=int, default=1024,
+                        help='Compactar un sitio cuando su historial crece esto desde la última instantánea')
+    args = parser.parse_args()
+
+    collector = Collector(args.data, args.flush_seconds, args.compact_kb * 1024)
+    try:
+        asyncio.run(serve(collector, args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\n🛑 Colector detenido")
+
+
+if __name__ == "__main__":
+    main()
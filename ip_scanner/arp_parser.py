@@ -0,0 +1,156 @@
+"""
+Parser de la salida de arp-scan e índice de MACs
+
+- iter_arp_scan: consume las líneas a medida que llegan (p. ej. de la tubería
+  de un subproceso) con un único patrón precompilado.
+- MacIndex: MACs normalizadas a enteros de 48 bits con búsqueda O(1), incluidas
+  entradas comodín por prefijo OUI ("fc:ee:28:*"). Para las MACs que ya llegan
+  normalizadas de los backends hay además una vista por texto que evita la
+  conversión a entero en el camino caliente. Cada entrada puede llevar metadatos
+  (grupo, etiquetas) que se copian a los dispositivos encontrados.
+- match_devices: cruza las respuestas con el índice usando una sola marca de
+  tiempo por lote.
+"""
+
+import re
+from datetime import datetime
+
+# Línea de arp-scan: "<ip>\t<mac>\t<fabricante>"; las cabeceras no empiezan con IP
+ARP_SCAN_LINE = re.compile(r'(\d+\.\d+\.\d+\.\d+)\s+([a-fA-F0-9:]{17})')
+
+MAC_SEPARATORS = re.compile(r'[:\-.]')
+HEX_DIGITS = frozenset('0123456789abcdef')
+
+
+def iter_arp_scan(lines):
+    """Genera (ip, mac) por cada línea válida de arp-scan, sin acumular la salida"""
+    match = ARP_SCAN_LINE.match
+    for line in lines:
+        found = match(line)
+        if found:
+            yield found.group(1), found.group(2).lower()
+
+
+def mac_to_int(mac):
+    """Convierte una MAC (con ':', '-', '.' o sin separadores) en entero de 48 bits"""
+    digits = MAC_SEPARATORS.sub('', mac).lower()
+    if len(digits) != 12 or not HEX_DIGITS.issuperset(digits):
+        raise ValueError(f"MAC inválida: {mac}")
+    return int(digits, 16)
+
+
+def oui_to_int(prefix):
+    """Convierte un prefijo OUI ("fc:ee:28", "fc:ee:28:*") en entero de 24 bits"""
+    digits = MAC_SEPARATORS.sub('', prefix.rstrip('*').rstrip(':-.')).lower()
+    if len(digits) != 6 or not HEX_DIGITS.issuperset(digits):
+        raise ValueError(f"Prefijo OUI inválido: {prefix}")
+    return int(digits, 16)
+
+
+def int_to_mac(value):
+    """Formatea un entero de 48 bits como MAC en minúsculas con ':'"""
+    digits = f"{value:012x}"
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def is_oui_pattern(key):
+    """True si la clave de configuración es un comodín por fabricante"""
+    return key.endswith('*') or len(MAC_SEPARATORS.sub('', key)) == 6
+
+
+class MacIndex:
+    """Índice MAC -> nombre con claves enteras y comodines por OUI
+
+    Se comporta como el antiguo diccionario MAC_TO_NAME (`in`, `[]`, `get`, `len`,
+    `items`) aceptando MACs en cualquier formato habitual.
+    """
+
+    def __init__(self, devices=None):
+        self.exact = {}  # entero de 48 bits -> nombre
+        self.ouis = {}  # entero de 24 bits -> nombre
+        self._exact_text = {}  # "aa:bb:cc:dd:ee:ff" -> nombre
+        self._oui_text = {}  # "aa:bb:cc" -> nombre
+        self.meta = {}  # clave de texto -> metadatos (solo entradas que los tienen)
+        for key, name in (devices or {}).items():
+            self.add(key, name)
+
+    def add(self, key, name, meta=None):
+        """Agrega una MAC exacta o un prefijo OUI comodín, con metadatos opcionales"""
+        if is_oui_pattern(key):
+            value = oui_to_int(key)
+            self.ouis[value] = name
+            text = int_to_mac(value << 24)[:8]
+            self._oui_text[text] = name
+        else:
+            value = mac_to_int(key)
+            self.exact[value] = name
+            text = int_to_mac(value)
+            self._exact_text[text] = name
+        if meta:
+            self.meta[text] = meta
+        else:
+            self.meta.pop(text, None)
+        return text
+
+    def lookup(self, mac):
+        """Nombre para una MAC ya normalizada (minúsculas con ':'), o None"""
+        name = self._exact_text.get(mac)
+        if name is None and self._oui_text:
+            name = self._oui_text.get(mac[:8])
+        return name
+
+    def lookup_meta(self, mac):
+        """Metadatos de la entrada que corresponde a una MAC normalizada, o None"""
+        if mac in self._exact_text:
+            return self.meta.get(mac)
+        return self.meta.get(mac[:8])
+
+    def lookup_int(self, value):
+        """Nombre para una MAC ya convertida a entero, o None"""
+        name = self.exact.get(value)
+        if name is None:
+            name = self.ouis.get(value >> 24)
+        return name
+
+    def get(self, mac, default=None):
+        try:
+            name = self.lookup_int(mac_to_int(mac))
+        except ValueError:
+            return default
+        return default if name is None else name
+
+    def __contains__(self, mac):
+        return self.get(mac) is not None
+
+    def __getitem__(self, mac):
+        name = self.get(mac)
+        if name is None:
+            raise KeyError(mac)
+        return name
+
+    def __len__(self):
+        return len(self.exact) + len(self.ouis)
+
+    def items(self):
+        """Pares (mac o prefijo normalizado, nombre)"""
+        for value, name in self.exact.items():
+            yield int_to_mac(value), name
+        for value, name in self.ouis.items():
+            yield int_to_mac(value << 24)[:8] + ':*', name
+
+
+def match_devices(hits, index, timestamp=None):
+    """Cruza (ip, mac) con el índice; todos los dispositivos comparten la marca de tiempo del lote"""
+    timestamp = timestamp or datetime.now().isoformat()
+    lookup = index.lookup
+    devices = []
+    for ip, mac in hits:
+        name = lookup(mac)
+        if name is not None:
+            devices.append({'ip': ip, 'mac': mac, 'name': name, 'timestamp': timestamp})
+    if index.meta:
+        for device in devices:
+            meta = index.lookup_meta(device['mac'])
+            if meta:
+                device.update(meta)
+    return devices
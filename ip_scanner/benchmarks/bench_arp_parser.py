@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del parser de arp-scan
+
+Compara el procesamiento anterior de scan_network (re.search sin compilar por
+línea, dict de MACs en texto y un datetime.now() por dispositivo) con
+arp_parser (patrón precompilado en streaming, MacIndex y una marca de tiempo
+por lote) sobre una salida sintética de arp-scan.
+
+Uso:
+  python3 benchmarks/bench_arp_parser.py [-n 65536] [-k 2000] [-r 5]
+"""
+
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arp_parser import MacIndex, iter_arp_scan, match_devices
+
+
+def synthetic_output(lines, seed=1):
+    """Salida de arp-scan con `lines` respuestas, cabecera y pie"""
+    rng = random.Random(seed)
+    out = ["Interface: eth0, type: EN10MB, MAC: 02:00:00:00:00:01, IPv4: 10.0.0.1",
+           "Starting arp-scan 1.10.0 with 65536 hosts (https://github.com/royhills/arp-scan)"]
+    for i in range(lines):
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        mac = ':'.join(f"{rng.randrange(256):02X}" for _ in range(6))
+        out.append(f"{ip}\t{mac}\tSynthetic Vendor Inc.")
+    out.append("")
+    out.append(f"{lines} packets received by filter, 0 packets dropped by kernel")
+    return '\n'.join(out) + '\n'
+
+
+def legacy_parse(stdout, mac_to_name):
+    """Copia del bucle original de scan_network"""
+    devices = []
+    for line in stdout.split('\n'):
+        match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([a-fA-F0-9:]{17})', line)
+        if match:
+            ip = match.group(1)
+            mac = match.group(2).lower()
+            if mac in mac_to_name:
+                devices.append({'ip': ip, 'mac': mac, 'name': mac_to_name[mac],
+                                'timestamp': datetime.now().isoformat()})
+    return devices
+
+
+def streaming_parse(stdout, index):
+    """Parser nuevo consumiendo la salida como si fuera la tubería del proceso"""
+    return match_devices(iter_arp_scan(io.StringIO(stdout)), index)
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del parser de arp-scan')
+    parser.add_argument('-n', '--lines', type=int, default=65536, help='Respuestas sintéticas')
+    parser.add_argument('-k', '--known', type=int, default=2000, help='MACs conocidas en el índice')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    stdout = synthetic_output(args.lines)
+    hits = list(iter_arp_scan(io.StringIO(stdout)))
+    known = {mac: f"dev-{i}" for i, (_, mac) in enumerate(hits[:args.known])}
+    index = MacIndex(known)
+
+    legacy_time, legacy_devices = best_of(args.repeat, legacy_parse, stdout, known)
+    new_time, new_devices = best_of(args.repeat, streaming_parse, stdout, index)
+
+    assert [d['mac'] for d in legacy_devices] == [d['mac'] for d in new_devices]
+
+    print(f"Líneas: {args.lines}  MACs conocidas: {len(index)}  coincidencias: {len(new_devices)}")
+    print(f"  Anterior (re.search + dict):   {legacy_time * 1000:8.1f} ms")
+    print(f"  arp_parser (stream + índice):  {new_time * 1000:8.1f} ms")
+    print(f"  Aceleración: x{legacy_time / new_time:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo: scan_network -> send_to_php -> receptor -> tablero
+
+- FakeArpScanBackend: población sintética (o grabada con arp-scan) con
+  rotación entre ciclos: dispositivos que se van, que vuelven y que cambian de IP.
+  Cada ciclo genera texto en formato arp-scan y lo pasa por el parser real.
+- Receptor local: proceso aparte que imita receiver.php (gzip, lotes,
+  historial de solo anexado, estado actual por GET) y mide su propia CPU.
+- Se usan las funciones reales de network_scanner (modo daemon, sin salida por
+  consola), DeviceTracker y Delivery.
+
+Por ciclo se mide: duración del escaneo, latencia de extremo a extremo (inicio del
+escaneo hasta la respuesta del receptor), CPU del escáner y del receptor, bytes del
+cuerpo (JSON y gzip) y tiempo de "render" del tablero: descargar el estado,
+decodificarlo y generar el HTML de las tarjetas que cambiaron, como hace
+ipmonitor.html (estimación sin navegador).
+
+El informe se guarda en JSON para comparar versiones:
+  python3 benchmarks/bench_pipeline.py -d 5000 -c 30 -i 1 -o antes.json
+  python3 benchmarks/bench_pipeline.py -d 5000 -c 30 -i 1 -o despues.json --compare antes.json
+
+Para reproducir una grabación: varias salidas de `arp-scan -l` concatenadas en un
+archivo (cada una empieza con la línea "Interface: ...") con --replay.
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import network_scanner
+from arp_parser import MacIndex, iter_arp_scan
+from delivery import Delivery
+from device_tracker import DeviceTracker
+from parallel_scan import ParallelScanner, ScanTarget
+
+
+# --- Poblaciones ---
+
+class SyntheticPopulation:
+    """Dispositivos en 10.0.0.0/16 con rotación aleatoria reproducible entre ciclos"""
+
+    def __init__(self, size, churn=0.02, seed=1):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.macs = [':'.join(f"{self.rng.randrange(256):02x}" for _ in range(6)) for _ in range(size)]
+        self.ips = {mac: self._ip(i) for i, mac in enumerate(self.macs)}
+        self.online = set(self.macs)
+        self.next_ip = size
+
+    def _ip(self, i):
+        return f"10.0.{(i >> 8) & 255}.{i & 255}"
+
+    def step(self):
+        """Aplica un ciclo de rotación y devuelve [(ip, mac)] de los dispositivos en línea"""
+        changes = int(len(self.macs) * self.churn)
+        for mac in self.rng.sample(self.macs, changes):
+            kind = self.rng.random()
+            if kind < 0.4:
+                self.online.discard(mac)
+            elif kind < 0.8:
+                self.online.add(mac)
+            else:
+                self.ips[mac] = self._ip(self.next_ip % 65534 + 1)
+                self.next_ip += 1
+        return [(self.ips[mac], mac) for mac in self.macs if mac in self.online]
+
+
+class ReplayPopulation:
+    """Salidas de arp-scan grabadas, una por ciclo y en bucle"""
+
+    def __init__(self, path):
+        self.cycles = []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            block = []
+            for line in f:
+                if line.startswith('Interface:') and block:
+                    self.cycles.append(list(iter_arp_scan(block)))
+                    block = []
+                block.append(line)
+            if block:
+                self.cycles.append(list(iter_arp_scan(block)))
+        if not self.cycles:
+            raise ValueError(f"Sin respuestas de arp-scan en {path}")
+        self.macs = list({mac: None for hits in self.cycles for _, mac in hits})
+        self.position = 0
+
+    def step(self):
+        hits = self.cycles[self.position % len(self.cycles)]
+        self.position += 1
+        return hits
+
+
+class FakeArpScanBackend:
+    """Backend con la interfaz de scan_backends que responde con la población"""
+
+    name = 'fake-arp-scan'
+
+    def __init__(self, population, network='10.0.0.0/16'):
+        self.population = population
+        self.network = network
+        self.interface = None
+        self.hits = []
+
+    def _output(self, hits):
+        yield "Interface: bench0, type: EN10MB, MAC: 02:00:00:00:00:01, IPv4: 10.0.0.1\n"
+        for ip, mac in hits:
+            yield f"{ip}\t{mac}\tSynthetic Vendor Inc.\n"
+
+    def scan(self, network=None):
+        self.hits = self.population.step()
+        return list(iter_arp_scan(self._output(self.hits)))
+
+    def scan_hosts(self, hosts, on_result=None):
+        wanted = set(hosts)
+        return list(iter_arp_scan(self._output(hit for hit in self.hits if hit[0] in wanted)))
+
+
+# --- Receptor local ---
+
+def apply_changes(devices, changes):
+    """Misma regla que applyChanges de receiver.php"""
+    for change in changes:
+        change = {key: value for key, value in change.items() if key not in ('event', 'previous_ip')}
+        devices[change['mac']] = dict(devices.get(change['mac'], {}), **change)
+
+
+def run_receiver(directory, ready):
+    """Proceso del receptor: imita receiver.php con un historial en `directory`"""
+    state = {'devices': {}, 'last_scan': None}
+    history_path = os.path.join(directory, 'history.jsonl')
+    stats = {'posts': 0, 'bytes_in': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            stats['posts'] += 1
+            stats['bytes_in'] += len(raw)
+            if self.headers.get('Content-Encoding') == 'gzip':
+                raw = gzip.decompress(raw)
+            data = json.loads(raw)
+            payloads = data['batch'] if data.get('mode') == 'batch' else [data]
+
+            lines = []
+            for payload in payloads:
+                scan_time = payload.get('scan_time')
+                if payload.get('mode') == 'delta':
+                    apply_changes(state['devices'], payload['changes'])
+                    lines.append({'t': scan_time, 'm': 'delta', 'c': payload['changes']})
+                else:
+                    state['devices'] = {device['mac']: device for device in payload['devices']}
+                    lines.append({'t': scan_time, 'm': 'snapshot', 'd': payload['devices']})
+                state['last_scan'] = scan_time
+            text = ''.join(json.dumps(line) + '\n' for line in lines)
+            with open(history_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+
+            self._reply({'status': 'success', 'mode': data.get('mode', 'snapshot'),
+                         'devices_count': len(state['devices']), 'bytes_written': len(text),
+                         'applied': len(lines)})
+
+        def do_GET(self):
+            if self.path.startswith('/stats'):
+                self._reply(dict(stats, cpu=time.process_time()))
+            else:
+                self._reply({'devices': list(state['devices'].values()), 'last_scan': state['last_scan'],
+                             'version': os.path.getsize(history_path) if os.path.exists(history_path) else 0})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class CountingSession(requests.Session):
+    """Sesión que acumula los bytes enviados en cada POST"""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_sent = 0
+
+    def post(self, url, data=None, **kwargs):
+        self.bytes_sent += len(data or b'')
+        return super().post(url, data=data, **kwargs)
+
+
+# --- Tablero ---
+
+def card_html(device, online):
+    """Equivalente de cardHtml() de ipmonitor.html"""
+    return (f'<div class="device-name"><span>💻</span><span>{device["name"]}</span>'
+            f'<div class="device-status {"" if online else "offline"}"></div></div>'
+            f'<div class="device-info"><p><strong>IP:</strong> {device["ip"]}</p>'
+            f'<p><strong>MAC:</strong> {device["mac"]}</p>'
+            f'<p><strong>Estado:</strong> {"En línea" if online else "Fuera de línea"}</p>'
+            f'<p><strong>Última vez visto:</strong> {device.get("last_seen") or device.get("timestamp")}</p></div>')
+
+
+class Dashboard:
+    """Cliente que carga el estado y regenera solo las tarjetas cuyo HTML cambió"""
+
+    def __init__(self, url):
+        self.url = url
+        self.session = requests.Session()
+        self.cards = {}
+
+    def refresh(self):
+        start = time.perf_counter()
+        response = self.session.get(self.url)
+        data = response.json()
+        patched = 0
+        seen = set()
+        for device in data['devices']:
+            html = card_html(device, device.get('online', True))
+            seen.add(device['mac'])
+            if self.cards.get(device['mac']) != html:
+                self.cards[device['mac']] = html
+                patched += 1
+        for mac in set(self.cards) - seen:
+            del self.cards[mac]
+        return time.perf_counter() - start, len(response.content), patched
+
+
+# --- Informe ---
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'mean': statistics.fmean(values),
+        'p50': values[len(values) // 2],
+        'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+        'max': values[-1],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(report, baseline_path):
+    """Muestra la variación de las medianas respecto a un informe anterior"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nComparación con {baseline_path} ({baseline.get('revision')}):")
+    for metric, summary in report['summary'].items():
+        before = baseline.get('summary', {}).get(metric, {}).get('p50')
+        after = summary.get('p50')
+        if before and after is not None:
+            print(f"  {metric:28s} {before:12.4f} -> {after:12.4f}  ({(after - before) / before * 100:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extremo a extremo del monitor de red')
+    parser.add_argument('-d', '--devices', type=int, default=5000, help='Dispositivos sintéticos')
+    parser.add_argument('-k', '--known', type=float, default=1.0, help='Fracción registrada en devices')
+    parser.add_argument('-c', '--cycles', type=int, default=20, help='Ciclos de escaneo')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='Segundos entre inicios de ciclo')
+    parser.add_argument('--churn', type=float, default=0.02, help='Fracción de dispositivos que cambia por ciclo')
+    parser.add_argument('--full', action='store_true', help='Enviar la lista completa en cada ciclo (sin deltas)')
+    parser.add_argument('--no-gzip', action='store_true', help='Enviar los cuerpos sin comprimir')
+    parser.add_argument('--replay', help='Archivo con salidas de arp-scan grabadas (una por ciclo)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', default='bench_pipeline.json', help='Informe JSON')
+    parser.add_argument('--compare', help='Informe JSON anterior para comparar')
+    args = parser.parse_args()
+
+    population = ReplayPopulation(args.replay) if args.replay else \
+        SyntheticPopulation(args.devices, args.churn, args.seed)
+    known = population.macs[:max(1, int(len(population.macs) * args.known))]
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    ready = multiprocessing.Queue()
+    receiver = multiprocessing.Process(target=run_receiver, args=(workdir, ready), daemon=True)
+    receiver.start()
+    url = f"http://127.0.0.1:{ready.get(timeout=10)}/receiver.php"
+
+    # Mismo cableado que main() de network_scanner, sin consola
+    session = CountingSession()
+    network_scanner.DAEMON = True
+    network_scanner.MAC_TO_NAME = MacIndex({mac: f"dev-{i}" for i, mac in enumerate(known)})
+    network_scanner.SCANNER = ParallelScanner([ScanTarget('bench', FakeArpScanBackend(population))])
+    network_scanner.TRACKER = None if args.full else DeviceTracker()
+    network_scanner.DELIVERY = Delivery(url, spool_path=os.path.join(workdir, 'spool.jsonl'),
+                                        compress=not args.no_gzip, session=session)
+    dashboard = Dashboard(url)
+    stats_url = url.replace('receiver.php', 'stats')
+
+    cycles = []
+    print(f"{len(population.macs)} dispositivos, {len(known)} registrados, {args.cycles} ciclos cada {args.interval:g} s")
+    for cycle in range(args.cycles):
+        started = time.perf_counter()
+        cpu_start = time.process_time()
+        receiver_cpu = requests.get(stats_url).json()['cpu']
+        sent_before = session.bytes_sent
+
+        devices = network_scanner.scan_network()
+        scanned = time.perf_counter()
+        scan_time = datetime.now().isoformat()
+        tracker = network_scanner.TRACKER
+        if tracker:
+            changes = tracker.update(devices, scan_time)
+            payload = tracker.build_payload(changes, scan_time)
+        else:
+            changes = devices
+            payload = {'devices': devices, 'scan_time': scan_time}
+        raw_bytes = len(json.dumps(payload, separators=(',', ':')))
+        network_scanner.send_to_php(payload)
+        delivered = time.perf_counter()
+        cpu = time.process_time() - cpu_start
+
+        render_seconds, state_bytes, patched = dashboard.refresh()
+        receiver_cpu = requests.get(stats_url).json()['cpu'] - receiver_cpu
+
+        cycles.append({
+            'cycle': cycle,
+            'found': len(devices),
+            'changes': len(changes),
+            'mode': payload.get('mode', 'snapshot'),
+            'scan_seconds': scanned - started,
+            'end_to_end_seconds': delivered - started,
+            'scanner_cpu_seconds': cpu,
+            'receiver_cpu_seconds': receiver_cpu,
+            'payload_bytes': raw_bytes,
+            'wire_bytes': session.bytes_sent - sent_before,
+            'dashboard_render_seconds': render_seconds,
+            'dashboard_state_bytes': state_bytes,
+            'dashboard_cards_patched': patched,
+            'spool_pending': network_scanner.DELIVERY.pending,
+        })
+        last = cycles[-1]
+        print(f"  #{cycle:3d} {last['mode']:8s} {last['found']:6d} vistos {last['changes']:5d} cambios  "
+              f"e2e {last['end_to_end_seconds'] * 1000:7.1f} ms  cpu {cpu * 1000:7.1f} ms  "
+              f"{last['wire_bytes']:8d} B  render {render_seconds * 1000:6.1f} ms")
+
+        time.sleep(max(0.0, args.interval - (time.perf_counter() - started)))
+
+    receiver.terminate()
+    network_scanner.DELIVERY.close()
+
+    metrics = [key for key in cycles[0] if key not in ('cycle', 'mode')]
+    report = {
+        'benchmark': 'bench_pipeline',
+        'created_at': datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': vars(args),
+        'summary': {metric: summarize([c[metric] for c in cycles]) for metric in metrics},
+        'cycles': cycles,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nInforme guardado en {args.output}")
+    for metric in ('end_to_end_seconds', 'scanner_cpu_seconds', 'wire_bytes', 'dashboard_render_seconds'):
+        summary = report['summary'][metric]
+        print(f"  {metric:28s} p50 {summary['p50']:.4f}  p95 {summary['p95']:.4f}  max {summary['max']:.4f}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
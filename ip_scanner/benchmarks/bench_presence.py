@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de presence_analytics
+
+Genera un historial sintético (un escaneo por minuto, deltas joined/left y una
+instantánea diaria) de dispositivos con horario laboral y mide la carga y cada
+consulta sobre el rango completo. Comprueba además que escaneos no alineados a
+la resolución no marquen un mismo intervalo como presente y ausente.
+
+Uso:
+  python3 benchmarks/bench_presence.py [-d 300] [--days 365] [-r 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from presence_analytics import PresenceMatrix
+
+
+def synthetic_events(devices, days, seed=1):
+    """Eventos de history.jsonl: cada dispositivo llega y se va una vez por día laborable"""
+    rng = random.Random(seed)
+    macs = [f"02:00:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}" for i in range(devices)]
+    start = datetime(2025, 1, 1)
+    online = set()
+
+    for day in range(days):
+        current = start + timedelta(days=day)
+        schedule = {}
+        if current.weekday() < 5:
+            for mac in macs:
+                if rng.random() < 0.9:
+                    arrive = rng.randint(7 * 60, 10 * 60)
+                    schedule.setdefault(arrive, []).append((mac, True))
+                    schedule.setdefault(arrive + rng.randint(4 * 60, 10 * 60), []).append((mac, False))
+
+        for minute in range(24 * 60):
+            t = (current + timedelta(minutes=minute)).isoformat()
+            if minute == 0:
+                yield {'t': t, 'm': 'snapshot',
+                       'd': [{'mac': mac, 'name': mac, 'online': mac in online} for mac in macs]}
+                continue
+            changes = []
+            for mac, arriving in schedule.get(minute, ()):
+                if arriving != (mac in online):
+                    (online.add if arriving else online.discard)(mac)
+                    changes.append({'mac': mac, 'name': mac, 'online': arriving,
+                                    'event': 'joined' if arriving else 'left'})
+            yield {'t': t, 'm': 'delta', 'c': changes}
+
+
+def check_unaligned(resolution=60, scans=400):
+    """Dos dispositivos que se turnan con escaneos no alineados a la resolución
+
+    Devuelve [(separación, suma de uptimes, segundos juntos)]: la suma debe ser 1 y
+    nunca deben coincidir, porque ningún bit puede quedar en dos intervalos contiguos.
+    """
+    results = []
+    start = datetime(2025, 1, 1, 0, 0, 17)
+    for step in (90, 150, 330):
+        events = [{'t': (start + timedelta(seconds=step * i)).isoformat(), 'm': 'snapshot',
+                   'd': [{'mac': 'a', 'online': i % 2 == 0}, {'mac': 'b', 'online': i % 2 == 1}]}
+                  for i in range(scans)]
+        matrix = PresenceMatrix.from_events(events, resolution=resolution)
+        _, together = matrix.co_presence()
+        results.append((step, sum(matrix.uptime().values()), int(together[0, 1])))
+    return results
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la analítica de presencia')
+    parser.add_argument('-d', '--devices', type=int, default=300, help='Dispositivos sintéticos')
+    parser.add_argument('--days', type=int, default=365, help='Días de historial (un escaneo por minuto)')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    events = list(synthetic_events(args.devices, args.days))
+    generated = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = PresenceMatrix.from_events(events, resolution=60)
+    loaded = time.perf_counter() - start
+
+    print(f"{len(events)} escaneos, {len(matrix.macs)} dispositivos, {len(matrix.session_device)} sesiones, "
+          f"mapa de bits {matrix.words.nbytes / 1e6:.1f} MB")
+    print(f"  Generación:                    {generated:8.2f} s")
+    print(f"  Carga (sesiones + bits):       {loaded:8.2f} s")
+
+    last_day = datetime(2025, 1, 1) + timedelta(days=args.days - 1)
+    day = (last_day - timedelta(days=1)).isoformat(), last_day.isoformat()
+    week = (last_day - timedelta(days=7)).isoformat(), last_day.isoformat()
+    queries = [
+        ('uptime (todo el rango)', matrix.uptime, ()),
+        ('uptime (un día)', matrix.uptime, day),
+        ('dwell (todo el rango)', matrix.dwell, ()),
+        ('daily (todo el rango)', matrix.daily, ()),
+        ('co_presence (una semana)', matrix.co_presence, week),
+        ('online_at', matrix.online_at, (last_day.replace(hour=12).isoformat(),)),
+    ]
+    for label, func, positional in queries:
+        seconds = best_of(args.repeat, func, *positional)
+        print(f"  {label:30s} {seconds * 1000:8.2f} ms")
+
+    print("\n🕒 Escaneos no alineados a la resolución (dos dispositivos que se turnan)")
+    for step, total, together in check_unaligned():
+        ok = abs(total - 1) < 1e-9 and together == 0
+        print(f"  {'✅' if ok else '❌'} cada {step} s: uptime sumado {total:.3f}, {together} s juntos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Entrega de escaneos a receiver.php
+
+- Sesión HTTP persistente (keep-alive) con cuerpos JSON comprimidos con gzip.
+- Si el receptor no responde, los escaneos se guardan en una cola en disco
+  (archivo de solo anexado, una línea JSON por escaneo) y se reenvían en orden,
+  en lotes, con espera exponencial entre reintentos.
+
+La posición ya confirmada de la cola se guarda en `<cola>.offset` junto con el
+inodo de la cola: si la cola se compactó (archivo nuevo) y el proceso se cortó
+antes de guardar la posición nueva, la vieja no se aplica. Cuando la cola se
+vacía, ambos archivos se borran.
+
+Un escaneo que el receptor rechaza por su contenido (400, 413, 422) no se
+reintenta: se aparta en `<cola>.rejected` para no bloquear los siguientes. Un
+413 a un lote de varios escaneos solo dice que el lote era grande: se reintenta
+con lotes más chicos y se aparta únicamente un escaneo que no entra solo. La
+cola guarda como máximo `max_spool` escaneos; al superarlo se descartan los más
+antiguos (el monitor envía después una instantánea para reconciliar).
+"""
+
+import gzip
+import json
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Respuestas que rechazan el escaneo en sí: reenviarlo daría lo mismo. El resto
+# (401/403/404 de un servidor mal configurado, 429, 5xx) se reintenta con espera.
+REJECT_STATUS = {400, 413, 422}
+
+
+def _response_json(response):
+    """JSON de la respuesta o None si el cuerpo no lo es"""
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _lines_before(batch, applied):
+    """Líneas del lote antes del escaneo número `applied` (incluye las corruptas intercaladas)"""
+    seen = 0
+    for index, (payload, _) in enumerate(batch):
+        if payload is not None:
+            if seen == applied:
+                return index
+            seen += 1
+    return len(batch)
+
+
+class DeliveryResult:
+    """Resultado de un intento de entrega"""
+
+    def __init__(self, delivered=0, pending=0, response=None, error=None, seconds=0.0, attempted=False,
+                 rejected=0, dropped=0):
+        self.delivered = delivered  # escaneos aceptados por el receptor
+        self.pending = pending  # escaneos que siguen en la cola
+        self.rejected = rejected  # escaneos rechazados por el receptor (apartados en .rejected)
+        self.dropped = dropped  # escaneos antiguos descartados por superar max_spool
+        self.response = response  # JSON de la última respuesta correcta
+        self.error = error
+        self.seconds = seconds
+        self.attempted = attempted  # hubo al menos una petición HTTP (no solo espera de reintento)
+
+
+class Delivery:
+    """Envío con conexión reutilizable, compresión y cola de reintentos en disco"""
+
+    def __init__(self, url, spool_path='scanner_spool.jsonl', timeout=10, batch_size=20,
+                 compress=True, backoff_base=5.0, backoff_max=600.0, max_spool=10000, session=None,
+                 clock=time.monotonic):
+        self.url = url
+        self.spool_path = spool_path
+        self.offset_path = spool_path + '.offset'
+        self.rejected_path = spool_path + '.rejected'
+        self.max_spool = max_spool  # 0: sin límite
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.compress = compress
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.failures = 0
+        self.retry_at = 0.0
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        self.pending = self._count_pending()
+
+    # --- Cola en disco ---
+
+    def _read_offset(self):
+        """Posición confirmada; 0 si se guardó para otro archivo de cola (inodo distinto)"""
+        try:
+            with open(self.offset_path, 'r') as f:
+                fields = f.read().split()
+            offset = int(fields[0]) if fields else 0
+            if len(fields) > 1 and int(fields[1]) != os.stat(self.spool_path).st_ino:
+                return 0
+            return offset
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(f"{offset} {os.stat(self.spool_path).st_ino}")
+        os.replace(tmp_path, self.offset_path)
+
+    def _count_pending(self):
+        if not os.path.exists(self.spool_path):
+            return 0
+        with open(self.spool_path, 'rb') as f:
+            f.seek(self._read_offset())
+            return sum(1 for line in f if line.strip())
+
+    def _append(self, payload):
+        """Anexa un escaneo a la cola; devuelve cuántos antiguos se descartaron por el límite"""
+        line = json.dumps(payload, separators=(',', ':')) + '\n'
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending += 1
+        if self.max_spool and self.pending > self.max_spool:
+            return self._drop_oldest(self.pending - self.max_spool)
+        return 0
+
+    def _drop_oldest(self, count):
+        """Descarta los `count` escaneos más antiguos y compacta la cola si lo descartado es la mayor parte"""
+        dropped = 0
+        with open(self.spool_path, 'rb') as f:
+            f.seek(self._read_offset())
+            while dropped < count:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    dropped += 1
+            offset = f.tell()
+            size = os.fstat(f.fileno()).st_size
+            if offset > size // 2:
+                tmp_path = self.spool_path + '.tmp'
+                with open(tmp_path, 'wb') as tmp:
+                    tmp.write(f.read())
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.spool_path)
+                offset = 0
+        self._write_offset(offset)
+        self.pending = max(0, self.pending - dropped)
+        return dropped
+
+    def _reject(self, payload, status, error):
+        """Aparta un escaneo que el receptor no aceptará nunca"""
+        line = json.dumps({'status': status, 'error': error[:500], 'payload': payload}, separators=(',', ':'))
+        with open(self.rejected_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def _read_batch(self, offset, size):
+        """Lee hasta `size` escaneos desde `offset`; devuelve [(payload, fin_de_línea)]"""
+        batch = []
+        with open(self.spool_path, 'rb') as f:
+            f.seek(offset)
+            while len(batch) < size:
+                line = f.readline()
+                if not line:
+                    break
+                end = f.tell()
+                try:
+                    batch.append((json.loads(line), end))
+                except ValueError:
+                    # Línea incompleta (p. ej. corte de energía a mitad de escritura): se descarta
+                    batch.append((None, end))
+        return batch
+
+    def _truncate(self):
+        for path in (self.spool_path, self.offset_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.pending = 0
+
+    # --- HTTP ---
+
+    def _post(self, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        return self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+
+    def _backoff(self):
+        self.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self.failures - 1))
+        self.retry_at = self.clock() + delay * random.uniform(0.5, 1.0)
+
+    # --- API ---
+
+    def submit(self, payload):
+        """Entrega un escaneo; si hay cola o el envío falla, queda en disco para reintentar"""
+        start = time.perf_counter()
+
+        if self.pending == 0 and self.clock() >= self.retry_at:
+            try:
+                response = self._post(payload)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    self.failures = 0
+                    return DeliveryResult(1, 0, _response_json(response), seconds=time.perf_counter() - start,
+                                          attempted=True)
+                error = f"HTTP {response.status_code}: {response.text}"
+                if response.status_code in REJECT_STATUS:
+                    self._reject(payload, response.status_code, error)
+                    return DeliveryResult(0, 0, error=error, seconds=time.perf_counter() - start,
+                                          attempted=True, rejected=1)
+            dropped = self._append(payload)
+            self._backoff()
+            return DeliveryResult(0, self.pending, error=error, seconds=time.perf_counter() - start,
+                                  attempted=True, dropped=dropped)
+
+        # Hay escaneos anteriores sin enviar: se encola para respetar el orden
+        dropped = self._append(payload)
+        result = self.flush()
+        result.dropped += dropped
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def flush(self):
+        """Reenvía la cola en orden y en lotes mientras el receptor acepte"""
+        start = time.perf_counter()
+        if self.pending == 0:
+            return DeliveryResult(seconds=time.perf_counter() - start)
+        if self.clock() < self.retry_at:
+            wait = self.retry_at - self.clock()
+            return DeliveryResult(0, self.pending, error=f"reintento en {wait:.0f} s",
+                                  seconds=time.perf_counter() - start)
+
+        delivered = 0
+        rejected = 0
+        attempted = False
+        response_data = None
+        offset = self._read_offset()
+        batch_size = self.batch_size  # baja tras un 413 a un lote, solo en esta pasada
+
+        while True:
+            batch = self._read_batch(offset, batch_size)
+            if not batch:
+                self._truncate()
+                break
+
+            payloads = [payload for payload, _ in batch if payload is not None]
+            applied = len(payloads)
+            error = None
+            status = None
+
+            if payloads:
+                attempted = True
+                body = payloads[0] if len(payloads) == 1 else {'mode': 'batch', 'batch': payloads}
+                try:
+                    response = self._post(body)
+                except requests.RequestException as e:
+                    applied = 0
+                    error = str(e)
+                else:
+                    data = _response_json(response)
+                    if response.status_code == 200:
+                        response_data = data
+                    else:
+                        # El receptor informa cuántos escaneos del lote alcanzó a aplicar
+                        status = response.status_code
+                        error = f"HTTP {status}: {response.text}"
+                        applied = 0
+                        if len(payloads) > 1 and isinstance(data, dict):
+                            try:
+                                applied = min(max(int(data.get('applied', 0)), 0), len(payloads))
+                            except (TypeError, ValueError):
+                                applied = 0
+
+            # `applied` cuenta escaneos; las líneas corruptas del lote se saltan con ellos
+            consumed = _lines_before(batch, applied)
+            if status == 413 and len(payloads) - applied > 1:
+                # El cuerpo era demasiado grande, no un escaneo: reintentar lo que falta en lotes más chicos
+                batch_size = max(1, (len(payloads) - applied) // 2)
+                error = None
+            elif status in REJECT_STATUS and applied < len(payloads):
+                self._reject(batch[consumed][0], status, error)
+                consumed += 1
+                rejected += 1
+                error = None
+
+            if consumed:
+                offset = batch[consumed - 1][1]
+                self._write_offset(offset)
+                self.pending = max(0, self.pending - consumed)
+                delivered += applied
+
+            if error:
+                self._backoff()
+                return DeliveryResult(delivered, self.pending, response_data, error,
+                                      seconds=time.perf_counter() - start, attempted=attempted, rejected=rejected)
+
+        self.failures = 0
+        return DeliveryResult(delivered, self.pending, response_data, seconds=time.perf_counter() - start,
+                              attempted=attempted, rejected=rejected)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,154 @@
+"""
+Registro de dispositivos recargable en caliente
+
+La sección "devices" del JSON admite la forma simple y la forma con metadatos:
+
+    "fc:ee:28:03:34:e2": "K1-01"
+    "14:ab:c5:bb:b1:47": {"name": "server", "group": "infra", "tags": ["linux"]}
+    "fc:ee:28:*": {"name": "K1", "group": "aulas"}
+
+DeviceRegistry vigila el archivo por mtime/tamaño/inodo (sin dependencias y
+válido también cuando el editor reemplaza el archivo), valida la versión nueva
+completa y solo entonces reemplaza el índice; si no es válida se mantiene la
+anterior. Las búsquedas siguen siendo O(1) sobre MacIndex.
+"""
+
+import json
+import os
+import time
+
+from arp_parser import MacIndex
+
+
+class RegistryError(ValueError):
+    """Sección devices inválida o archivo ilegible"""
+
+
+class RegistryChange:
+    """Diferencias entre dos versiones del registro (claves normalizadas)"""
+
+    def __init__(self, added, removed, changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed  # nombre o metadatos distintos
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def parse_entry(key, value):
+    """Devuelve (nombre, metadatos) de una entrada "mac": "nombre" o "mac": {...}"""
+    if isinstance(value, str):
+        name, meta = value, None
+    elif isinstance(value, dict):
+        name = value.get('name')
+        meta = {}
+        if 'group' in value:
+            if not isinstance(value['group'], str):
+                raise RegistryError(f"'group' debe ser texto en {key}")
+            meta['group'] = value['group']
+        if 'tags' in value:
+            tags = value['tags']
+            if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+                raise RegistryError(f"'tags' debe ser una lista de textos en {key}")
+            meta['tags'] = tags
+    else:
+        raise RegistryError(f"Entrada inválida para {key}: se espera un nombre o un objeto")
+
+    if not isinstance(name, str) or not name.strip():
+        raise RegistryError(f"Falta el nombre del dispositivo {key}")
+    return name, meta or None
+
+
+def parse_devices(devices):
+    """Valida la sección devices completa y construye el índice"""
+    if not isinstance(devices, dict) or not devices:
+        raise RegistryError("No se encontraron dispositivos")
+
+    index = MacIndex()
+    seen = {}  # clave normalizada -> clave tal como está en el archivo
+    for key, value in devices.items():
+        name, meta = parse_entry(key, value)
+        try:
+            text = index.add(key, name, meta)
+        except ValueError as e:
+            raise RegistryError(str(e))
+        if text in seen:
+            raise RegistryError(f"MAC duplicada: {seen[text]} y {key}")
+        seen[text] = key
+    return index
+
+
+def load_devices(path):
+    """Lee y valida la sección devices de un archivo JSON"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except OSError as e:
+        raise RegistryError(f"No se pudo leer {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise RegistryError(f"JSON inválido en {path}: {e}")
+
+    if not isinstance(config, dict) or 'devices' not in config:
+        raise RegistryError(f"El archivo {path} debe contener un objeto 'devices'")
+    return parse_devices(config['devices'])
+
+
+def file_stamp(path):
+    """Identifica la versión del archivo sin leerlo"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def diff_indexes(old, new):
+    """Claves agregadas, quitadas y modificadas entre dos índices"""
+    old_items = {key: (name, old.meta.get(key.rstrip(':*'))) for key, name in old.items()}
+    new_items = {key: (name, new.meta.get(key.rstrip(':*'))) for key, name in new.items()}
+    added = [key for key in new_items if key not in old_items]
+    removed = [key for key in old_items if key not in new_items]
+    changed = [key for key in new_items if key in old_items and new_items[key] != old_items[key]]
+    return RegistryChange(added, removed, changed)
+
+
+class DeviceRegistry:
+    """Índice de dispositivos que se recarga cuando cambia el archivo de configuración"""
+
+    def __init__(self, path, index=None, poll_interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.next_check = clock() + poll_interval
+        self.error = None  # último error de validación (None si la versión actual es válida)
+        self.stamp = file_stamp(path)
+        self.index = index if index is not None else load_devices(path)
+
+    def check(self):
+        """Recarga si el archivo cambió; devuelve RegistryChange o None
+
+        Lanza RegistryError una sola vez por cada versión inválida del archivo y
+        conserva el índice anterior.
+        """
+        now = self.clock()
+        if now < self.next_check:
+            return None
+        self.next_check = now + self.poll_interval
+
+        stamp = file_stamp(self.path)
+        if stamp == self.stamp or stamp is None:
+            return None
+        self.stamp = stamp
+
+        try:
+            index = load_devices(self.path)
+        except RegistryError as e:
+            self.error = str(e)
+            raise
+
+        self.error = None
+        change = diff_indexes(self.index, index)
+        # Un único reemplazo de referencia: quien lea self.index ve la versión vieja o la nueva completa
+        self.index = index
+        return change
@@ -0,0 +1,139 @@
+"""
+Seguimiento del estado de cada dispositivo entre escaneos
+
+Mantiene por MAC la última IP, primera y última vez visto y si está en línea,
+y traduce cada escaneo en eventos:
+- joined: la MAC aparece por primera vez o vuelve a estar en línea
+- left: la MAC dejó de responder durante `offline_after` escaneos seguidos
+- ip_changed: la MAC sigue en línea pero con otra IP
+"""
+
+JOINED = 'joined'
+LEFT = 'left'
+IP_CHANGED = 'ip_changed'
+
+# Metadatos del registro que se copian al estado de cada dispositivo
+META_FIELDS = ('group', 'tags')
+
+
+def copy_meta(state, source):
+    """Copia grupo y etiquetas de `source` al estado (y quita los que ya no tiene)"""
+    for field in META_FIELDS:
+        if field in source:
+            state[field] = source[field]
+        else:
+            state.pop(field, None)
+
+
+class DeviceTracker:
+    """Máquina de estados online/offline por MAC que produce deltas entre escaneos"""
+
+    def __init__(self, offline_after=2, snapshot_every=10):
+        self.offline_after = max(1, offline_after)
+        self.snapshot_every = max(1, snapshot_every)
+        self.devices = {}  # mac -> estado
+        self.missed = {}  # mac -> escaneos seguidos sin verlo
+        self.cycles = 0
+        self.snapshot_pending = False  # forzar instantánea en el próximo barrido (p. ej. tras recargar el registro)
+
+    def _event(self, event, state, **extra):
+        change = dict(state, event=event)
+        change.update(extra)
+        return change
+
+    def update(self, found, scan_time, probed=None):
+        """Aplica el resultado de un escaneo y devuelve la lista de cambios
+
+        `probed` limita a esas MACs la cuenta de escaneos perdidos (sondeos dirigidos
+        o lectura pasiva); con None se trata como un barrido completo de la red.
+        """
+        if probed is None:
+            self.cycles += 1
+        changes = []
+        seen = set()
+
+        for device in found:
+            mac = device['mac']
+            seen.add(mac)
+            self.missed[mac] = 0
+            state = self.devices.get(mac)
+
+            if state is None:
+                state = {
+                    'mac': mac,
+                    'name': device['name'],
+                    'ip': device['ip'],
+                    'first_seen': scan_time,
+                    'last_seen': scan_time,
+                    'online': True,
+                }
+                copy_meta(state, device)
+                self.devices[mac] = state
+                changes.append(self._event(JOINED, state))
+                continue
+
+            previous_ip = state['ip']
+            was_online = state['online']
+            state.update(name=device['name'], ip=device['ip'], last_seen=scan_time, online=True)
+            copy_meta(state, device)
+
+            if not was_online:
+                changes.append(self._event(JOINED, state))
+            elif previous_ip != device['ip']:
+                changes.append(self._event(IP_CHANGED, state, previous_ip=previous_ip))
+
+        for mac, state in self.devices.items():
+            if mac in seen or not state['online']:
+                continue
+            if probed is not None and mac not in probed:
+                continue
+            self.missed[mac] = self.missed.get(mac, 0) + 1
+            if self.missed[mac] >= self.offline_after:
+                state['online'] = False
+                changes.append(self._event(LEFT, state))
+
+        return changes
+
+    def retain(self, index):
+        """Aplica un registro recargado conservando el estado de las MACs que siguen en él
+
+        Descarta las MACs que ya no están, actualiza nombre y metadatos de las demás
+        y devuelve las MACs descartadas. Si algo cambió, el próximo barrido envía
+        una instantánea completa para que el receptor se reconcilie.
+        """
+        removed = []
+        for mac, state in list(self.devices.items()):
+            name = index.lookup(mac)
+            if name is None:
+                del self.devices[mac]
+                self.missed.pop(mac, None)
+                removed.append(mac)
+                continue
+            before = dict(state)
+            state['name'] = name
+            copy_meta(state, index.lookup_meta(mac) or {})
+            if state != before:
+                self.snapshot_pending = True
+        if removed:
+            self.snapshot_pending = True
+        return removed
+
+    def snapshot(self):
+        """Copia del estado completo de todos los dispositivos conocidos"""
+        return [dict(state) for state in self.devices.values()]
+
+    def snapshot_due(self):
+        """True si el ciclo actual debe enviar una instantánea completa de reconciliación"""
+        return self.cycles == 1 or self.snapshot_pending or self.cycles % self.snapshot_every == 0
+
+    def delta_payload(self, changes, scan_time):
+        """Cuerpo para receiver.php con solo los cambios"""
+        return {'mode': 'delta', 'changes': changes, 'scan_time': scan_time}
+
+    def build_payload(self, changes, scan_time):
+        """Construye el cuerpo para receiver.php: delta o instantánea completa"""
+        if self.snapshot_due():
+            self.snapshot_pending = False
+            return {'mode': 'snapshot', 'devices': self.snapshot(), 'scan_time': scan_time}
+        return self.delta_payload(changes, scan_time)
+
@@ -1,63 +1,199 @@
 #!/usr/bin/env python3
-import subprocess
-import re
-import requests
 import json
 import time
 import sys
 import argparse
+import logging
 import os
+import signal
 from datetime import datetime
 
+from arp_parser import MacIndex, match_devices
+from delivery import Delivery
+from device_registry import DeviceRegistry, RegistryError, parse_devices
+from device_tracker import DeviceTracker
+from parallel_scan import create_scanner
+from scan_backends import ScanError, reachable_neighbours, ARP_TABLE_PATH
+from scheduler import AdaptiveScheduler
+from telemetry import LOG_LEVELS, Metrics, SystemdNotifier, setup_logging, start_metrics_server
+
 # Variables globales
 PHP_URL = None
+DELIVERY = None  # Sesión HTTP + cola en disco hacia receiver.php
 REFRESH_INTERVAL = 10  # minutos por defecto
-MAC_TO_NAME = {}  # Se cargará desde JSON
+MAC_TO_NAME = MacIndex()  # Se cargará desde JSON
+REGISTRY = None  # Vigila el JSON y reemplaza MAC_TO_NAME cuando cambia
+SCANNER = None  # ParallelScanner con los segmentos a escanear
+TRACKER = None  # Estado por MAC para enviar solo cambios (None = modo completo)
+SCHEDULER = None  # Planificador adaptativo (None = intervalo fijo)
+PASSIVE = False  # Sondear antes lo que la tabla de vecinos del kernel muestra activo
+DAEMON = False  # Sin salida por consola: registro JSON, métricas y aviso a systemd
+METRICS = Metrics()  # Se exponen en /metrics solo en modo daemon
+NOTIFIER = SystemdNotifier()
+
+LOG = logging.getLogger('network_scanner')
+LOG.addHandler(logging.NullHandler())
+
+METRICS.describe('scan_duration_seconds', 'summary', 'Duración de los escaneos (full = barrido, probe = sondeo dirigido)')
+METRICS.describe('last_scan_duration_seconds', 'gauge', 'Duración del último escaneo')
+METRICS.describe('target_scan_duration_seconds', 'gauge', 'Duración del último escaneo de cada segmento')
+METRICS.describe('target_errors_total', 'counter', 'Errores de escaneo por segmento')
+METRICS.describe('devices_found', 'gauge', 'Dispositivos conocidos encontrados en el último barrido')
+METRICS.describe('devices_online', 'gauge', 'Dispositivos en línea según el seguimiento incremental')
+METRICS.describe('device_changes_total', 'counter', 'Eventos joined/left/ip_changed detectados')
+METRICS.describe('post_latency_seconds', 'summary', 'Latencia de los envíos a receiver.php')
+METRICS.describe('posts_total', 'counter', 'Envíos a receiver.php por resultado')
+METRICS.describe('spool_depth', 'gauge', 'Escaneos en la cola de reintentos en disco')
+METRICS.describe('scans_discarded_total', 'counter', 'Escaneos no entregados (rejected = rechazados por el receptor, dropped = cola llena)')
+METRICS.describe('registry_devices', 'gauge', 'Entradas del registro de dispositivos (MACs y prefijos OUI)')
+METRICS.describe('registry_reloads_total', 'counter', 'Recargas del registro de dispositivos por resultado')
+
+def log_event(event, message=None, level=logging.INFO, **fields):
+    """Informa un evento: `message` por consola o, en modo daemon, una línea JSON con `fields`"""
+    if DAEMON:
+        LOG.log(level, event, extra={'fields': fields})
+    elif message is not None:
+        print(message)
+
+def fail(message):
+    """Informa un error de configuración y termina"""
+    log_event('config_error', message, logging.ERROR, error=message.replace('❌ ', ''))
+    sys.exit(1)
+
+def record_scan(kind, seconds, devices=None):
+    """Registra en las métricas la duración de un escaneo y lo encontrado"""
+    METRICS.observe('scan_duration_seconds', seconds, kind=kind)
+    METRICS.set('last_scan_duration_seconds', seconds, kind=kind)
+    if devices is not None:
+        METRICS.set('devices_found', len(devices))
+    if TRACKER:
+        METRICS.set('devices_online', sum(1 for state in TRACKER.devices.values() if state['online']))
+
+def print_reports(reports, verbose=True):
+    """Muestra el tiempo de cada segmento escaneado (los errores siempre)"""
+    for report in reports:
+        METRICS.set('target_scan_duration_seconds', report.seconds, target=report.label)
+        if report.error:
+            METRICS.inc('target_errors_total', target=report.label)
+            log_event('target_error', f"Error en scan_network ({report.label}): {report.error}",
+                      logging.ERROR, target=report.label, error=report.error)
+        elif verbose:
+            log_event('target_scanned',
+                      f"  ⏱️  {report.label}: {report.seconds:.2f} s, {report.hits} respuestas ({report.backend})",
+                      logging.DEBUG, target=report.label, seconds=round(report.seconds, 3),
+                      hits=report.hits, backend=report.backend)
+
+def known_devices(hits):
+    """Filtra las respuestas (ip, mac) dejando solo los dispositivos configurados"""
+    return match_devices(hits, MAC_TO_NAME)
 
 def scan_network():
-    """Escanea la red local usando arp-scan"""
+    """Escanea la red local con el backend configurado (arp-scan como respaldo)"""
+    start = time.perf_counter()
+    hits, reports = SCANNER.scan()
+    print_reports(reports)
+    devices = known_devices(hits)
+    record_scan('full', time.perf_counter() - start, devices)
+    return devices
+
+def presence_check():
+    """Entre barridos: sondea los dispositivos pendientes y los que la tabla de vecinos delata
+
+    Solo cuenta como visto lo que responde al sondeo de este ciclo: la tabla de
+    vecinos (entradas REACHABLE) sirve únicamente para sondear antes a un
+    dispositivo fuera de línea o nuevo que acaba de hablar en la red.
+    """
+    scan_time = datetime.now().isoformat()
+    start = time.perf_counter()
+
+    # Por MAC: dos MACs pueden compartir (o heredar) la misma IP
+    targets = {}
+    for mac in SCHEDULER.due():
+        state = TRACKER.devices.get(mac)
+        if state:
+            targets[mac] = state['ip']
+        else:
+            SCHEDULER.forget(mac)
+
+    if PASSIVE:
+        try:
+            neighbours = reachable_neighbours()
+        except OSError as e:
+            log_event('neighbour_table_error', f"Error leyendo tabla de vecinos: {e}", logging.ERROR, error=str(e))
+        else:
+            for device in known_devices(neighbours.items()):
+                state = TRACKER.devices.get(device['mac'])
+                if state is None or not state['online']:
+                    targets.setdefault(device['mac'], device['ip'])
+
+    hits = []
+    if targets:
+        probe_hits, reports = SCANNER.scan_hosts(sorted(set(targets.values())))
+        print_reports(reports, verbose=False)
+        hits.extend(probe_hits)
+
+    probed = set(targets)
+    changes = TRACKER.update(known_devices(hits), scan_time, probed=probed)
+    SCHEDULER.observe(probed, {change['mac'] for change in changes})
+    if probed:
+        record_scan('probe', time.perf_counter() - start)
+
+    if changes:
+        log_event('presence_changes',
+                  f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 👂 Cambios detectados entre barridos ({len(probed)} sondeados)",
+                  probed=len(probed), changes=len(changes))
+        log_changes(changes)
+        send_to_php(TRACKER.delta_payload(changes, scan_time))
+
+def log_changes(changes):
+    """Informa cada evento joined/left/ip_changed"""
+    for change in changes:
+        METRICS.inc('device_changes_total', event=change['event'])
+        log_event('device_' + change['event'], f"  🔀 {change['event']}: {change['name']} ({change['ip']})",
+                  name=change['name'], ip=change['ip'], mac=change['mac'],
+                  previous_ip=change.get('previous_ip'))
+
+def reload_registry():
+    """Aplica los cambios del archivo de dispositivos sin reiniciar el monitor"""
+    global MAC_TO_NAME
     try:
-        # Ejecutar arp-scan en la red local
-        result = subprocess.run(['arp-scan', '-l'], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            print(f"Error ejecutando arp-scan: {result.stderr}")
-            return []
-        
-        devices = []
-        lines = result.stdout.split('\n')
-        
-        for line in lines:
-            # Buscar líneas con formato IP MAC
-            match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([a-fA-F0-9:]{17})', line)
-            if match:
-                ip = match.group(1)
-                mac = match.group(2).lower()
-                
-                # Verificar si la MAC está en nuestro mapeo
-                if mac in MAC_TO_NAME:
-                    devices.append({
-                        'ip': ip,
-                        'mac': mac,
-                        'name': MAC_TO_NAME[mac],
-                        'timestamp': datetime.now().isoformat()
-                    })
-        
-        return devices
-        
-    except subprocess.TimeoutExpired:
-        print("Timeout ejecutando arp-scan")
-        return []
-    except Exception as e:
-        print(f"Error en scan_network: {e}")
-        return []
+        change = REGISTRY.check()
+    except RegistryError as e:
+        METRICS.inc('registry_reloads_total', result='error')
+        log_event('registry_error', f"❌ Registro no recargado (se mantiene el anterior): {e}",
+                  logging.ERROR, file=REGISTRY.path, error=str(e))
+        return
+    if change is None:
+        return
+    
+    MAC_TO_NAME = REGISTRY.index
+    METRICS.inc('registry_reloads_total', result='ok')
+    METRICS.set('registry_devices', len(MAC_TO_NAME))
+    
+    # El estado de las MACs que siguen en el registro se conserva
+    if TRACKER:
+        for mac in TRACKER.retain(MAC_TO_NAME):
+            if SCHEDULER:
+                SCHEDULER.forget(mac)
+    
+    log_event('registry_reloaded',
+              f"🔄 Registro recargado desde {REGISTRY.path}: {len(MAC_TO_NAME)} entradas "
+              f"(+{len(change.added)} -{len(change.removed)} ~{len(change.changed)})",
+              file=REGISTRY.path, devices=len(MAC_TO_NAME), added=change.added,
+              removed=change.removed, changed=change.changed)
+
+def build_mac_index(devices, config_file):
+    """Construye el índice de MACs (exactas y comodines OUI, con grupo/etiquetas) de la sección devices"""
+    try:
+        return parse_devices(devices)
+    except RegistryError as e:
+        fail(f"❌ Error: {e} en {config_file}")
 
 def load_full_config(config_file):
     """Carga la configuración completa desde archivo JSON"""
     try:
         if not os.path.exists(config_file):
-            print(f"❌ Error: Archivo de configuración no encontrado: {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: Archivo de configuración no encontrado: {config_file}")
         
         with open(config_file, 'r', encoding='utf-8') as f:
             config = json.load(f)
@@ -66,151 +202,119 @@ def load_full_config(config_file):
         required_sections = ['server', 'scan', 'devices']
         for section in required_sections:
             if section not in config:
-                print(f"❌ Error: Falta la sección '{section}' en {config_file}")
-                sys.exit(1)
+                fail(f"❌ Error: Falta la sección '{section}' en {config_file}")
         
         # Validar sección server
         if 'url' not in config['server']:
-            print(f"❌ Error: Falta 'server.url' en {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: Falta 'server.url' en {config_file}")
         
         # Validar sección scan
         if 'interval_minutes' not in config['scan']:
-            print(f"❌ Error: Falta 'scan.interval_minutes' en {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: Falta 'scan.interval_minutes' en {config_file}")
         
         # Validar devices
         if not config['devices']:
-            print(f"❌ Error: No se encontraron dispositivos en {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: No se encontraron dispositivos en {config_file}")
         
-        # Normalizar MACs a minúsculas
-        normalized_devices = {}
-        for mac, name in config['devices'].items():
-            normalized_devices[mac.lower()] = name
+        config['devices'] = build_mac_index(config['devices'], config_file)
         
-        config['devices'] = normalized_devices
-        
-        print(f"✅ Configuración completa cargada desde {config_file}")
-        print(f"  🌐 Servidor: {config['server']['url']}")
-        print(f"  ⏱️  Intervalo: {config['scan']['interval_minutes']} minutos")
-        print(f"  📱 Dispositivos: {len(config['devices'])}")
+        log_event('config_loaded',
+                  f"✅ Configuración completa cargada desde {config_file}\n"
+                  f"  🌐 Servidor: {config['server']['url']}\n"
+                  f"  ⏱️  Intervalo: {config['scan']['interval_minutes']} minutos\n"
+                  f"  📱 Dispositivos: {len(config['devices'])}",
+                  file=config_file, devices=len(config['devices']))
         
         return config
         
     except json.JSONDecodeError as e:
-        print(f"❌ Error: JSON inválido en {config_file}: {e}")
-        sys.exit(1)
+        fail(f"❌ Error: JSON inválido en {config_file}: {e}")
     except Exception as e:
-        print(f"❌ Error leyendo {config_file}: {e}")
-        sys.exit(1)
+        fail(f"❌ Error leyendo {config_file}: {e}")
 
 def load_devices_config(config_file):
     """Carga la configuración de dispositivos desde archivo JSON"""
     try:
         if not os.path.exists(config_file):
-            print(f"❌ Error: Archivo de configuración no encontrado: {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: Archivo de configuración no encontrado: {config_file}")
         
         with open(config_file, 'r', encoding='utf-8') as f:
             config = json.load(f)
         
         if 'devices' not in config:
-            print(f"❌ Error: El archivo {config_file} debe contener un objeto 'devices'")
-            sys.exit(1)
+            fail(f"❌ Error: El archivo {config_file} debe contener un objeto 'devices'")
         
         devices = config['devices']
         if not devices:
-            print(f"❌ Error: No se encontraron dispositivos en {config_file}")
-            sys.exit(1)
+            fail(f"❌ Error: No se encontraron dispositivos en {config_file}")
         
-        # Convertir MACs a minúsculas para consistencia
-        normalized_devices = {}
-        for mac, name in devices.items():
-            normalized_devices[mac.lower()] = name
+        index = build_mac_index(devices, config_file)
         
-        print(f"✅ Configuración cargada: {len(normalized_devices)} dispositivos desde {config_file}")
-        for mac, name in normalized_devices.items():
-            print(f"  📱 {name} - {mac}")
+        log_event('config_loaded', f"✅ Configuración cargada: {len(index)} dispositivos desde {config_file}",
+                  file=config_file, devices=len(index))
+        for mac, name in index.items():
+            log_event('device_configured', f"  📱 {name} - {mac}", logging.DEBUG, name=name, mac=mac)
         
-        return normalized_devices
+        return index
         
     except json.JSONDecodeError as e:
-        print(f"❌ Error: JSON inválido en {config_file}: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"❌ Error leyendo {config_file}: {e}")
-        sys.exit(1)
-    """Escanea la red local usando arp-scan"""
-    try:
-        # Ejecutar arp-scan en la red local
-        result = subprocess.run(['arp-scan', '-l'], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            print(f"Error ejecutando arp-scan: {result.stderr}")
-            return []
-        
-        devices = []
-        lines = result.stdout.split('\n')
-        
-        for line in lines:
-            # Buscar líneas con formato IP MAC
-            match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([a-fA-F0-9:]{17})', line)
-            if match:
-                ip = match.group(1)
-                mac = match.group(2).lower()
-                
-                # Verificar si la MAC está en nuestro mapeo
-                if mac in MAC_TO_NAME:
-                    devices.append({
-                        'ip': ip,
-                        'mac': mac,
-                        'name': MAC_TO_NAME[mac],
-                        'timestamp': datetime.now().isoformat()
-                    })
-        
-        return devices
-        
-    except subprocess.TimeoutExpired:
-        print("Timeout ejecutando arp-scan")
-        return []
+        fail(f"❌ Error: JSON inválido en {config_file}: {e}")
     except Exception as e:
-        print(f"Error en scan_network: {e}")
-        return []
+        fail(f"❌ Error leyendo {config_file}: {e}")
 
-def send_to_php(devices):
-    """Envía los dispositivos encontrados al PHP"""
+def send_to_php(data):
+    """Envía al PHP el cuerpo de un escaneo (instantánea completa o delta)"""
     try:
-        data = {
-            'devices': devices,
-            'scan_time': datetime.now().isoformat()
-        }
-        
-        print(f"Enviando datos: {json.dumps(data, indent=2)}")
-        
-        response = requests.post(PHP_URL, json=data, timeout=10)
-        
-        print(f"Status code: {response.status_code}")
-        print(f"Response: {response.text}")
-        
-        if response.status_code == 200:
-            response_data = response.json()
-            print(f"✅ Datos enviados exitosamente:")
-            print(f"   - Dispositivos: {response_data.get('devices_count', 'N/A')}")
-            print(f"   - Bytes escritos: {response_data.get('bytes_written', 'N/A')}")
-            print(f"   - Archivo: {response_data.get('file_path', 'N/A')}")
-        else:
-            print(f"❌ Error enviando datos: HTTP {response.status_code}")
-            print(f"   Response: {response.text}")
+        # El volcado completo del cuerpo solo en consola: en modo daemon sería el mayor coste por ciclo
+        if not DAEMON:
+            print(f"Enviando datos: {json.dumps(data, indent=2)}")
+        
+        result = DELIVERY.submit(data)
+        record_delivery(result)
+        
+        if result.response is not None:
+            response_data = result.response
+            log_event('post_ok',
+                      f"✅ Datos enviados exitosamente ({result.seconds * 1000:.0f} ms):\n"
+                      f"   - Modo: {response_data.get('mode', data.get('mode', 'snapshot'))}\n"
+                      f"   - Escaneos entregados: {result.delivered}\n"
+                      f"   - Dispositivos: {response_data.get('devices_count', 'N/A')}\n"
+                      f"   - Bytes escritos: {response_data.get('bytes_written', 'N/A')}\n"
+                      f"   - Archivo: {response_data.get('file_path', 'N/A')}",
+                      mode=response_data.get('mode', data.get('mode', 'snapshot')), delivered=result.delivered,
+                      devices=response_data.get('devices_count'), seconds=round(result.seconds, 3))
+        if result.error:
+            log_event('post_error', f"❌ Error enviando datos: {result.error}", logging.ERROR,
+                      error=result.error, pending=result.pending)
+        if result.pending:
+            log_event('spool_pending', f"📦 Escaneos en cola para reintentar: {result.pending}",
+                      logging.DEBUG, pending=result.pending)
             
-    except requests.RequestException as e:
-        print(f"❌ Error de conexión: {e}")
+    except OSError as e:
+        log_event('spool_error', f"❌ Error escribiendo la cola de envío: {e}", logging.ERROR, error=str(e))
     except Exception as e:
-        print(f"❌ Error inesperado en send_to_php: {e}")
+        log_event('post_error', f"❌ Error inesperado en send_to_php: {e}", logging.ERROR, error=str(e))
+
+def record_delivery(result):
+    """Registra en las métricas la latencia y el resultado de un envío o reenvío de la cola"""
+    if result.attempted:
+        METRICS.observe('post_latency_seconds', result.seconds)
+        METRICS.inc('posts_total', result='error' if result.error else 'ok')
+    METRICS.set('spool_depth', result.pending)
+    
+    # Lo que no llegó deja al receptor sin algunos cambios: la próxima instantánea lo reconcilia
+    for reason, count, message in (('rejected', result.rejected, f"rechazados por el receptor (ver {DELIVERY.rejected_path})"),
+                                   ('dropped', result.dropped, "descartados por cola llena")):
+        if count:
+            METRICS.inc('scans_discarded_total', count, reason=reason)
+            log_event('scans_' + reason, f"⚠️  {count} escaneo(s) {message}", logging.WARNING,
+                      count=count, pending=result.pending)
+            if TRACKER:
+                TRACKER.snapshot_pending = True
 
 def main():
     """Función principal que ejecuta el escaneo según el intervalo especificado"""
-    global PHP_URL, REFRESH_INTERVAL, MAC_TO_NAME
+    global PHP_URL, DELIVERY, REFRESH_INTERVAL, MAC_TO_NAME, REGISTRY, SCANNER, TRACKER, SCHEDULER, PASSIVE, DAEMON
     
     # Configurar argumentos
     parser = argparse.ArgumentParser(
@@ -222,7 +326,10 @@ def main():
   
   # Usar parámetros individuales (método anterior)
   python3 network_scanner.py http://midominio.com/monitor/ devices.json
-  python3 network_scanner.py http://192.168.1.100/php/ devices.json -t 5'''
+  python3 network_scanner.py http://192.168.1.100/php/ devices.json -t 5
+  
+  # Servicio sin salida por consola: registro JSON y métricas en :9464/metrics
+  python3 network_scanner.py -f config.json --daemon --log-level warning'''
     )
     
     # Grupo mutuamente exclusivo
@@ -244,8 +351,37 @@ def main():
                        default=10,
                        help='Intervalo de refresco en minutos (solo si no se usa -f)')
     
+    parser.add_argument('-b', '--backend',
+                       choices=['async', 'arp-scan'],
+                       help='Backend de escaneo (por defecto scan.backend del JSON o "async")')
+    
+    parser.add_argument('--full',
+                       action='store_true',
+                       help='Enviar siempre la lista completa en lugar de solo los cambios')
+    
+    parser.add_argument('--daemon',
+                       action='store_true',
+                       help='Modo servicio: registro en líneas JSON, métricas Prometheus y aviso a systemd')
+    
+    parser.add_argument('--log-level',
+                       choices=LOG_LEVELS,
+                       help='Nivel de registro en modo daemon (por defecto daemon.log_level del JSON o "info")')
+    
+    parser.add_argument('--log-file',
+                       help='Archivo de registro en modo daemon (por defecto stderr)')
+    
+    parser.add_argument('--metrics-port',
+                       type=int,
+                       help='Puerto de /metrics en modo daemon (por defecto daemon.metrics_port o 9464; 0 = desactivado)')
+    
     args = parser.parse_args()
     
+    # En modo daemon el registro JSON se activa antes de leer la configuración
+    DAEMON = args.daemon
+    if DAEMON:
+        setup_logging(args.log_level or 'info', args.log_file)
+        signal.signal(signal.SIGTERM, stop_on_sigterm)
+    
     # Modo archivo de configuración completo
     if args.file:
         config = load_full_config(args.file)
@@ -256,10 +392,14 @@ def main():
         REFRESH_INTERVAL = config['scan']['interval_minutes']
         MAC_TO_NAME = config['devices']
         
+        scan_config = dict(config['scan'])
+        server_config = config['server']
+        daemon_config = config.get('daemon', {})
+        registry_file = args.file
+        
         # Validar intervalo
         if REFRESH_INTERVAL <= 0:
-            print("❌ Error: scan.interval_minutes debe ser mayor a 0")
-            sys.exit(1)
+            fail("❌ Error: scan.interval_minutes debe ser mayor a 0")
     
     # Modo parámetros individuales (compatibilidad)
     else:
@@ -270,50 +410,167 @@ def main():
         
         # Validar intervalo
         if args.time <= 0:
-            print("❌ Error: El tiempo debe ser mayor a 0")
-            sys.exit(1)
+            fail("❌ Error: El tiempo debe ser mayor a 0")
         
         # Cargar configuración modo anterior
         MAC_TO_NAME = load_devices_config(args.config)
         base_url = args.url.rstrip('/')
         PHP_URL = f"{base_url}/receiver.php"
         REFRESH_INTERVAL = args.time
+        scan_config = {}
+        server_config = {}
+        daemon_config = {}
+        registry_file = args.config
+    
+    # Los cambios de la sección devices se aplican en caliente
+    REGISTRY = DeviceRegistry(registry_file, MAC_TO_NAME, poll_interval=scan_config.get('reload_seconds', 5))
+    METRICS.set('registry_devices', len(MAC_TO_NAME))
+    
+    # Entrega con conexión persistente, gzip y cola de reintentos
+    DELIVERY = Delivery(
+        PHP_URL,
+        spool_path=server_config.get('spool', 'scanner_spool.jsonl'),
+        timeout=server_config.get('timeout', 10),
+        batch_size=server_config.get('batch_size', 20),
+        compress=server_config.get('gzip', True),
+        backoff_max=server_config.get('max_retry_seconds', 600),
+        max_spool=server_config.get('max_spool', 10000)
+    )
+    
+    # Crear backend de escaneo
+    if args.backend:
+        scan_config['backend'] = args.backend
+    try:
+        SCANNER = create_scanner(scan_config)
+    except ScanError as e:
+        fail(f"❌ Error: {e}")
+    
+    # Modo incremental: solo se envían cambios más una instantánea periódica
+    if scan_config.get('delta', True) and not args.full:
+        TRACKER = DeviceTracker(
+            offline_after=scan_config.get('offline_after_scans', 2),
+            snapshot_every=scan_config.get('snapshot_every', 10)
+        )
+        
+        # Sondeo adaptativo entre barridos completos (requiere el estado por MAC)
+        if scan_config.get('adaptive', True):
+            SCHEDULER = AdaptiveScheduler(
+                full_interval=REFRESH_INTERVAL * 60,
+                min_interval=scan_config.get('min_probe_seconds', 15),
+                tick=scan_config.get('tick_seconds', 5)
+            )
+            PASSIVE = scan_config.get('passive', True) and os.path.exists(ARP_TABLE_PATH)
     
     # Calcular segundos para sleep
     sleep_seconds = int(REFRESH_INTERVAL * 60)
     
-    print("-" * 60)
-    print("🚀 Iniciando monitor de red...")
-    print(f"📡 Escaneando dispositivos cada {REFRESH_INTERVAL} minutos")
-    print(f"🌐 Enviando datos a: {PHP_URL}")
-    print(f"📱 Monitoreando {len(MAC_TO_NAME)} dispositivos configurados")
-    print("-" * 60)
+    if DAEMON:
+        start_daemon(args, daemon_config)
+    else:
+        print_banner()
     
     while True:
         try:
-            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 Escaneando red...")
+            reload_registry()
+            
+            # Entre barridos completos solo se sondea lo pendiente
+            if SCHEDULER and not SCHEDULER.full_sweep_due():
+                presence_check()
+                record_delivery(DELIVERY.flush())
+                NOTIFIER.sleep(SCHEDULER.sleep_seconds())
+                continue
+            
+            log_event('scan_started', f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 Escaneando red...",
+                      logging.DEBUG)
             devices = scan_network()
+            scan_time = datetime.now().isoformat()
             
             if devices:
-                print(f"✅ Dispositivos encontrados: {len(devices)}")
+                log_event('scan_complete', f"✅ Dispositivos encontrados: {len(devices)}", found=len(devices))
                 for device in devices:
-                    print(f"  📟 {device['name']} ({device['ip']}) - {device['mac']}")
+                    log_event('device_seen', f"  📟 {device['name']} ({device['ip']}) - {device['mac']}",
+                              logging.DEBUG, name=device['name'], ip=device['ip'], mac=device['mac'])
+            else:
+                log_event('scan_complete', "⚠️  No se encontraron dispositivos conocidos", found=0)
+            
+            if TRACKER:
+                changes = TRACKER.update(devices, scan_time)
+                log_changes(changes)
+                # Un delta vacío sirve de latido para actualizar last_scan
+                send_to_php(TRACKER.build_payload(changes, scan_time))
                 
-                send_to_php(devices)
+                if SCHEDULER:
+                    SCHEDULER.full_sweep_done()
+                    SCHEDULER.observe(TRACKER.devices, {change['mac'] for change in changes})
             else:
-                print("⚠️  No se encontraron dispositivos conocidos")
-                # Enviar lista vacía para actualizar timestamp
-                send_to_php([])
+                # Enviar lista completa (vacía también, para actualizar timestamp)
+                send_to_php({'devices': devices, 'scan_time': scan_time})
+            
+            NOTIFIER.status(f"{len(devices)} dispositivos, cola {DELIVERY.pending}")
             
-            print(f"⏰ Esperando {REFRESH_INTERVAL} minutos para el próximo escaneo...")
-            time.sleep(sleep_seconds)
+            if SCHEDULER:
+                log_event('sleeping', f"⏰ Próximo barrido completo en {REFRESH_INTERVAL} minutos (sondeo adaptativo mientras tanto)...",
+                          logging.DEBUG)
+                NOTIFIER.sleep(SCHEDULER.sleep_seconds())
+            else:
+                log_event('sleeping', f"⏰ Esperando {REFRESH_INTERVAL} minutos para el próximo escaneo...",
+                          logging.DEBUG, seconds=sleep_seconds)
+                NOTIFIER.sleep(sleep_seconds)
             
         except KeyboardInterrupt:
-            print("\n🛑 Deteniendo monitor...")
+            log_event('stopping', "\n🛑 Deteniendo monitor...")
+            NOTIFIER.stopping()
             break
         except Exception as e:
-            print(f"❌ Error inesperado: {e}")
-            time.sleep(60)  # Esperar 1 minuto antes de reintentar
+            log_event('loop_error', f"❌ Error inesperado: {e}", logging.ERROR, error=str(e))
+            NOTIFIER.sleep(60)  # Esperar 1 minuto antes de reintentar
+    
+    DELIVERY.close()
+
+def stop_on_sigterm(signum, frame):
+    """systemd detiene el servicio con SIGTERM: se trata igual que Ctrl+C"""
+    raise KeyboardInterrupt
+
+def start_daemon(args, daemon_config):
+    """Ajusta el registro según la configuración, publica /metrics y avisa a systemd"""
+    if not args.log_level and not args.log_file and daemon_config:
+        setup_logging(daemon_config.get('log_level', 'info'), daemon_config.get('log_file'))
+    
+    port = args.metrics_port if args.metrics_port is not None else daemon_config.get('metrics_port', 9464)
+    host = daemon_config.get('metrics_host', '127.0.0.1')
+    if port:
+        try:
+            start_metrics_server(METRICS, host, port)
+        except OSError as e:
+            log_event('metrics_error', level=logging.ERROR, host=host, port=port, error=str(e))
+            port = None
+    METRICS.set('spool_depth', DELIVERY.pending)
+    
+    log_event('started', url=PHP_URL, interval_minutes=REFRESH_INTERVAL, backend=SCANNER.name,
+              workers=SCANNER.workers, targets=[target.label for target in SCANNER.targets],
+              devices=len(MAC_TO_NAME), pending=DELIVERY.pending, incremental=bool(TRACKER),
+              adaptive=bool(SCHEDULER), passive=PASSIVE, metrics_port=port or None,
+              systemd=NOTIFIER.enabled)
+    NOTIFIER.ready(f"Escaneando {len(SCANNER.targets)} segmento(s) cada {REFRESH_INTERVAL} minutos")
+
+def print_banner():
+    """Resumen de la configuración al iniciar en modo interactivo"""
+    print("-" * 60)
+    print("🚀 Iniciando monitor de red...")
+    print(f"📡 Escaneando dispositivos cada {REFRESH_INTERVAL} minutos")
+    print(f"🌐 Enviando datos a: {PHP_URL}")
+    if DELIVERY.pending:
+        print(f"📦 {DELIVERY.pending} escaneos pendientes en {DELIVERY.spool_path}")
+    print(f"🛰️  Backend de escaneo: {SCANNER.name} ({SCANNER.workers} en paralelo)")
+    for target in SCANNER.targets:
+        print(f"  🔌 {target.label}: " + " → ".join(backend.name for backend in target.backends))
+    print(f"📱 Monitoreando {len(MAC_TO_NAME)} dispositivos configurados (recarga automática de {REGISTRY.path})")
+    if TRACKER:
+        print(f"🔁 Modo incremental: instantánea completa cada {TRACKER.snapshot_every} escaneos")
+    if SCHEDULER:
+        print(f"🎯 Sondeo adaptativo cada {SCHEDULER.min_interval:g}-{SCHEDULER.full_interval:g} s por dispositivo"
+              + (" + tabla de vecinos pasiva" if PASSIVE else ""))
+    print("-" * 60)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Escaneo en paralelo de varias interfaces y subredes
+
+Cada interfaz de scan.interfaces y cada rango de scan.subnets es un segmento
+(ScanTarget) con sus propios backends. ParallelScanner los recorre en un pool
+acotado de hilos, une los resultados eliminando MACs repetidas y devuelve el
+tiempo de cada segmento para detectar los lentos.
+"""
+
+import ipaddress
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scan_backends import ScanError, create_backends, resolve_network
+
+
+class TargetReport:
+    """Resultado y duración del escaneo de un segmento"""
+
+    def __init__(self, label, seconds, hits=0, backend=None, error=None):
+        self.label = label
+        self.seconds = seconds
+        self.hits = hits
+        self.backend = backend
+        self.error = error
+
+
+class ScanTarget:
+    """Segmento de red (interfaz y/o subred) con backend principal y respaldo"""
+
+    def __init__(self, label, primary, fallback=None):
+        self.label = label
+        self.backends = [backend for backend in (primary, fallback) if backend]
+        self._network = None
+
+    @property
+    def network(self):
+        """Red IPv4 del segmento, o None si no se puede determinar"""
+        if self._network is None:
+            primary = self.backends[0]
+            try:
+                self._network = resolve_network(primary.network, primary.interface)
+            except (ScanError, OSError):
+                return None
+        return self._network
+
+    def run(self, action):
+        """Ejecuta `action(backend)` con el principal y, si falla, con el respaldo
+
+        Devuelve (resultados, TargetReport); nunca lanza excepciones.
+        """
+        start = time.perf_counter()
+        errors = []
+        for backend in self.backends:
+            try:
+                hits = action(backend)
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+                continue
+            return hits, TargetReport(self.label, time.perf_counter() - start, len(hits), backend.name)
+        return [], TargetReport(self.label, time.perf_counter() - start, error='; '.join(errors))
+
+
+class ParallelScanner:
+    """Escanea todos los segmentos concurrentemente con un máximo de `workers` hilos"""
+
+    def __init__(self, targets, workers=4):
+        self.targets = targets
+        self.workers = max(1, min(workers, len(targets)))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scan') if self.workers > 1 else None
+
+    @property
+    def name(self):
+        return self.targets[0].backends[0].name
+
+    def _run_jobs(self, jobs):
+        """Ejecuta [(target, action)] y une los resultados por MAC en el orden de los segmentos"""
+        if self._pool and len(jobs) > 1:
+            futures = [self._pool.submit(target.run, action) for target, action in jobs]
+            outcomes = [future.result() for future in futures]
+        else:
+            outcomes = [target.run(action) for target, action in jobs]
+
+        merged = {}
+        reports = []
+        for hits, report in outcomes:
+            reports.append(report)
+            for ip, mac in hits:
+                merged.setdefault(mac, (ip, mac))
+        return list(merged.values()), reports
+
+    def scan(self):
+        """Barre todos los segmentos; devuelve ([(ip, mac)], [TargetReport])"""
+        return self._run_jobs([(target, lambda backend: backend.scan()) for target in self.targets])
+
+    def scan_hosts(self, hosts):
+        """Sondea IPs concretas, cada una en el segmento que la contiene"""
+        groups = {}
+        for ip in hosts:
+            owner = self.targets[0]
+            for target in self.targets:
+                network = target.network
+                if network is not None and ipaddress.IPv4Address(ip) in network:
+                    owner = target
+                    break
+            groups.setdefault(owner, []).append(ip)
+
+        return self._run_jobs([
+            (target, lambda backend, ips=ips: backend.scan_hosts(ips))
+            for target, ips in groups.items()
+        ])
+
+
+def create_scanner(scan_config):
+    """Construye el ParallelScanner a partir de scan.interfaces / scan.subnets"""
+    targets = []
+
+    for interface in scan_config.get('interfaces', []):
+        primary, fallback = create_backends(scan_config, network='auto', interface=interface)
+        targets.append(ScanTarget(interface, primary, fallback))
+
+    for subnet in scan_config.get('subnets', []):
+        # Cada subred puede ser "10.0.0.0/22" o {"network": "...", "interface": "..."}
+        if isinstance(subnet, dict):
+            network, interface = subnet['network'], subnet.get('interface')
+        else:
+            network, interface = subnet, None
+        primary, fallback = create_backends(scan_config, network=network, interface=interface)
+        targets.append(ScanTarget(f"{interface} {network}" if interface else network, primary, fallback))
+
+    # Sin segmentos explícitos: comportamiento anterior con scan.network / scan.interface
+    if not targets:
+        primary, fallback = create_backends(scan_config)
+        label = scan_config.get('interface') or scan_config.get('network', 'auto')
+        targets.append(ScanTarget(label, primary, fallback))
+
+    return ParallelScanner(targets, workers=scan_config.get('workers', 4))
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Analítica de presencia a partir del historial de escaneos
+
+Lee history.jsonl (de receiver.php o de aggregator.py) una sola vez y lo
+convierte en estructuras columnares de NumPy:
+
+- sesiones: arreglos paralelos dispositivo / inicio / fin (segundos epoch) de
+  cada periodo continuo en línea;
+- mapa de bits dispositivo × tiempo, con un bit por intervalo de `resolution`
+  segundos empaquetado en palabras de 64 bits (un año de escaneos por minuto
+  ocupa ~64 KB por dispositivo), más una fila de cobertura con los intervalos
+  en los que el escáner estaba informando.
+
+Sobre eso, todas las consultas son vectorizadas: porcentaje en línea, sesiones
+y tiempos de permanencia, primera entrada / última salida por día y
+co-presencia entre dispositivos.
+
+Si el escáner deja de informar durante más de `stale_after` segundos, las
+sesiones abiertas se cierran y ese tramo no cuenta como observado. Por defecto
+`stale_after` es STALE_GAP_FACTOR veces la separación mediana entre eventos
+del historial: los latidos llegan con cada barrido completo (cada
+scan.interval_minutes), así que el umbral sigue al intervalo configurado.
+
+Requiere numpy (solo este módulo; el escáner no lo necesita).
+
+Uso:
+  python3 presence_analytics.py history.jsonl [--from 2026-01-01] [--to 2026-02-01] [--resolution 60]
+"""
+
+import argparse
+import json
+from datetime import datetime, time as dtime, timedelta
+
+import numpy as np
+
+ALL_BITS = (1 << 64) - 1
+
+# Un hueco sin eventos de más de esta cantidad de separaciones medianas es un corte del escáner
+STALE_GAP_FACTOR = 3
+
+
+def parse_time(value):
+    """Segundos epoch de una marca ISO (las marcas sin zona se toman como hora local)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def read_history(path):
+    """Genera los eventos de un history.jsonl, ignorando líneas incompletas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict) and event.get('t'):
+                yield event
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Bits en 1 de cada palabra (uint8)"""
+        return np.bitwise_count(words)
+else:
+    _POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Bits en 1 de cada palabra (uint8), con tabla por byte en numpy < 2.0"""
+        counts = _POPCOUNT8[np.ascontiguousarray(words).view(np.uint8)]
+        return counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def _range_masks(a, b):
+    """Máscaras de la primera y la última palabra para los intervalos [a, b)"""
+    lo = np.uint64(ALL_BITS ^ ((1 << (a % 64)) - 1))
+    hi = np.uint64((1 << ((b - 1) % 64 + 1)) - 1)
+    return a // 64, (b - 1) // 64, lo, hi
+
+
+def _pack_rows(rows_bool):
+    """Empaqueta filas booleanas en palabras de 64 bits (bit k de la palabra w = intervalo 64w+k)"""
+    packed = np.packbits(rows_bool, axis=-1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64, copy=False)
+
+
+def _split_sessions(device, start, end, gap_from, gap_to):
+    """Parte cada sesión en los huecos [gap_from, gap_to) que atraviesa"""
+    if not len(gap_from) or not len(device):
+        return device, start, end
+    first = np.searchsorted(gap_from, start, side='left')
+    last = np.searchsorted(gap_to, end, side='right')
+    pieces = np.maximum(last - first, 0) + 1
+    session = np.repeat(np.arange(len(device)), pieces)
+    offset = np.arange(len(session)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    gap = first[session] + offset
+    piece_start = np.where(offset == 0, start[session], gap_to[np.clip(gap - 1, 0, len(gap_to) - 1)])
+    piece_end = np.where(offset == pieces[session] - 1, end[session], gap_from[np.clip(gap, 0, len(gap_from) - 1)])
+    return device[session], piece_start, piece_end
+
+
+class PresenceMatrix:
+    """Historial de presencia en forma columnar con consultas vectorizadas"""
+
+    def __init__(self, macs, names, session_device, session_start, session_end,
+                 coverage, start, resolution):
+        self.macs = list(macs)
+        self.names = dict(names)
+        self.index = {mac: i for i, mac in enumerate(self.macs)}
+        self.session_device = np.asarray(session_device, dtype=np.int32)
+        self.session_start = np.asarray(session_start, dtype=np.float64)
+        self.session_end = np.asarray(session_end, dtype=np.float64)
+        self.coverage_intervals = np.asarray(coverage, dtype=np.float64).reshape(-1, 2)
+        self.start = start
+        self.resolution = resolution
+
+        end = max([start + resolution]
+                  + ([float(self.session_end.max())] if len(self.session_end) else [])
+                  + ([float(self.coverage_intervals[:, 1].max())] if len(self.coverage_intervals) else []))
+        self.bins = int(np.ceil((end - start) / resolution))
+        self.words = self._bitmap_from_intervals(self.session_device, self.session_start,
+                                                 self.session_end, len(self.macs))
+        self.coverage = self._bitmap_from_intervals(
+            np.zeros(len(self.coverage_intervals), dtype=np.int32),
+            self.coverage_intervals[:, 0], self.coverage_intervals[:, 1], 1)
+
+    # --- Construcción ---
+
+    @classmethod
+    def from_history(cls, path, resolution=60, stale_after=None):
+        return cls.from_events(read_history(path), resolution, stale_after)
+
+    @classmethod
+    def from_events(cls, events, resolution=60, stale_after=None):
+        """Reproduce instantáneas y deltas y extrae las sesiones en línea de cada MAC
+
+        Los huecos se deciden al final, cuando ya se conoce la separación
+        habitual entre eventos: las sesiones que los atraviesan se parten ahí.
+        """
+        index, names = {}, {}
+        devices, starts, ends = [], [], []
+        times = []
+        open_sessions = {}  # mac -> inicio
+        online = set()
+        last_t = None
+
+        def close(mac, at):
+            devices.append(index[mac])
+            starts.append(open_sessions.pop(mac))
+            ends.append(at)
+
+        for event in events:
+            t = parse_time(event['t'])
+            if last_t is not None and t < last_t:
+                continue  # fuera de orden: el historial se escribe en orden de llegada
+            times.append(t)
+
+            # Solo se tocan las MACs que cambian: open_sessions tiene siempre las MACs de online
+            if event.get('m') == 'snapshot':
+                current = set()
+                for device in event.get('d', []):
+                    mac = device['mac']
+                    index.setdefault(mac, len(index))
+                    names[mac] = device.get('name', names.get(mac, mac))
+                    if device.get('online', True):
+                        current.add(mac)
+                for mac in online - current:
+                    close(mac, t)
+                for mac in current - online:
+                    open_sessions[mac] = t
+                online = current
+            else:
+                for change in event.get('c', []):
+                    mac = change['mac']
+                    index.setdefault(mac, len(index))
+                    names[mac] = change.get('name', names.get(mac, mac))
+                    if change.get('online', change.get('event') != 'left'):
+                        if mac not in online:
+                            online.add(mac)
+                            open_sessions[mac] = t
+                    elif mac in online:
+                        online.discard(mac)
+                        close(mac, t)
+            last_t = t
+
+        if last_t is None:
+            return cls([], {}, [], [], [], [], 0.0, resolution)
+
+        # El último escaneo vale por un intervalo
+        final = last_t + resolution
+        for mac in list(open_sessions):
+            close(mac, final)
+
+        # Huecos: el escáner no informó; lo abierto se cierra y el tramo queda sin observar
+        # (el escaneo anterior al hueco vale por una separación habitual)
+        times = np.asarray(times)
+        gaps = np.diff(times)
+        spacing = float(np.median(gaps)) if len(gaps) else float(resolution)
+        if stale_after is None:
+            stale_after = max(spacing * STALE_GAP_FACTOR, resolution)
+        stale = gaps > stale_after
+        gap_from = times[:-1][stale] + min(spacing, stale_after)
+        gap_to = times[1:][stale]
+        devices, starts, ends = _split_sessions(np.asarray(devices, dtype=np.int32), np.asarray(starts),
+                                                np.asarray(ends), gap_from, gap_to)
+        coverage = np.column_stack((np.concatenate(([times[0]], gap_to)), np.concatenate((gap_from, [final]))))
+
+        macs = sorted(index, key=index.get)
+        start = np.floor(times[0] / resolution) * resolution
+        return cls(macs, names, devices, starts, ends, coverage, float(start), resolution)
+
+    def _bitmap_from_intervals(self, device, start, end, rows):
+        """Marca los intervalos [inicio, fin) de cada fila con sumas de diferencias
+
+        Ambos extremos se redondean igual, así que un bit queda marcado si el intervalo
+        cubre su punto medio y dos intervalos contiguos no comparten bits. Solo un
+        intervalo más corto que un bit que no cubra ningún punto medio recibe uno.
+        """
+        first = np.rint((np.asarray(start) - self.start) / self.resolution).astype(np.int64)
+        last = np.rint((np.asarray(end) - self.start) / self.resolution).astype(np.int64)
+        last = np.where(last > first, last, first + 1)
+        width = -(-self.bins // 64) * 64
+        words = np.zeros((rows, width // 64), dtype=np.uint64)
+        order = np.argsort(device, kind='stable')
+        bounds = np.searchsorted(device[order], np.arange(rows + 1))
+        for row in range(rows):
+            chosen = order[bounds[row]:bounds[row + 1]]
+            if not len(chosen):
+                continue
+            diff = np.zeros(width + 1, dtype=np.int32)
+            np.add.at(diff, np.clip(first[chosen], 0, width), 1)
+            np.add.at(diff, np.clip(last[chosen], 0, width), -1)
+            words[row] = _pack_rows(np.cumsum(diff[:width]) > 0)
+        return words
+
+    # --- Utilidades ---
+
+    def _bin(self, value, default):
+        if value is None:
+            return default
+        if isinstance(value, (str, int, float)):
+            value = parse_time(value)
+        elif isinstance(value, datetime):
+            value = value.timestamp()
+        return int(min(max(np.floor((value - self.start) / self.resolution), 0), self.bins))
+
+    def _bounds(self, start, end):
+        return self._bin(start, 0), self._bin(end, self.bins)
+
+    def _rows(self, macs):
+        if macs is None:
+            return np.arange(len(self.macs))
+        return np.array([self.index[mac] for mac in macs if mac in self.index], dtype=np.int64)
+
+    def _words(self, macs):
+        """Filas del mapa de bits (sin copiar cuando se piden todas)"""
+        return self.words if macs is None else self.words[self._rows(macs)]
+
+    def _count(self, words, a, b):
+        """Bits en [a, b) de cada fila, contando palabras completas y enmascarando los bordes"""
+        if b <= a or not words.shape[0]:
+            return np.zeros(words.shape[0], dtype=np.int64)
+        wa, wb, lo, hi = _range_masks(a, b)
+        if wa == wb:
+            return popcount(words[:, wa] & (lo & hi)).astype(np.int64)
+        total = popcount(words[:, wa] & lo).astype(np.int64) + popcount(words[:, wb] & hi)
+        if wb > wa + 1:
+            total += popcount(words[:, wa + 1:wb]).sum(axis=1, dtype=np.int64)
+        return total
+
+    def _window(self, words, a, b):
+        """Copia de las palabras que cubren [a, b) con los bits de fuera del rango en cero"""
+        wa, wb, lo, hi = _range_masks(a, b)
+        window = words[:, wa:wb + 1].copy()
+        window[:, 0] &= lo
+        window[:, -1] &= hi
+        return window
+
+    # --- Consultas ---
+
+    def uptime(self, start=None, end=None, macs=None):
+        """{mac: fracción del tiempo observado en que estuvo en línea} entre start y end"""
+        a, b = self._bounds(start, end)
+        rows = self._rows(macs)
+        observed = int(self._count(self.coverage, a, b)[0]) if self.coverage.shape[0] else 0
+        counts = self._count(self._words(macs), a, b)
+        fractions = counts / observed if observed else np.zeros(len(rows))
+        return {self.macs[row]: float(value) for row, value in zip(rows, fractions)}
+
+    def sessions(self, start=None, end=None, min_seconds=0, macs=None):
+        """Sesiones en línea que se solapan con [start, end), recortadas a ese rango
+
+        Devuelve arreglos paralelos: device (índice en self.macs), start, end (epoch).
+        """
+        lo = parse_time(start) if start is not None else -np.inf
+        hi = parse_time(end) if end is not None else np.inf
+        mask = (self.session_end > lo) & (self.session_start < hi)
+        if macs is not None:
+            mask &= np.isin(self.session_device, self._rows(macs))
+        s_start = np.maximum(self.session_start[mask], lo)
+        s_end = np.minimum(self.session_end[mask], hi)
+        keep = (s_end - s_start) >= min_seconds
+        return {'device': self.session_device[mask][keep], 'start': s_start[keep], 'end': s_end[keep]}
+
+    def dwell(self, start=None, end=None, min_seconds=0):
+        """Por dispositivo: número de sesiones y permanencia total, media y máxima (s)"""
+        found = self.sessions(start, end, min_seconds)
+        durations = found['end'] - found['start']
+        count = np.bincount(found['device'], minlength=len(self.macs))
+        total = np.bincount(found['device'], weights=durations, minlength=len(self.macs))
+        longest = np.zeros(len(self.macs))
+        np.maximum.at(longest, found['device'], durations)
+        mean = np.divide(total, count, out=np.zeros(len(self.macs)), where=count > 0)
+        return {mac: {'sessions': int(count[i]), 'total': float(total[i]), 'mean': float(mean[i]),
+                      'max': float(longest[i])}
+                for i, mac in enumerate(self.macs)}
+
+    def _day_starts(self, lo, hi):
+        """Inicio (epoch, hora local) de cada día entre lo y hi, más el del día siguiente"""
+        first = datetime.fromtimestamp(lo).date()
+        last = datetime.fromtimestamp(hi).date()
+        days = [first + timedelta(days=i) for i in range((last - first).days + 2)]
+        return days, np.array([datetime.combine(day, dtime()).timestamp() for day in days])
+
+    def daily(self, start=None, end=None, macs=None):
+        """Primera entrada, última salida y tiempo en línea por dispositivo y día (hora local)
+
+        Devuelve arreglos paralelos: device, day (date), first_in, last_out, present (s).
+        """
+        found = self.sessions(start, end, macs=macs)
+        if not len(found['device']):
+            empty = np.array([])
+            return {'device': empty.astype(np.int32), 'day': [], 'first_in': empty, 'last_out': empty,
+                    'present': empty}
+
+        days, day_starts = self._day_starts(found['start'].min(), found['end'].max())
+        first_day = np.searchsorted(day_starts, found['start'], side='right') - 1
+        last_day = np.searchsorted(day_starts, np.nextafter(found['end'], -np.inf), side='right') - 1
+
+        # Una pieza por sesión y día que toca
+        spans = last_day - first_day + 1
+        session = np.repeat(np.arange(len(spans)), spans)
+        offset = np.arange(len(session)) - np.repeat(np.cumsum(spans) - spans, spans)
+        day = first_day[session] + offset
+        piece_start = np.maximum(found['start'][session], day_starts[day])
+        piece_end = np.minimum(found['end'][session], day_starts[day + 1])
+        device = found['device'][session]
+
+        key = device.astype(np.int64) * len(days) + day
+        keys, group = np.unique(key, return_inverse=True)
+        first_in = np.full(len(keys), np.inf)
+        last_out = np.full(len(keys), -np.inf)
+        present = np.zeros(len(keys))
+        np.minimum.at(first_in, group, piece_start)
+        np.maximum.at(last_out, group, piece_end)
+        np.add.at(present, group, piece_end - piece_start)
+
+        return {'device': (keys // len(days)).astype(np.int32),
+                'day': [days[i] for i in keys % len(days)],
+                'first_in': first_in, 'last_out': last_out, 'present': present}
+
+    def co_presence(self, start=None, end=None, macs=None):
+        """Segundos en que cada par de dispositivos estuvo en línea a la vez
+
+        Devuelve (macs, matriz simétrica); la diagonal es el tiempo en línea de cada uno.
+        Coste O(dispositivos² × intervalos / 64): para muchos dispositivos conviene
+        acotar el rango o la lista de MACs.
+        """
+        a, b = self._bounds(start, end)
+        rows = self._rows(macs)
+        matrix = np.zeros((len(rows), len(rows)), dtype=np.int64)
+        if b > a and len(rows):
+            window = self._window(self._words(macs), a, b)
+            for i in range(len(rows)):
+                counts = popcount(window[i] & window[i:]).sum(axis=1, dtype=np.int64)
+                matrix[i, i:] = counts
+                matrix[i:, i] = counts
+        return [self.macs[row] for row in rows], matrix * self.resolution
+
+    def online_at(self, when):
+        """MACs en línea en un instante"""
+        position = self._bin(when, self.bins)
+        if position >= self.bins:
+            return []
+        word, bit = divmod(position, 64)
+        online = (self.words[:, word] >> np.uint64(bit)) & np.uint64(1)
+        return [self.macs[i] for i in np.flatnonzero(online)]
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analítica de presencia sobre history.jsonl')
+    parser.add_argument('history', help='Historial de receiver.php o de un sitio de aggregator.py')
+    parser.add_argument('--from', dest='start', help='Inicio del rango (ISO)')
+    parser.add_argument('--to', dest='end', help='Fin del rango (ISO)')
+    parser.add_argument('--resolution', type=int, default=60, help='Segundos por intervalo del mapa de bits')
+    parser.add_argument('--stale', type=int, help='Segundos sin escaneos a partir de los cuales no hay datos '
+                        f'(por defecto, {STALE_GAP_FACTOR} veces la separación mediana)')
+    parser.add_argument('--days', type=int, default=7, help='Días a mostrar en primera entrada / última salida')
+    args = parser.parse_args()
+
+    load_start = datetime.now()
+    matrix = PresenceMatrix.from_history(args.history, args.resolution, args.stale)
+    print(f"📊 {len(matrix.macs)} dispositivos, {len(matrix.session_device)} sesiones, "
+          f"{matrix.bins} intervalos de {args.resolution} s "
+          f"(cargado en {(datetime.now() - load_start).total_seconds():.2f} s)")
+
+    uptime = matrix.uptime(args.start, args.end)
+    dwell = matrix.dwell(args.start, args.end)
+    print("\nDisponibilidad y permanencia:")
+    for mac in sorted(uptime, key=uptime.get, reverse=True):
+        stats = dwell[mac]
+        print(f"  {matrix.names.get(mac, mac):20s} {mac}  {uptime[mac] * 100:6.2f} %  "
+              f"{stats['sessions']:5d} sesiones  media {format_seconds(stats['mean'])}  "
+              f"máx {format_seconds(stats['max'])}")
+
+    daily = matrix.daily(args.start, args.end)
+    if daily['day']:
+        since = max(daily['day']) - timedelta(days=args.days - 1)
+        print(f"\nPrimera entrada / última salida (desde {since}):")
+        for i in np.lexsort((daily['device'], np.array([d.toordinal() for d in daily['day']]))):
+            if daily['day'][i] < since:
+                continue
+            mac = matrix.macs[daily['device'][i]]
+            print(f"  {daily['day'][i]}  {matrix.names.get(mac, mac):20s} "
+                  f"{datetime.fromtimestamp(daily['first_in'][i]):%H:%M} - "
+                  f"{datetime.fromtimestamp(daily['last_out'][i]):%H:%M}  "
+                  f"({format_seconds(daily['present'][i])})")
+
+    macs, co = matrix.co_presence(args.start, args.end)
+    pairs = [(co[i, j], macs[i], macs[j]) for i in range(len(macs)) for j in range(i + 1, len(macs)) if co[i, j]]
+    if pairs:
+        print("\nCo-presencia (pares con más tiempo juntos):")
+        for seconds, first, second in sorted(pairs, reverse=True)[:10]:
+            print(f"  {matrix.names.get(first, first)} + {matrix.names.get(second, second)}: "
+                  f"{format_seconds(seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,45 @@
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: POST, GET, OPTIONS');
-header('Access-Control-Allow-Headers: Content-Type');
+header('Access-Control-Allow-Headers: Content-Type, Content-Encoding');
 
-// Archivo donde se guardarán los datos
-$dataFile = 'devices.json';
+// Historial de solo anexado: una línea JSON por escaneo recibido
+//   {"t": scan_time, "m": "snapshot", "d": [dispositivos]}
+//   {"t": scan_time, "m": "delta", "c": [cambios]}   (c vacío = latido)
+$historyFile = 'history.jsonl';
+
+// Estado compactado: dispositivos hasta el byte 'offset' del historial
+$snapshotFile = 'snapshot.json';
+
+// Solo el 'offset' de la instantánea, para decidir si compactar sin decodificar el estado
+$snapshotOffsetFile = 'snapshot.offset';
+
+// Formato anterior (se sobrescribía en cada POST): solo se lee para migrar
+$legacyDataFile = 'devices.json';
+
+// Bloqueo compartido entre escrituras, compactación y lecturas
+$lockFile = 'history.lock';
+
+// Compactar cuando el historial sin compactar supere este tamaño
+$compactBytes = 64 * 1024;
+
+// Máximo de eventos devueltos por una consulta de historial
+$maxHistoryEvents = 5000;
+
+// Long-poll y SSE: espera máxima por petición y latido para mantener viva la conexión
+$maxPollSeconds = 30;
+$streamSeconds = 55;
+$keepAliveSeconds = 15;
+
+// Cada long-poll o SSE ocupa un proceso PHP mientras espera: como máximo $maxWaiters
+// a la vez (un archivo de bloqueo por puesto); sin puesto libre se responde al
+// momento y se pide volver a preguntar en $busyRetrySeconds
+$waiterLockPattern = 'waiter.%d.lock';
+$maxWaiters = 8;
+$busyRetrySeconds = 10;
+
+// Diferencias mayores que esto se envían como estado completo en lugar de eventos
+$maxChangesBytes = 256 * 1024;
 
 // Log para debug
 $logFile = 'debug.log';
@@ -16,6 +51,306 @@ function writeLog($message) {
     file_put_contents($logFile, "[$timestamp] $message\n", FILE_APPEND);
 }
 
+function lockStore($operation) {
+    global $lockFile;
+    $fp = fopen($lockFile, 'c');
+    flock($fp, $operation);
+    return $fp;
+}
+
+function unlockStore($fp) {
+    flock($fp, LOCK_UN);
+    fclose($fp);
+}
+
+// Aplica eventos joined/left/ip_changed sobre la lista guardada, indexando por MAC
+function applyChanges($devices, $changes) {
+    $byMac = array();
+    foreach ($devices as $device) {
+        $byMac[$device['mac']] = $device;
+    }
+    foreach ($changes as $change) {
+        $mac = $change['mac'];
+        unset($change['event'], $change['previous_ip']);
+        $byMac[$mac] = isset($byMac[$mac]) ? array_merge($byMac[$mac], $change) : $change;
+    }
+    return array_values($byMac);
+}
+
+// Aplica una línea del historial sobre el estado
+function applyEvent($state, $event) {
+    if ($event['m'] == 'snapshot') {
+        $state['devices'] = $event['d'];
+    } elseif (count($event['c']) > 0) {
+        $state['devices'] = applyChanges($state['devices'], $event['c']);
+    }
+    $state['last_scan'] = $event['t'];
+    return $state;
+}
+
+function loadSnapshot() {
+    global $snapshotFile, $legacyDataFile;
+    foreach (array($snapshotFile, $legacyDataFile) as $file) {
+        if (file_exists($file)) {
+            $snapshot = json_decode(file_get_contents($file), true);
+            if ($snapshot) {
+                $snapshot['offset'] = isset($snapshot['offset']) ? $snapshot['offset'] : 0;
+                return $snapshot;
+            }
+        }
+    }
+    return array('devices' => array(), 'last_scan' => null, 'updated_at' => null, 'offset' => 0);
+}
+
+// Estado actual: instantánea compactada + eventos posteriores (nunca todo el historial)
+function currentState() {
+    global $historyFile;
+    $state = loadSnapshot();
+
+    if (file_exists($historyFile)) {
+        $fp = fopen($historyFile, 'r');
+        fseek($fp, $state['offset']);
+        while (($line = fgets($fp)) !== false) {
+            $event = json_decode($line, true);
+            if ($event) {
+                $state = applyEvent($state, $event);
+                $state['offset'] = ftell($fp);
+            }
+        }
+        fclose($fp);
+        $state['updated_at'] = date('Y-m-d H:i:s', filemtime($historyFile));
+    }
+    return $state;
+}
+
+// Guarda el offset de la instantánea en su archivo aparte
+function writeSnapshotOffset($offset) {
+    global $snapshotOffsetFile;
+    $tmpFile = $snapshotOffsetFile . '.tmp';
+    file_put_contents($tmpFile, (string)$offset);
+    rename($tmpFile, $snapshotOffsetFile);
+}
+
+// Byte del historial cubierto por la instantánea. Sin el archivo aparte (instalación
+// anterior) se lee una vez de la instantánea completa y se guarda
+function snapshotOffset() {
+    global $snapshotOffsetFile;
+    $offset = @file_get_contents($snapshotOffsetFile);
+    if ($offset !== false && is_numeric(trim($offset))) {
+        return (int)trim($offset);
+    }
+    $snapshot = loadSnapshot();
+    writeSnapshotOffset($snapshot['offset']);
+    return $snapshot['offset'];
+}
+
+// Reescribe la instantánea con el estado al final del historial (con el bloqueo exclusivo tomado).
+// El offset aparte se escribe después: si el proceso se corta antes, queda atrasado y solo
+// se vuelve a compactar antes de tiempo
+function compactHistory() {
+    global $snapshotFile;
+    $state = currentState();
+    $state['updated_at'] = date('Y-m-d H:i:s');
+    $tmpFile = $snapshotFile . '.tmp';
+    file_put_contents($tmpFile, json_encode($state));
+    rename($tmpFile, $snapshotFile);
+    writeSnapshotOffset($state['offset']);
+    writeLog("Historial compactado hasta el byte " . $state['offset']);
+}
+
+// Inicio de la primera línea que empieza en $pos o después
+function lineStartAfter($fp, $pos) {
+    if ($pos == 0) {
+        return 0;
+    }
+    fseek($fp, $pos - 1);
+    fgets($fp);
+    return ftell($fp);
+}
+
+// Búsqueda binaria del primer evento con t >= $from (las líneas están en orden temporal)
+function historySeek($fp, $size, $from) {
+    $lo = 0;
+    $hi = $size;
+    while ($lo < $hi) {
+        $mid = intdiv($lo + $hi, 2);
+        $start = lineStartAfter($fp, $mid);
+        fseek($fp, $start);
+        $line = fgets($fp);
+        $event = $line !== false ? json_decode($line, true) : null;
+        if (!$event || $event['t'] >= $from) {
+            $hi = $mid;
+        } else {
+            $lo = $mid + 1;
+        }
+    }
+    return lineStartAfter($fp, $lo);
+}
+
+// Eventos con $from <= t <= $to leyendo solo ese tramo del historial
+function queryHistory($from, $to, $limit) {
+    global $historyFile;
+    $events = array();
+    if (!file_exists($historyFile)) {
+        return $events;
+    }
+
+    $fp = fopen($historyFile, 'r');
+    $size = filesize($historyFile);
+    fseek($fp, $from !== null ? historySeek($fp, $size, $from) : 0);
+    while (count($events) < $limit && ($line = fgets($fp)) !== false) {
+        $event = json_decode($line, true);
+        if (!$event) {
+            continue;
+        }
+        if ($to !== null && $event['t'] > $to) {
+            break;
+        }
+        $events[] = $event;
+    }
+    fclose($fp);
+    return $events;
+}
+
+// Versión del estado = tamaño del historial (crece con cada escaneo anexado)
+function historyVersion() {
+    global $historyFile;
+    clearstatcache();
+    return file_exists($historyFile) ? filesize($historyFile) : 0;
+}
+
+// Eventos anexados entre los bytes $since y $until del historial
+function eventsBetween($since, $until) {
+    global $historyFile;
+    $events = array();
+    $fp = fopen($historyFile, 'r');
+    fseek($fp, $since);
+    while (ftell($fp) < $until && ($line = fgets($fp)) !== false) {
+        $event = json_decode($line, true);
+        if ($event) {
+            $events[] = $event;
+        }
+    }
+    fclose($fp);
+    return $events;
+}
+
+// Espera (sin bloquear a los escritores) hasta que la versión cambie o pase el tiempo
+function waitForVersion($since, $seconds) {
+    $deadline = microtime(true) + $seconds;
+    $version = historyVersion();
+    while ($version == $since && microtime(true) < $deadline) {
+        usleep(500000);
+        $version = historyVersion();
+    }
+    return $version;
+}
+
+// Toma un puesto de espera libre sin bloquear; null si están todos ocupados.
+// El bloqueo se suelta con releaseWaiter() o al terminar el proceso
+function acquireWaiter() {
+    global $waiterLockPattern, $maxWaiters;
+    for ($slot = 0; $slot < $maxWaiters; $slot++) {
+        $fp = fopen(sprintf($waiterLockPattern, $slot), 'c');
+        if ($fp === false) {
+            continue;
+        }
+        if (flock($fp, LOCK_EX | LOCK_NB)) {
+            return $fp;
+        }
+        fclose($fp);
+    }
+    return null;
+}
+
+function releaseWaiter($fp) {
+    if ($fp !== null) {
+        unlockStore($fp);
+    }
+}
+
+// Estado actual con la versión del historial a la que corresponde
+function latestPayload() {
+    $lock = lockStore(LOCK_SH);
+    $state = currentState();
+    $version = historyVersion();
+    unlockStore($lock);
+    return array(
+        'devices' => $state['devices'],
+        'last_scan' => $state['last_scan'],
+        'updated_at' => $state['updated_at'],
+        'version' => $version
+    );
+}
+
+// Eventos desde la versión $since; si el cliente está demasiado atrasado
+// (o el historial se reinició) se envía el estado completo con reset=true
+function changesPayload($since) {
+    global $maxChangesBytes;
+    $lock = lockStore(LOCK_SH);
+    $version = historyVersion();
+    if ($since > $version || $version - $since > $maxChangesBytes) {
+        unlockStore($lock);
+        $state = latestPayload();
+        return array('version' => $state['version'], 'reset' => true, 'state' => $state);
+    }
+    $events = eventsBetween($since, $version);
+    unlockStore($lock);
+    return array('version' => $version, 'events' => $events);
+}
+
+// Valida un cuerpo "snapshot" (lista completa, también el formato antiguo) o "delta" (solo cambios)
+// y lo convierte en línea del historial. Devuelve [código HTTP, respuesta, línea]
+function buildEvent($data) {
+    $mode = is_array($data) && isset($data['mode']) ? $data['mode'] : 'snapshot';
+    $valid = is_array($data)
+          && (($mode == 'delta' && isset($data['changes']) && is_array($data['changes']))
+              || ($mode == 'snapshot' && isset($data['devices']) && is_array($data['devices'])));
+
+    if (!$valid) {
+        writeLog("ERROR: Datos inválidos - falta campo devices/changes");
+        return array(400, [
+            'status' => 'error',
+            'message' => 'Datos inválidos',
+            'received_data' => $data
+        ], null);
+    }
+
+    $scanTime = isset($data['scan_time']) ? $data['scan_time'] : date('c');
+    if ($mode == 'delta') {
+        $event = array('t' => $scanTime, 'm' => 'delta', 'c' => $data['changes']);
+        $count = count($data['changes']);
+    } else {
+        $event = array('t' => $scanTime, 'm' => 'snapshot', 'd' => $data['devices']);
+        $count = count($data['devices']);
+    }
+
+    return array(200, [
+        'status' => 'success',
+        'message' => 'Datos guardados correctamente',
+        'mode' => $mode,
+        'devices_count' => $count
+    ], json_encode($event) . "\n");
+}
+
+// Anexa las líneas al historial bajo bloqueo exclusivo y compacta si corresponde.
+// Devuelve los bytes escritos o false
+function appendEvents($lines) {
+    global $historyFile, $compactBytes;
+
+    $lock = lockStore(LOCK_EX);
+    $result = file_put_contents($historyFile, implode('', $lines), FILE_APPEND);
+
+    if ($result !== false) {
+        clearstatcache();
+        if (filesize($historyFile) - snapshotOffset() > $compactBytes) {
+            compactHistory();
+        }
+    }
+    unlockStore($lock);
+    return $result;
+}
+
 // Manejar solicitudes OPTIONS para CORS
 if ($_SERVER['REQUEST_METHOD'] == 'OPTIONS') {
     exit(0);
@@ -23,83 +358,179 @@ if ($_SERVER['REQUEST_METHOD'] == 'OPTIONS') {
 
 // Procesar datos POST del Python
 if ($_SERVER['REQUEST_METHOD'] == 'POST') {
-    writeLog("POST request recibido");
-    
     $input = file_get_contents('php://input');
-    writeLog("Raw input: " . $input);
-    
-    $data = json_decode($input, true);
-    writeLog("JSON decoded: " . print_r($data, true));
-    
-    if ($data && isset($data['devices'])) {
-        writeLog("Datos válidos encontrados, " . count($data['devices']) . " dispositivos");
-        
-        // Preparar datos para guardar
-        $saveData = array(
-            'devices' => $data['devices'],
-            'last_scan' => $data['scan_time'],
-            'updated_at' => date('Y-m-d H:i:s')
-        );
-        
-        writeLog("Datos preparados para guardar");
-        
-        // Verificar permisos de directorio
-        $dir = dirname($dataFile);
-        if (!is_writable($dir)) {
-            writeLog("ERROR: Directorio no escribible: $dir");
-            echo json_encode(['status' => 'error', 'message' => 'Directorio no escribible', 'dir' => $dir]);
-            exit;
+    writeLog("POST request recibido, " . strlen($input) . " bytes");
+
+    // El escáner comprime el cuerpo con gzip
+    if (isset($_SERVER['HTTP_CONTENT_ENCODING']) && $_SERVER['HTTP_CONTENT_ENCODING'] == 'gzip') {
+        $input = gzdecode($input);
+    }
+
+    $data = $input !== false ? json_decode($input, true) : null;
+
+    // Verificar permisos de directorio
+    $dir = dirname($historyFile);
+    if ($data && !is_writable($dir)) {
+        writeLog("ERROR: Directorio no escribible: $dir");
+        // 503: el escáner conserva el escaneo en su cola y lo reintenta
+        http_response_code(503);
+        echo json_encode(['status' => 'error', 'message' => 'Directorio no escribible', 'dir' => $dir]);
+        exit;
+    }
+
+    if (!$data) {
+        writeLog("ERROR: Datos inválidos - JSON inválido");
+        http_response_code(400);
+        echo json_encode([
+            'status' => 'error',
+            'message' => 'Datos inválidos',
+            'raw_input' => $input
+        ]);
+        exit;
+    }
+
+    // Escaneos acumulados en la cola del escáner: se validan en orden y se anexan juntos
+    $isBatch = isset($data['mode']) && $data['mode'] == 'batch';
+    if ($isBatch && (!isset($data['batch']) || !is_array($data['batch']))) {
+        writeLog("ERROR: Datos inválidos - lote sin campo batch");
+        http_response_code(400);
+        echo json_encode(['status' => 'error', 'message' => 'Datos inválidos: falta la lista batch',
+                          'mode' => 'batch', 'applied' => 0]);
+        exit;
+    }
+    $payloads = $isBatch ? $data['batch'] : array($data);
+    $lines = array();
+    $code = 200;
+    $response = ['status' => 'success', 'devices_count' => 0];
+    foreach ($payloads as $payload) {
+        list($code, $response, $line) = buildEvent($payload);
+        if ($code != 200) {
+            break;
         }
-        
-        // Guardar en archivo JSON
-        $result = file_put_contents($dataFile, json_encode($saveData, JSON_PRETTY_PRINT));
-        
-        if ($result !== false) {
-            writeLog("Archivo guardado exitosamente, $result bytes escritos");
-            echo json_encode([
-                'status' => 'success', 
-                'message' => 'Datos guardados correctamente',
-                'bytes_written' => $result,
-                'devices_count' => count($data['devices']),
-                'file_path' => realpath($dataFile)
-            ]);
-        } else {
+        $lines[] = $line;
+    }
+
+    if (count($lines) > 0) {
+        $result = appendEvents($lines);
+        if ($result === false) {
             $error = error_get_last();
             writeLog("ERROR al guardar archivo: " . print_r($error, true));
-            http_response_code(500);
-            echo json_encode([
-                'status' => 'error', 
+            $code = 500;
+            $lines = array();
+            $response = [
+                'status' => 'error',
                 'message' => 'Error al guardar datos',
                 'error' => $error,
-                'file_path' => $dataFile,
-                'dir_writable' => is_writable(dirname($dataFile))
-            ]);
+                'file_path' => $historyFile,
+                'dir_writable' => is_writable(dirname($historyFile))
+            ];
+        } else {
+            writeLog(count($lines) . " evento(s) anexados a $historyFile, $result bytes escritos");
+            $response['bytes_written'] = $result;
+            $response['file_path'] = realpath($historyFile);
         }
-    } else {
-        writeLog("ERROR: Datos inválidos - " . ($data ? "falta campo devices" : "JSON inválido"));
-        http_response_code(400);
-        echo json_encode([
-            'status' => 'error', 
-            'message' => 'Datos inválidos',
-            'received_data' => $data,
-            'raw_input' => $input
-        ]);
     }
+
+    if ($isBatch) {
+        $response['mode'] = 'batch';
+        $response['applied'] = count($lines);
+    }
+    http_response_code($code);
+    echo json_encode($response);
 }
 
 // Procesar solicitudes GET para leer datos
+//   receiver.php / ?action=latest              -> estado actual (ETag, 304 si no cambió)
+//   ?action=history&from=ISO&to=ISO&limit=N    -> eventos del rango
+//   ?action=poll&since=V&wait=S                -> long-poll: eventos posteriores a la versión V
+//   ?action=stream&since=V                     -> Server-Sent Events con los eventos nuevos
 elseif ($_SERVER['REQUEST_METHOD'] == 'GET') {
-    if (file_exists($dataFile)) {
-        $data = file_get_contents($dataFile);
-        $jsonData = json_decode($data, true);
-        
-        if ($jsonData) {
-            echo json_encode($jsonData);
+    $action = isset($_GET['action']) ? $_GET['action'] : 'latest';
+
+    if ($action == 'history') {
+        $from = isset($_GET['from']) ? $_GET['from'] : null;
+        $to = isset($_GET['to']) ? $_GET['to'] : null;
+        $limit = isset($_GET['limit']) ? min((int)$_GET['limit'], $maxHistoryEvents) : $maxHistoryEvents;
+        $lock = lockStore(LOCK_SH);
+        $events = queryHistory($from, $to, $limit);
+        unlockStore($lock);
+        echo json_encode(['from' => $from, 'to' => $to, 'count' => count($events), 'events' => $events]);
+    } elseif ($action == 'latest') {
+        // Un tablero que ya tiene esta versión recibe 304 sin leer el historial
+        $version = historyVersion();
+        $etag = '"v' . $version . '"';
+        header('ETag: ' . $etag);
+        header('Cache-Control: no-cache');
+        if (isset($_SERVER['HTTP_IF_NONE_MATCH']) && trim($_SERVER['HTTP_IF_NONE_MATCH']) == $etag) {
+            http_response_code(304);
+            exit;
+        }
+        echo json_encode(latestPayload());
+    } elseif ($action == 'poll') {
+        $since = isset($_GET['since']) ? (int)$_GET['since'] : 0;
+        $wait = isset($_GET['wait']) ? max(0, min((int)$_GET['wait'], $maxPollSeconds)) : $maxPollSeconds;
+        // Sin puesto libre se contesta como una consulta condicional, sin esperar
+        $waiter = $wait > 0 ? acquireWaiter() : null;
+        $busy = $wait > 0 && $waiter === null;
+        if ($busy) {
+            $wait = 0;
+        }
+        $version = waitForVersion($since, $wait);
+        releaseWaiter($waiter);
+        if ($version == $since) {
+            if ($busy) {
+                header('Retry-After: ' . $busyRetrySeconds);
+            }
+            http_response_code(204);
+            exit;
+        }
+        echo json_encode(changesPayload($since));
+    } elseif ($action == 'stream') {
+        header('Content-Type: text/event-stream');
+        header('Cache-Control: no-cache');
+        header('X-Accel-Buffering: no');
+        set_time_limit(0);
+
+        // Al reconectar, EventSource envía la última versión recibida
+        if (isset($_SERVER['HTTP_LAST_EVENT_ID'])) {
+            $since = (int)$_SERVER['HTTP_LAST_EVENT_ID'];
         } else {
-            echo json_encode(['devices' => [], 'last_scan' => null, 'updated_at' => null]);
+            $since = isset($_GET['since']) ? (int)$_GET['since'] : 0;
+        }
+
+        // Sin puesto libre: se envían los cambios pendientes y se cierra; EventSource
+        // vuelve a conectar pasado el retry más largo
+        $waiter = acquireWaiter();
+        if ($waiter === null) {
+            echo 'retry: ' . ($busyRetrySeconds * 1000) . "\n\n";
+            if (historyVersion() != $since) {
+                $payload = changesPayload($since);
+                echo "id: {$payload['version']}\nevent: changes\ndata: " . json_encode($payload) . "\n\n";
+            }
+            exit;
+        }
+
+        echo "retry: 3000\n\n";
+        flush();
+        $end = time() + $streamSeconds;
+        while (time() < $end && !connection_aborted()) {
+            $version = waitForVersion($since, min($keepAliveSeconds, $end - time()));
+            if ($version != $since) {
+                $payload = changesPayload($since);
+                $since = $payload['version'];
+                echo "id: $since\nevent: changes\ndata: " . json_encode($payload) . "\n\n";
+            } else {
+                echo ": keep-alive\n\n";
+            }
+            if (ob_get_level() > 0) {
+                ob_flush();
+            }
+            flush();
         }
+        releaseWaiter($waiter);
     } else {
-        echo json_encode(['devices' => [], 'last_scan' => null, 'updated_at' => null]);
+        http_response_code(400);
+        echo json_encode(['status' => 'error', 'message' => "Acción desconocida: $action"]);
     }
 }
 
@@ -107,4 +538,4 @@ else {
     http_response_code(405);
     echo json_encode(['status' => 'error', 'message' => 'Método no permitido']);
 }
-?>
\ No newline at end of file
+?>
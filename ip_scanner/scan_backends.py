@@ -0,0 +1,382 @@
+"""
+Backends de escaneo para network_scanner
+
+- AsyncSweepBackend: barrido en proceso con asyncio. Cada host se "despierta"
+  con un datagrama UDP (el kernel resuelve su MAC por ARP) y la MAC se lee de
+  la tabla de vecinos por netlink. Solo cuenta una entrada REACHABLE: las
+  STALE/DELAY/PROBE son caché de hosts que quizá ya se fueron y se espera a
+  que el kernel las vuelva a verificar. Los resultados se entregan a medida
+  que llegan.
+- ArpScanBackend: ejecuta `arp-scan` como subproceso (respaldo).
+
+Ambos devuelven tuplas (ip, mac) con la MAC en minúsculas; el filtrado contra
+los dispositivos configurados lo hace network_scanner.
+"""
+
+import asyncio
+import fcntl
+import ipaddress
+import os
+import signal
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+from arp_parser import iter_arp_scan
+
+ARP_TABLE_PATH = '/proc/net/arp'
+ROUTE_TABLE_PATH = '/proc/net/route'
+
+# Puerto "discard": sólo interesa que el kernel resuelva la MAC del destino
+DISCARD_PORT = 9
+
+# ioctl de Linux para leer dirección y máscara de una interfaz
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+
+NEIGH_SYSCTL_DIR = '/proc/sys/net/ipv4/neigh/default'
+
+# Netlink (rtnetlink): volcado de la tabla de vecinos
+RTM_NEWNEIGH = 28
+RTM_GETNEIGH = 30
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLMSG_HEADER = struct.Struct('=IHHII')
+NDMSG = struct.Struct('=BxxxiHBB')
+RTATTR = struct.Struct('=HH')
+NDA_DST = 1
+NDA_LLADDR = 2
+
+# Estados NUD de una entrada de la tabla de vecinos
+NUD_INCOMPLETE = 0x01
+NUD_REACHABLE = 0x02
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+
+# Entradas con MAC en caché que el kernel todavía tiene que confirmar
+NUD_UNCONFIRMED = NUD_STALE | NUD_DELAY | NUD_PROBE
+
+class ScanError(Exception):
+    """Error de un backend de escaneo (permite pasar al respaldo)"""
+
+
+def default_interface():
+    """Interfaz de la ruta por defecto según /proc/net/route"""
+    try:
+        with open(ROUTE_TABLE_PATH, 'r') as f:
+            next(f)  # Cabecera
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == '00000000':
+                    return fields[0]
+    except OSError as e:
+        raise ScanError(f"No se pudo leer {ROUTE_TABLE_PATH}: {e}")
+    raise ScanError("No hay ruta por defecto")
+
+
+def interface_network(interface):
+    """Red IPv4 (dirección/máscara) asignada a una interfaz"""
+    packed_name = struct.pack('256s', interface[:15].encode('utf-8'))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            address = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, packed_name)[20:24]
+            netmask = fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, packed_name)[20:24]
+        except OSError as e:
+            raise ScanError(f"La interfaz {interface} no tiene IPv4: {e}")
+    return ipaddress.IPv4Network(f"{socket.inet_ntoa(address)}/{socket.inet_ntoa(netmask)}", strict=False)
+
+
+def resolve_network(network='auto', interface=None):
+    """Convierte 'auto', una interfaz o un CIDR en un IPv4Network"""
+    if network and network != 'auto':
+        try:
+            return ipaddress.IPv4Network(network, strict=False)
+        except ValueError as e:
+            raise ScanError(f"Red inválida '{network}': {e}")
+    return interface_network(interface or default_interface())
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def read_neighbour_states():
+    """Lee la tabla de vecinos IPv4 del kernel como {ip: (mac | None, estado NUD)}"""
+    request = NLMSG_HEADER.pack(NLMSG_HEADER.size + NDMSG.size, RTM_GETNEIGH,
+                                NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + NDMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+    table = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.sendall(request)
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+                if length < NLMSG_HEADER.size:
+                    return table
+                if msg_type == NLMSG_DONE:
+                    return table
+                if msg_type == NLMSG_ERROR:
+                    error = -struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                    raise OSError(error, os.strerror(error))
+                if msg_type == RTM_NEWNEIGH:
+                    family, _, state, _, _ = NDMSG.unpack_from(data, offset + NLMSG_HEADER.size)
+                    ip = mac = None
+                    attr = offset + NLMSG_HEADER.size + NDMSG.size
+                    while attr + RTATTR.size <= offset + length:
+                        attr_length, attr_type = RTATTR.unpack_from(data, attr)
+                        if attr_length < RTATTR.size:
+                            break
+                        value = data[attr + RTATTR.size:attr + attr_length]
+                        if attr_type == NDA_DST and len(value) == 4:
+                            ip = socket.inet_ntoa(value)
+                        elif attr_type == NDA_LLADDR and len(value) == 6:
+                            mac = ':'.join(f'{byte:02x}' for byte in value)
+                        attr += _align(attr_length)
+                    if family == socket.AF_INET and ip:
+                        table[ip] = (mac, state)
+                offset += _align(length)
+
+
+def reachable_neighbours():
+    """Vecinos confirmados hace poco por el kernel (estado REACHABLE) como {ip: mac}"""
+    return {ip: mac for ip, (mac, state) in read_neighbour_states().items() if mac and state & NUD_REACHABLE}
+
+
+def reprobe_seconds(sysctl_dir=NEIGH_SYSCTL_DIR):
+    """Tiempo que tarda el kernel en volver a verificar una entrada STALE (DELAY + sondas unicast)"""
+    def read(name, default):
+        try:
+            with open(os.path.join(sysctl_dir, name), 'r') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return default
+
+    return read('delay_first_probe_time', 5) + read('ucast_solicit', 3) * read('retrans_time_ms', 1000) / 1000
+
+
+class NeighbourProbe:
+    """Sonda por defecto: provoca la resolución ARP y espera a que el kernel confirme al vecino
+
+    Solo una entrada REACHABLE es evidencia fresca. Una entrada con la MAC en
+    caché (STALE/DELAY/PROBE) puede ser de un host que ya se fue: el datagrama
+    la pasa a DELAY y el kernel la vuelve a sondear tras delay_first_probe_time,
+    así que para esas IPs se espera hasta `reprobe_timeout` en vez de
+    `resolve_timeout`. FAILED significa que el host no respondió.
+
+    La tabla se relee como máximo una vez por `poll_interval`, sin importar cuántos
+    hosts estén esperando, para que el coste no crezca con la concurrencia.
+    """
+
+    def __init__(self, poll_interval=0.05, resolve_timeout=1.0, reprobe_timeout=None):
+        self.poll_interval = poll_interval
+        self.resolve_timeout = resolve_timeout
+        self.reprobe_timeout = reprobe_timeout if reprobe_timeout is not None else resolve_timeout + reprobe_seconds()
+        self._table = {}
+        self._loaded_at = 0.0
+
+    def _neighbours(self):
+        now = time.monotonic()
+        if now - self._loaded_at >= self.poll_interval:
+            try:
+                self._table = read_neighbour_states()
+            except OSError as e:
+                raise ScanError(f"No se pudo leer la tabla de vecinos: {e}")
+            self._loaded_at = now
+        return self._table
+
+    @staticmethod
+    def _nudge(ip):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            try:
+                sock.sendto(b'', (ip, DISCARD_PORT))
+            except OSError:
+                pass  # Host inalcanzable: simplemente no aparecerá en la tabla
+
+    async def __call__(self, ip):
+        start = time.monotonic()
+        self._nudge(ip)
+        timeout = self.resolve_timeout
+        while True:
+            mac, state = self._neighbours().get(ip, (None, 0))
+            if mac and state & NUD_REACHABLE:
+                return mac
+            # Un FAILED leído antes del datagrama es del barrido anterior
+            if state & NUD_FAILED and self._loaded_at > start:
+                return None
+            if state & NUD_UNCONFIRMED:
+                timeout = self.reprobe_timeout
+            if time.monotonic() - start >= timeout:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+
+class AsyncSweepBackend:
+    """Barrido concurrente en proceso con límite de sondas simultáneas
+
+    `probe` es una corrutina `probe(ip) -> mac | None`; se puede reemplazar por un
+    respondedor simulado para probar el motor sin red real.
+    """
+
+    name = 'async'
+
+    def __init__(self, network='auto', interface=None, max_in_flight=256, host_timeout=1.0, probe=None):
+        self.network = network
+        self.interface = interface
+        self.max_in_flight = max_in_flight
+        self.host_timeout = host_timeout
+        self.probe = probe or NeighbourProbe(resolve_timeout=host_timeout)
+
+    def hosts(self, network=None):
+        """Lista de IPs a sondear para la red configurada"""
+        return [str(ip) for ip in resolve_network(network or self.network, self.interface).hosts()]
+
+    async def sweep(self, hosts):
+        """Generador asíncrono de (ip, mac) en el orden en que responden los hosts"""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        # La sonda puede esperar más que host_timeout a que se confirme una entrada en caché
+        timeout = max(self.host_timeout, getattr(self.probe, 'reprobe_timeout', 0))
+
+        async def probe_one(ip):
+            async with semaphore:
+                try:
+                    mac = await asyncio.wait_for(self.probe(ip), timeout)
+                except (asyncio.TimeoutError, OSError):
+                    return ip, None
+                return ip, mac
+
+        tasks = [asyncio.ensure_future(probe_one(ip)) for ip in hosts]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ip, mac = await next_done
+                if mac:
+                    yield ip, mac.lower()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def scan(self, network=None, on_result=None):
+        """Barre la red y devuelve [(ip, mac)]; `on_result` se llama con cada respuesta"""
+        return self.scan_hosts(self.hosts(network), on_result)
+
+    def scan_hosts(self, hosts, on_result=None):
+        """Sondea solo las IPs indicadas y devuelve [(ip, mac)]"""
+
+        async def collect():
+            results = []
+            async for ip, mac in self.sweep(hosts):
+                results.append((ip, mac))
+                if on_result:
+                    on_result(ip, mac)
+            return results
+
+        return asyncio.run(collect())
+
+
+class ArpScanBackend:
+    """Backend de respaldo basado en el binario arp-scan"""
+
+    name = 'arp-scan'
+
+    def __init__(self, network='auto', interface=None, timeout=30):
+        self.network = network
+        self.interface = interface
+        self.timeout = timeout
+
+    def command(self, network=None, hosts=None):
+        """Línea de comandos de arp-scan para la red o las IPs indicadas"""
+        cmd = ['arp-scan']
+        if self.interface:
+            cmd += ['-I', self.interface]
+        network = network or self.network
+        if hosts:
+            cmd += list(hosts)
+        else:
+            cmd += [network] if network and network != 'auto' else ['-l']
+        return cmd
+
+    def scan(self, network=None, on_result=None):
+        """Ejecuta arp-scan sobre la red y devuelve [(ip, mac)]"""
+        return self._run(self.command(network), on_result)
+
+    def scan_hosts(self, hosts, on_result=None):
+        """Ejecuta arp-scan solo sobre las IPs indicadas"""
+        return self._run(self.command(hosts=hosts), on_result)
+
+    def _run(self, cmd, on_result):
+        """Lee la salida de arp-scan línea a línea mientras el proceso sigue corriendo"""
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       start_new_session=True)
+        except OSError as e:
+            raise ScanError(f"No se pudo ejecutar arp-scan: {e}")
+
+        # El temporizador mata el proceso; la lectura termina al cerrarse la tubería
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+        watchdog = threading.Timer(self.timeout, kill)
+        watchdog.start()
+        results = []
+        try:
+            for hit in iter_arp_scan(process.stdout):
+                results.append(hit)
+                if on_result:
+                    on_result(*hit)
+            stderr = process.stderr.read()
+            returncode = process.wait()
+        finally:
+            watchdog.cancel()
+            process.stdout.close()
+            process.stderr.close()
+
+        if timed_out.is_set():
+            raise ScanError("Timeout ejecutando arp-scan")
+        if returncode != 0:
+            raise ScanError(f"Error ejecutando arp-scan: {stderr}")
+        return results
+
+
+BACKENDS = {
+    AsyncSweepBackend.name: AsyncSweepBackend,
+    ArpScanBackend.name: ArpScanBackend,
+}
+
+
+def create_backends(scan_config, network=None, interface=None):
+    """Crea (principal, respaldo) a partir de la sección `scan` de la configuración
+
+    `network` e `interface` sustituyen a scan.network / scan.interface para
+    construir los backends de un segmento concreto.
+    """
+    backend_name = scan_config.get('backend', AsyncSweepBackend.name)
+    if backend_name not in BACKENDS:
+        raise ScanError(f"Backend desconocido '{backend_name}' (opciones: {', '.join(BACKENDS)})")
+
+    network = network or scan_config.get('network', 'auto')
+    interface = interface or scan_config.get('interface')
+    fallback = ArpScanBackend(network, interface, timeout=scan_config.get('timeout', 30))
+
+    if backend_name == ArpScanBackend.name:
+        return fallback, None
+
+    primary = AsyncSweepBackend(
+        network,
+        interface,
+        max_in_flight=scan_config.get('max_in_flight', 256),
+        host_timeout=scan_config.get('host_timeout', 1.0),
+    )
+    return primary, fallback
@@ -0,0 +1,58 @@
+"""
+Planificador adaptativo de escaneos
+
+Entre barridos completos de la red, cada dispositivo conocido tiene su propio
+intervalo de sondeo: al cambiar de estado (o de IP) vuelve al mínimo y cada
+sondeo sin cambios lo duplica hasta llegar al intervalo del barrido completo.
+Así los dispositivos inestables se vigilan a menudo y los estables casi nunca.
+"""
+
+import time
+
+
+class AdaptiveScheduler:
+    """Decide cuándo barrer toda la red y qué dispositivos sondear entre barridos"""
+
+    def __init__(self, full_interval, min_interval=15.0, tick=5.0, clock=time.monotonic):
+        self.full_interval = full_interval
+        self.min_interval = min(min_interval, full_interval)
+        self.tick = tick
+        self.clock = clock
+        self.intervals = {}  # mac -> intervalo actual de sondeo (s)
+        self.deadlines = {}  # mac -> instante del próximo sondeo
+        self.next_full = clock()
+
+    def full_sweep_due(self):
+        """True si toca un barrido completo"""
+        return self.clock() >= self.next_full
+
+    def full_sweep_done(self):
+        """Registra que se acaba de completar un barrido completo"""
+        self.next_full = self.clock() + self.full_interval
+
+    def due(self):
+        """MACs cuyo sondeo dirigido está pendiente"""
+        now = self.clock()
+        return [mac for mac, deadline in self.deadlines.items() if deadline <= now]
+
+    def observe(self, probed, changed):
+        """Ajusta los intervalos: mínimo para las MACs con cambios, el doble para las estables"""
+        now = self.clock()
+        for mac in set(probed) | set(changed):
+            if mac in changed:
+                interval = self.min_interval
+            else:
+                interval = min(self.intervals.get(mac, self.min_interval) * 2, self.full_interval)
+            self.intervals[mac] = interval
+            self.deadlines[mac] = now + interval
+
+    def forget(self, mac):
+        """Deja de planificar sondeos para una MAC"""
+        self.intervals.pop(mac, None)
+        self.deadlines.pop(mac, None)
+
+    def sleep_seconds(self):
+        """Tiempo hasta el siguiente evento planificado, acotado a un tick"""
+        now = self.clock()
+        upcoming = [self.next_full] + list(self.deadlines.values())
+        return max(0.0, min(self.tick, min(upcoming) - now))
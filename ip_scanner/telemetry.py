@@ -0,0 +1,194 @@
+"""
+Telemetría para el modo daemon del escáner
+
+- JsonLineFormatter / setup_logging: registro estructurado, un objeto JSON por línea.
+- Metrics / start_metrics_server: métricas en memoria expuestas en formato de
+  texto de Prometheus en http://<host>:<puerto>/metrics.
+- SystemdNotifier: protocolo sd_notify (READY, STATUS, WATCHDOG, STOPPING) por
+  el socket de NOTIFY_SOCKET; sin esa variable no hace nada.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON con los campos de `extra={'fields': ...}`"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level='info', log_file=None):
+    """Envía todo el registro a stderr (o a `log_file`) como líneas JSON"""
+    handler = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler()
+    handler.setFormatter(JsonLineFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    return handler
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Metrics:
+    """Registro de métricas en memoria (gauges, contadores y resúmenes suma/cuenta)"""
+
+    def __init__(self, prefix='network_scanner'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.meta = {}  # nombre -> (tipo, ayuda)
+        self.values = {}  # (nombre, etiquetas) -> valor
+
+    def _key(self, name, labels):
+        return f"{self.prefix}_{name}", tuple(sorted(labels.items()))
+
+    def describe(self, name, kind, help_text):
+        self.meta[f"{self.prefix}_{name}"] = (kind, help_text)
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[self._key(name, labels)] = float(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def observe(self, name, value, **labels):
+        """Acumula una observación de un resumen (_sum y _count)"""
+        full_name, label_key = self._key(name, labels)
+        with self.lock:
+            for suffix, amount in (('_sum', value), ('_count', 1)):
+                key = (full_name + suffix, label_key)
+                self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+        with self.lock:
+            values = sorted(self.values.items())
+
+        lines = []
+        described = set()
+        for (name, labels), value in values:
+            base = name
+            for suffix in ('_sum', '_count'):
+                if name.endswith(suffix) and name[:-len(suffix)] in self.meta:
+                    base = name[:-len(suffix)]
+            if base not in described and base in self.meta:
+                kind, help_text = self.meta[base]
+                lines.append(f"# HELP {base} {help_text}")
+                lines.append(f"# TYPE {base} {kind}")
+                described.add(base)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics, host='127.0.0.1', port=9464):
+    """Sirve /metrics en un hilo de fondo; devuelve el servidor (shutdown() para detenerlo)"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    return server
+
+
+class SystemdNotifier:
+    """Notificaciones sd_notify para unidades Type=notify (y WatchdogSec=)"""
+
+    def __init__(self, environ=None):
+        environ = os.environ if environ is None else environ
+        self.address = environ.get('NOTIFY_SOCKET')
+        if self.address and self.address.startswith('@'):
+            # Socket del espacio de nombres abstracto
+            self.address = '\0' + self.address[1:]
+
+        watchdog_usec = environ.get('WATCHDOG_USEC')
+        watchdog_pid = environ.get('WATCHDOG_PID')
+        self.watchdog_interval = None
+        if watchdog_usec and (not watchdog_pid or watchdog_pid == str(os.getpid())):
+            # systemd recomienda avisar al menos cada la mitad del plazo
+            self.watchdog_interval = int(watchdog_usec) / 1e6 / 2
+
+    @property
+    def enabled(self):
+        return bool(self.address)
+
+    def notify(self, **fields):
+        """Envía campos sd_notify (READY=1, STATUS=...); False si no hay socket"""
+        if not self.address:
+            return False
+        message = '\n'.join(f"{key.upper()}={value}" for key, value in fields.items())
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.connect(self.address)
+                sock.sendall(message.encode('utf-8'))
+        except OSError:
+            return False
+        return True
+
+    def ready(self, status=None):
+        return self.notify(ready=1, **({'status': status} if status else {}))
+
+    def status(self, text):
+        return self.notify(status=text)
+
+    def stopping(self):
+        return self.notify(stopping=1)
+
+    def watchdog(self):
+        return self.watchdog_interval is not None and self.notify(watchdog=1)
+
+    def sleep(self, seconds):
+        """time.sleep que sigue avisando al watchdog durante esperas largas"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.watchdog()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self.watchdog_interval or remaining))